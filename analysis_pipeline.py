@@ -0,0 +1,179 @@
+"""
+Background image analysis for submitted e-waste items.
+
+Submissions are saved with ``analysis_status='pending'`` and return
+immediately. Items are claimed with a conditional UPDATE, so the in-process
+worker pool and the ``process_analysis_queue`` management command can run
+side by side without analyzing an item twice. The database is the queue;
+no external broker is needed.
+"""
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import image_cache
+from .image_preprocessing import encode_analyzed_image
+from .inference_batcher import InferenceBusy, inference_service
+from .models import EWasteItem
+
+logger = logging.getLogger(__name__)
+
+# Items left in processing longer than this are assumed abandoned by a dead worker
+DEFAULT_STALE_AFTER = timedelta(minutes=15)
+
+# In-process jobs turned away by a saturated detector are resubmitted after 1, 2, 4, ... seconds.
+# Past the last retry the item stays pending for process_analysis_queue.
+BUSY_RETRY_DELAY = 1.0
+BUSY_MAX_RETRIES = 6
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'EWASTE_ANALYSIS_WORKERS', 8),
+                    thread_name_prefix='ewaste-analysis'
+                )
+    return _executor
+
+
+def enqueue_analysis(item_id):
+    """
+    Schedule analysis of a pending item once the current transaction commits.
+
+    With ``EWASTE_ANALYSIS_WORKERS = 0`` nothing runs in-process and the item
+    waits for the ``process_analysis_queue`` command.
+    """
+    if getattr(settings, 'EWASTE_ANALYSIS_WORKERS', 8) <= 0:
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run_job, item_id))
+
+
+def _run_job(item_id, attempt=0):
+    try:
+        process_item(item_id, on_busy=lambda: _retry_job(item_id, attempt + 1))
+    except Exception as e:
+        logger.error(f'Unhandled error analyzing item {item_id}: {str(e)}')
+    finally:
+        # Worker threads hold their own connections; don't leak them
+        close_old_connections()
+
+
+def _retry_job(item_id, attempt):
+    if attempt > BUSY_MAX_RETRIES:
+        logger.warning(f'Inference still busy after {BUSY_MAX_RETRIES} retries, '
+                       f'leaving item {item_id} for process_analysis_queue')
+        return
+    delay = BUSY_RETRY_DELAY * 2 ** (attempt - 1)
+    timer = threading.Timer(delay, lambda: _get_executor().submit(_run_job, item_id, attempt))
+    timer.daemon = True
+    timer.start()
+
+
+def claim_item(item_id):
+    """Atomically move an item from pending to processing; False if someone else has it"""
+    return EWasteItem.objects.filter(
+        pk=item_id, analysis_status='pending'
+    ).update(analysis_status='processing', updated_at=timezone.now()) == 1
+
+
+def process_item(item_id, on_busy=None):
+    """
+    Run detection and pricing for one pending item. Returns True if it was processed.
+
+    When the detector is saturated the item goes back to pending and
+    ``on_busy`` is called, so the caller can retry it later.
+    """
+    if not claim_item(item_id):
+        return False
+
+    # Imported here because views imports this module
+    from .views import calculate_versioned_price_estimation
+
+    ewaste_item = EWasteItem.objects.get(pk=item_id)
+    try:
+        cached = image_cache.cached_results(ewaste_item.content_hash)
+        if cached is not None:
+            # The same photo was analyzed while this item waited in the queue
+            analysis_results, analyzed_image_name = cached
+        else:
+            # Concurrent items are batched together by the inference service
+            img_cv, detections = inference_service.analyze(ewaste_item.image.path)
+            analysis_results = json.dumps(detections)
+
+            # Encode the annotated image in memory and write it once
+            annotated = encode_analyzed_image(img_cv, ewaste_item.image.name)
+            ewaste_item.analyzed_image.save(annotated.name, annotated, save=False)
+            analyzed_image_name = ewaste_item.analyzed_image.name
+
+        # Calculate price estimation
+        price_estimation, price_model_version = calculate_versioned_price_estimation(
+            ewaste_item.item_type,
+            ewaste_item.functional_status,
+            ewaste_item.age,
+            ewaste_item.battery_status,
+            ewaste_item.screen_condition,
+            ewaste_item.motherboard_status,
+            ewaste_item.brand
+        )
+
+        # Write only the analysis fields, and only while the item is still ours: a full save()
+        # after the detector call would undo edits made meanwhile and re-insert a deleted item
+        updated = EWasteItem.objects.filter(pk=item_id, analysis_status='processing').update(
+            analysis_results=analysis_results,
+            analyzed_image=analyzed_image_name,
+            price_estimation=price_estimation,
+            price_model_version=price_model_version,
+            analysis_status='completed',
+            analysis_error='',
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            logger.warning(f'Item {item_id} was deleted or requeued during analysis, discarding results')
+            if cached is None:
+                ewaste_item.analyzed_image.delete(save=False)
+            return False
+
+        if cached is None:
+            image_cache.store_results(ewaste_item.content_hash, analysis_results, analyzed_image_name)
+    except InferenceBusy:
+        # Detector is saturated: put the item back for a later pass
+        logger.warning(f'Inference queue full, requeueing item {item_id}')
+        EWasteItem.objects.filter(pk=item_id).update(analysis_status='pending')
+        if on_busy is not None:
+            on_busy()
+        return False
+    except Exception as e:
+        logger.error(f'Error during image analysis of item {item_id}: {str(e)}')
+        EWasteItem.objects.filter(pk=item_id).update(
+            analysis_status='failed', analysis_error=str(e)[:500]
+        )
+    return True
+
+
+def requeue_stale(older_than):
+    """Return items stuck in processing (e.g. after a worker crash) to the queue"""
+    cutoff = timezone.now() - older_than
+    return EWasteItem.objects.filter(
+        analysis_status='processing', updated_at__lt=cutoff
+    ).update(analysis_status='pending')
+
+
+def pending_item_ids(limit):
+    return list(
+        EWasteItem.objects.filter(analysis_status='pending')
+        .order_by('created_at')
+        .values_list('id', flat=True)[:limit]
+    )
+
@@ -0,0 +1,19 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class EwasteConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'ewaste'
+
+    def ready(self):
+        # Register signal receivers
+        from . import (  # noqa: F401
+            catalog_cache, depreciation, material_recovery, material_values, price_series, quote_cache, scheduling,
+        )
+
+        # Optionally load the ML/vision models before the first request
+        warm_up_models = getattr(settings, 'EWASTE_WARM_UP_MODELS', [])
+        if warm_up_models:
+            from .model_registry import registry
+            registry.warm_up(warm_up_models)
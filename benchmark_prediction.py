@@ -0,0 +1,75 @@
+"""
+Benchmark EWastePricePredictor.predict_batch against the per-row predict_price path.
+
+Run from the project directory after training the model:
+
+    python -m ewaste.benchmark_prediction
+    python -m ewaste.benchmark_prediction --sizes 1 1000 1000000 --max-per-row 10000
+
+The per-row path is only timed up to --max-per-row rows; larger sizes report
+the per-row rate measured at that cap.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from .ml_model import EWastePricePredictor, stage_timer
+
+DEVICE_TYPES = np.array(['phone', 'laptop', 'tablet', 'desktop', 'tv', 'console'])
+CONDITIONS = np.array(['working', 'partially_working', 'not_working'])
+STATUSES = np.array(['good', 'average', 'poor', 'na'])
+
+
+def make_batch(n_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    return {
+        'device_type': DEVICE_TYPES[rng.integers(0, len(DEVICE_TYPES), n_rows)],
+        'condition': CONDITIONS[rng.integers(0, len(CONDITIONS), n_rows)],
+        'age': rng.uniform(0, 10, n_rows),
+        'battery_status': STATUSES[rng.integers(0, len(STATUSES), n_rows)],
+        'screen_condition': STATUSES[rng.integers(0, len(STATUSES), n_rows)],
+        'motherboard_status': STATUSES[rng.integers(0, len(STATUSES), n_rows)],
+    }
+
+
+def time_per_row(predictor, batch, n_rows):
+    started = time.perf_counter()
+    for i in range(n_rows):
+        predictor.predict_price(
+            batch['device_type'][i],
+            batch['condition'][i],
+            batch['age'][i],
+            batteryStatus=batch['battery_status'][i],
+            screenCondition=batch['screen_condition'][i],
+            motherboardStatus=batch['motherboard_status'][i],
+        )
+    return n_rows / (time.perf_counter() - started)
+
+
+def time_batch(predictor, batch, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        predictor.predict_batch(batch)
+        best = min(best, time.perf_counter() - started)
+    return len(batch['age']) / best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 1000, 1000000])
+    parser.add_argument('--max-per-row', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    # Timing samples would add their own overhead to the measurement
+    stage_timer.sample_rate = 0
+    predictor = EWastePricePredictor()
+
+    print(f"{'rows':>10} {'per-row rows/s':>16} {'batch rows/s':>16} {'speedup':>9}")
+    for n_rows in args.sizes:
+        batch = make_batch(n_rows)
+        per_row = time_per_row(predictor, batch, min(n_rows, args.max_per_row))
+        batched = time_batch(predictor, batch, args.repeats)
+        print(f"{n_rows:>10} {per_row:>16,.0f} {batched:>16,.0f} {batched / per_row:>8.1f}x")
@@ -0,0 +1,94 @@
+"""
+Benchmark route_optimizer on synthetic city instances.
+
+Pickups are scattered around a few dense neighbourhoods plus a uniform
+background, with demands of a few kg and the three collection windows.
+
+    python -m ewaste.benchmark_routes
+    python -m ewaste.benchmark_routes --stops 500 2000 5000 --depots 4
+
+Each size is solved construction-only and then with 2-opt/Or-opt, on one
+core. With --depots above 1 the same stops are also split between depots
+and solved serially and in a process pool.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from .route_optimizer import Depot, Stop, assign_to_depots, solve, solve_depots
+
+CITY_CENTER = (12.9716, 77.5946)
+CITY_RADIUS_DEG = 0.15
+WINDOWS = [(9 * 60, 12 * 60), (12 * 60, 15 * 60), (15 * 60, 18 * 60)]
+
+
+def make_city(n_stops, seed=42):
+    rng = np.random.default_rng(seed)
+    n_clustered = int(n_stops * 0.7)
+    centers = CITY_CENTER + rng.uniform(-CITY_RADIUS_DEG, CITY_RADIUS_DEG, (8, 2))
+    points = np.concatenate([
+        centers[rng.integers(0, len(centers), n_clustered)] + rng.normal(0, 0.015, (n_clustered, 2)),
+        CITY_CENTER + rng.uniform(-CITY_RADIUS_DEG, CITY_RADIUS_DEG, (n_stops - n_clustered, 2)),
+    ])
+    windows = rng.integers(0, len(WINDOWS), n_stops)
+    demands = np.clip(rng.lognormal(1.0, 1.0, n_stops), 0.1, 60.0)
+    return [
+        Stop(i, float(lat), float(lon), float(demand), *WINDOWS[window])
+        for i, ((lat, lon), demand, window) in enumerate(zip(points, demands, windows))
+    ]
+
+
+def make_depots(n_depots):
+    angles = np.linspace(0, 2 * np.pi, n_depots, endpoint=False)
+    offset = CITY_RADIUS_DEG / 2 if n_depots > 1 else 0.0
+    return [
+        Depot(f'depot-{i + 1}', CITY_CENTER[0] + offset * np.sin(angle), CITY_CENTER[1] + offset * np.cos(angle))
+        for i, angle in enumerate(angles)
+    ]
+
+
+def fleet(stops, capacity_kg, stops_per_vehicle):
+    """Enough vehicles for the stops, by weight and by count"""
+    by_weight = sum(stop.demand_kg for stop in stops) / capacity_kg
+    return [capacity_kg] * (int(max(by_weight, len(stops) / stops_per_vehicle)) + 2)
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--stops', type=int, nargs='+', default=[200, 1000, 2000])
+    parser.add_argument('--depots', type=int, default=1)
+    parser.add_argument('--capacity-kg', type=float, default=500.0)
+    parser.add_argument('--stops-per-vehicle', type=int, default=40)
+    parser.add_argument('--processes', type=int)
+    args = parser.parse_args()
+
+    print(f"{'stops':>6} {'routes':>7} {'unassigned':>10} {'built km':>10} {'improved km':>12} "
+          f"{'gain':>6} {'build s':>8} {'total s':>8}")
+    for n_stops in args.stops:
+        stops = make_city(n_stops)
+        depot = make_depots(1)[0]
+        capacities = fleet(stops, args.capacity_kg, args.stops_per_vehicle)
+        built, build_seconds = timed(solve, depot, stops, capacities, time_limit=0)
+        improved, total_seconds = timed(solve, depot, stops, capacities)
+        gain = 1 - improved.distance_km / built.distance_km if built.distance_km else 0.0
+        print(f"{n_stops:>6} {len(improved.routes):>7} {len(improved.unassigned):>10} "
+              f"{built.distance_km:>10,.1f} {improved.distance_km:>12,.1f} {gain:>6.1%} "
+              f"{build_seconds:>8.2f} {total_seconds:>8.2f}")
+
+        if args.depots > 1:
+            depots = make_depots(args.depots)
+            problems = [
+                (depot, depot_stops, fleet(depot_stops, args.capacity_kg, args.stops_per_vehicle))
+                for depot, depot_stops in zip(depots, assign_to_depots(depots, stops))
+            ]
+            _, serial_seconds = timed(solve_depots, problems, processes=1)
+            solutions, pool_seconds = timed(solve_depots, problems, processes=args.processes)
+            print(f"{'':>6} {args.depots} depots: {sum(s.distance_km for s in solutions):,.1f} km, "
+                  f"serial {serial_seconds:.2f}s, process pool {pool_seconds:.2f}s")
@@ -0,0 +1,78 @@
+"""
+Measure the import cost of starting the app and check it against a budget.
+
+Runs ``django.setup()`` plus a load of the URLconf (and so the views) in a fresh
+interpreter under ``python -X importtime``. It then reports the slowest
+imports and fails if a heavy ML/vision module was imported or the total
+exceeds the budget. Run from the project directory:
+
+    python -m ewaste.benchmark_startup
+    python -m ewaste.benchmark_startup --budget-ms 800 --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from .lazy_imports import HEAVY_MODULES
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Startup import budget in milliseconds for django.setup() plus the URLconf
+DEFAULT_BUDGET_MS = 1000
+
+STARTUP_CODE = (
+    'import django; django.setup(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+
+
+def measure_imports(settings_module):
+    """Return [(module, self_us, cumulative_us)] from an -X importtime run"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f'Startup failed:\n{result.stderr[-2000:]}')
+
+    imports = []
+    for line in result.stderr.splitlines():
+        # "import time:      self [us] |  cumulative | imported package"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'ewaste_project.settings'))
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to list')
+    args = parser.parse_args()
+
+    imports = measure_imports(args.settings)
+    # Every import's self time, summed, is the total import time
+    total_ms = sum(self_us for _, self_us, _ in imports) / 1000
+    loaded = {name for name, _, _ in imports}
+    heavy = sorted(module for module in HEAVY_MODULES if module in loaded)
+
+    print(f'Imported {len(imports)} modules in {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)\n')
+    print(f"{'cumulative ms':>14}  module")
+    top_level = [entry for entry in imports if '.' not in entry[0]]
+    for name, _, cumulative_us in sorted(top_level, key=lambda entry: -entry[2])[:args.top]:
+        print(f'{cumulative_us / 1000:>14.1f}  {name}')
+
+    failures = []
+    if heavy:
+        failures.append(f'heavy modules imported at startup: {", ".join(heavy)}')
+    if total_ms > args.budget_ms:
+        failures.append(f'import time {total_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget')
+    if failures:
+        print('\nFAIL: ' + '; '.join(failures))
+        sys.exit(1)
+    print('\nOK')
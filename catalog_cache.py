@@ -0,0 +1,79 @@
+"""
+Versioned read cache for the device catalog lookups used by the calculator.
+
+Brand and model lists are cached per query under the current catalog
+version. Any DeviceBrand/DeviceModel change bumps the version (a database
+stamp, so every process sees it), which both orphans the old entries and
+changes the ETag/Last-Modified validators that the views send back.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import DeviceBrand, DeviceModel
+from .version_stamps import version_stamp
+
+VERSION_STAMP = version_stamp('catalog')
+CATALOG_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def catalog_version():
+    """Return (version, modified_at) for the catalog, initializing it if needed"""
+    version, modified_at = VERSION_STAMP.read()
+    if modified_at is None:
+        # First use: create the stamp so every process agrees on Last-Modified
+        VERSION_STAMP.bump()
+        version, modified_at = VERSION_STAMP.read()
+    return version, modified_at.replace(microsecond=0)
+
+
+def bump_catalog_version():
+    VERSION_STAMP.bump()
+
+
+def _cached(key, loader):
+    version, _ = catalog_version()
+    versioned_key = f'ewaste:catalog:{version}:{key}'
+    value = cache.get(versioned_key)
+    if value is None:
+        value = loader()
+        cache.set(versioned_key, value, timeout=CATALOG_CACHE_TIMEOUT)
+    return value
+
+
+def brand_names(device_type):
+    """Sorted brand names for a device type"""
+    return _cached(f'brands:{device_type}', lambda: list(
+        DeviceBrand.objects.filter(device_type=device_type)
+        .values_list('name', flat=True).distinct().order_by('name')
+    ))
+
+
+def model_rows(device_type, brand_name):
+    """Models of a brand and device type, newest first"""
+    return _cached(f'models:{device_type}:{brand_name}', lambda: [
+        {**row, 'base_price': float(row['base_price'])}
+        for row in DeviceModel.objects.filter(device_type=device_type, brand__name=brand_name)
+        .values('id', 'name', 'release_year', 'base_price').distinct().order_by('-release_year', 'name')
+    ])
+
+
+def catalog_etag(request, *args, **kwargs):
+    """ETag for a catalog lookup: the catalog version plus the query parameters"""
+    version, _ = catalog_version()
+    query = request.GET.urlencode()
+    return hashlib.sha1(f'{version}:{query}'.encode()).hexdigest()
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    _, modified_at = catalog_version()
+    return modified_at
+
+
+@receiver([post_save, post_delete], sender=DeviceBrand)
+@receiver([post_save, post_delete], sender=DeviceModel)
+def invalidate_catalog(sender, **kwargs):
+    """Expire every cached catalog lookup after a brand or model changes"""
+    bump_catalog_version()
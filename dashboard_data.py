@@ -0,0 +1,65 @@
+"""
+Data access for the user dashboard.
+
+Totals come from a single aggregate query and items are fetched one page at
+a time with keyset pagination on (created_at, id), so the cost of a page
+does not grow with the number of items a user has submitted.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Count, Q, Sum
+
+from .models import EWasteItem
+
+DASHBOARD_PAGE_SIZE = 24
+
+
+def dashboard_stats(user):
+    """Item count, total estimated value and scheduled collections in one query"""
+    stats = EWasteItem.objects.filter(user=user).aggregate(
+        item_count=Count('id'),
+        total_value=Sum('price_estimation'),
+        scheduled_collections=Count('collection_schedule'),
+    )
+    stats['total_value'] = stats['total_value'] or 0
+    return stats
+
+
+def encode_cursor(item):
+    raw = f'{item.created_at.isoformat()}|{item.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) for a cursor, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def items_page(user, cursor=None, page_size=DASHBOARD_PAGE_SIZE):
+    """
+    Return (items, next_cursor) for the page of a user's items after ``cursor``,
+    newest first. ``next_cursor`` is None on the last page.
+    """
+    items = (
+        EWasteItem.objects.filter(user=user)
+        .select_related('collection_schedule')
+        .order_by('-created_at', '-id')
+    )
+    position = decode_cursor(cursor)
+    if position is not None:
+        created_at, pk = position
+        items = items.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    # Fetch one extra row to learn whether another page follows
+    items = list(items[:page_size + 1])
+    if len(items) > page_size:
+        items = items[:page_size]
+        return items, encode_cursor(items[-1])
+    return items, None
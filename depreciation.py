@@ -0,0 +1,210 @@
+"""
+Depreciation curves fitted from recorded price history.
+
+A curve is ``max(floor, exp(-rate * age_years))``, the share of its price a
+device keeps at a given age. The nightly ``fit_depreciation_curves`` job
+fits one per device model with enough history from the monthly PriceRollup
+buckets, plus pooled curves per brand and per device type. It stores them in
+DepreciationCurve.
+
+Pricing reads them from ``depreciation_index``, an in-memory map rebuilt only
+when the curves change. Evaluating a curve is a dictionary lookup plus one
+exp(). Devices without a curve keep the fixed depreciation rules.
+"""
+import logging
+import math
+import threading
+from collections import defaultdict, namedtuple
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import DepreciationCurve, DeviceBrand, PriceRollup
+from .version_stamps import version_stamp
+
+logger = logging.getLogger(__name__)
+
+VERSION_STAMP = version_stamp('depreciation')
+
+# Fitting thresholds: monthly buckets per model, pooled buckets per brand or type
+MIN_MODEL_POINTS = 4
+MIN_GROUP_POINTS = 8
+# Shortest span of ages, in years, a model's history must cover
+MIN_AGE_SPAN = 0.5
+MAX_RATE = 2.0
+MIN_FLOOR = 0.05
+
+# Submitted items name some device types differently from the catalog
+ITEM_TYPE_ALIASES = {'mobile': 'phone'}
+
+
+class Curve(namedtuple('Curve', 'rate floor')):
+    __slots__ = ()
+
+    def multiplier(self, age, max_floor=1.0):
+        """
+        Share of the price kept at ``age`` years.
+
+        The stored floor is the lowest share seen in the history, which
+        rarely reaches the age where prices flatten; callers cap it at the
+        residual share of the fixed schedule the curve replaces, so the
+        curve does not go flat right after its oldest observation.
+        """
+        return max(min(self.floor, max_floor), math.exp(-self.rate * max(float(age), 0.0)))
+
+
+class _Fit:
+    """Running sums for a log-linear fit; pooled fits share the slope across models"""
+
+    def __init__(self):
+        self.sxx = 0.0
+        self.sxy = 0.0
+        self.points = 0
+        self.floor = 1.0
+
+    def add_model(self, points):
+        """Add one model's [(age, price)] points, centered on that model's own means"""
+        n = len(points)
+        mean_age = sum(age for age, _ in points) / n
+        mean_log = sum(math.log(price) for _, price in points) / n
+        sxx = sum((age - mean_age) ** 2 for age, _ in points)
+        sxy = sum((age - mean_age) * (math.log(price) - mean_log) for age, price in points)
+        # Floor: lowest observed share of the model's fitted price at age 0
+        rate = -sxy / sxx if sxx > 0 else 0.0
+        log_new_price = mean_log + rate * mean_age
+        floor = min(price / math.exp(log_new_price) for _, price in points)
+
+        self.sxx += sxx
+        self.sxy += sxy
+        self.points += n
+        self.floor = min(self.floor, floor)
+
+    def curve(self):
+        """The fitted Curve, or None when prices did not fall with age (the fixed schedule applies)"""
+        if self.sxx <= 0:
+            return None
+        rate = -self.sxy / self.sxx
+        if rate <= 0:
+            return None
+        return Curve(min(rate, MAX_RATE), min(max(self.floor, MIN_FLOOR), 1.0))
+
+
+def _age_years(bucket_start, release_year):
+    # Release dates are only known by year; assume mid-year
+    return max((bucket_start.toordinal() - bucket_start.replace(year=release_year, month=7, day=1).toordinal())
+               / 365.25, 0.0)
+
+
+def fit_curves():
+    """Fit curves from the monthly rollups and return unsaved DepreciationCurve rows"""
+    rows = (
+        PriceRollup.objects.filter(period='month', sample_count__gt=0)
+        .order_by('device_model_id', 'bucket_start')
+        .values_list('device_model_id', 'bucket_start', 'sum_price', 'sample_count',
+                     'device_model__release_year', 'device_model__brand_id', 'device_model__device_type')
+    )
+
+    curves = []
+    brand_fits = defaultdict(_Fit)
+    type_fits = defaultdict(_Fit)
+    brand_types = {}
+
+    def fit_model(model_id, brand_id, device_type, points):
+        if len(points) < 2:
+            return
+        model_fit = _Fit()
+        model_fit.add_model(points)
+        brand_fits[brand_id].add_model(points)
+        type_fits[device_type].add_model(points)
+        brand_types[brand_id] = device_type
+        age_span = max(age for age, _ in points) - min(age for age, _ in points)
+        if len(points) >= MIN_MODEL_POINTS and age_span >= MIN_AGE_SPAN:
+            _add_curve(curves, 'model', f'model:{model_id}', device_type, model_fit)
+
+    current, points = None, []
+    for model_id, bucket, total, count, release_year, brand_id, device_type in rows.iterator(chunk_size=5000):
+        if current is not None and model_id != current[0]:
+            fit_model(*current, points)
+            points = []
+        current = (model_id, brand_id, device_type)
+        price = float(total) / count
+        if price > 0:
+            points.append((_age_years(bucket, release_year), price))
+    if current is not None:
+        fit_model(*current, points)
+
+    for brand_id, fit in brand_fits.items():
+        if fit.points >= MIN_GROUP_POINTS:
+            _add_curve(curves, 'brand', f'brand:{brand_id}', brand_types[brand_id], fit)
+    for device_type, fit in type_fits.items():
+        if fit.points >= MIN_GROUP_POINTS:
+            _add_curve(curves, 'type', f'type:{device_type}', device_type, fit)
+    return curves
+
+
+def _add_curve(curves, scope, key, device_type, fit):
+    # A flat or rising fit would mean no depreciation at all; leave those devices on the fixed schedule
+    curve = fit.curve()
+    if curve is not None:
+        curves.append(DepreciationCurve(scope=scope, key=key, device_type=device_type,
+                                        rate=curve.rate, floor=curve.floor, sample_count=fit.points))
+
+
+class DepreciationIndex:
+    """In-memory curves by model, brand and device type, rebuilt when the stored curves change"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._curves = {}
+        self._brand_names = {}
+
+    def curve_for(self, device_model_id=None, brand_id=None, device_type=None):
+        """Most specific curve for a catalog device, or None to use the fixed rules"""
+        self._refresh_if_stale()
+        curves = self._curves
+        return (
+            curves.get(f'model:{device_model_id}')
+            or curves.get(f'brand:{brand_id}')
+            or curves.get(f'type:{device_type}')
+        )
+
+    def curve_for_item(self, item_type, brand_name=None):
+        """Curve for a submitted item, matched on its device type and brand name"""
+        self._refresh_if_stale()
+        device_type = ITEM_TYPE_ALIASES.get(item_type, item_type)
+        brand_id = self._brand_names.get((device_type, (brand_name or '').strip().lower()))
+        return self._curves.get(f'brand:{brand_id}') or self._curves.get(f'type:{device_type}')
+
+    def invalidate(self):
+        """Mark the index stale in every process"""
+        VERSION_STAMP.bump()
+        with self._lock:
+            self._version = None
+
+    def _refresh_if_stale(self):
+        version = VERSION_STAMP.get()
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._curves = {
+                    key: Curve(rate, floor)
+                    for key, rate, floor in DepreciationCurve.objects.values_list('key', 'rate', 'floor')
+                }
+                brand_ids = [int(key.split(':', 1)[1]) for key in self._curves if key.startswith('brand:')]
+                self._brand_names = {
+                    (device_type, name.lower()): pk
+                    for pk, device_type, name in DeviceBrand.objects.filter(pk__in=brand_ids)
+                    .values_list('id', 'device_type', 'name')
+                }
+                self._version = version
+                logger.info(f"Loaded {len(self._curves)} depreciation curves")
+
+
+depreciation_index = DepreciationIndex()
+
+
+@receiver([post_save, post_delete], sender=DepreciationCurve)
+def invalidate_depreciation_index(sender, **kwargs):
+    depreciation_index.invalidate()
@@ -110,3 +110,6 @@ class CollectionScheduleForm(forms.ModelForm):
             'preferred_time': forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}),
             'pickup_address': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
+        help_texts = {
+            'preferred_time': 'Pickups run in three windows: 9:00 - 12:00, 12:00 - 15:00 and 15:00 - 18:00',
+        }
@@ -0,0 +1,95 @@
+"""
+Content-hash deduplication for uploaded images.
+
+Uploads are hashed with SHA-256 from the bytes read for decoding. A repeated
+upload reuses the stored file and, once the detector has run, the cached
+analysis for the same detector version, instead of writing and analyzing
+the image again. Entries are evicted least-recently-used beyond
+``EWASTE_IMAGE_CACHE_MAX_ENTRIES``. Eviction only removes the cache row;
+the files stay, because items may still reference them.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ImageAnalysisCache
+
+logger = logging.getLogger(__name__)
+
+EVICTION_BATCH_SIZE = 500
+
+
+def detector_version():
+    return getattr(settings, 'EWASTE_DETECTOR_VERSION', 'default')
+
+
+def hash_bytes(data):
+    """Return the SHA-256 hex digest of an upload's bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def lookup(content_hash):
+    """Return the cache entry for ``content_hash`` and mark it used, or None"""
+    entry = ImageAnalysisCache.objects.filter(
+        content_hash=content_hash, model_version=detector_version()
+    ).first()
+    if entry is not None:
+        ImageAnalysisCache.objects.filter(pk=entry.pk).update(
+            hits=F('hits') + 1, last_used=timezone.now()
+        )
+    return entry
+
+
+def remember_upload(content_hash, image_name, thumbnail_name, size_bytes):
+    """Record a newly stored upload so that resubmissions can reuse it"""
+    try:
+        ImageAnalysisCache.objects.create(
+            content_hash=content_hash,
+            model_version=detector_version(),
+            image=image_name,
+            thumbnail=thumbnail_name,
+            size_bytes=size_bytes,
+        )
+    except IntegrityError:
+        # A concurrent submission of the same image got there first
+        return
+    evict()
+
+
+def store_results(content_hash, analysis_results, analyzed_image_name):
+    """Attach detector output to the cache entry for ``content_hash``"""
+    if not content_hash:
+        return
+    ImageAnalysisCache.objects.filter(
+        content_hash=content_hash, model_version=detector_version()
+    ).update(
+        analysis_results=analysis_results,
+        analyzed_image=analyzed_image_name,
+        last_used=timezone.now(),
+    )
+
+
+def cached_results(content_hash):
+    """Return (analysis_results, analyzed_image_name) if this image was already analyzed"""
+    if not content_hash:
+        return None
+    entry = lookup(content_hash)
+    if entry is None or entry.analysis_results is None:
+        return None
+    return entry.analysis_results, entry.analyzed_image.name
+
+
+def evict():
+    """Drop the least recently used entries beyond the configured maximum"""
+    max_entries = getattr(settings, 'EWASTE_IMAGE_CACHE_MAX_ENTRIES', 10000)
+    stale_ids = list(
+        ImageAnalysisCache.objects.order_by('-last_used')
+        .values_list('id', flat=True)[max_entries:max_entries + EVICTION_BATCH_SIZE]
+    )
+    if stale_ids:
+        ImageAnalysisCache.objects.filter(id__in=stale_ids).delete()
+        logger.info(f'Evicted {len(stale_ids)} image analysis cache entries')
@@ -0,0 +1,108 @@
+"""
+Upload pre-processing ahead of detection.
+
+The upload is decoded once from memory, rotated upright according to its
+EXIF orientation and downscaled to the detector's input resolution. Only
+that compressed copy and a small dashboard thumbnail are stored, never the
+full-resolution original.
+"""
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from .lazy_imports import cv2, np
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+# EXIF orientation value -> function turning the decoded pixels upright
+_ORIENTATION_FIXES = {
+    2: lambda img: cv2.flip(img, 1),
+    3: lambda img: cv2.rotate(img, cv2.ROTATE_180),
+    4: lambda img: cv2.flip(img, 0),
+    5: lambda img: cv2.transpose(img),
+    6: lambda img: cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE),
+    7: lambda img: cv2.rotate(cv2.transpose(img), cv2.ROTATE_180),
+    8: lambda img: cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE),
+}
+
+
+class PreparedImage:
+    """Encoded detector-sized image and thumbnail to store for an upload"""
+
+    def __init__(self, image_file, thumbnail_file):
+        self.image_file = image_file
+        self.thumbnail_file = thumbnail_file
+
+
+def read_upload(uploaded_file):
+    """Return the raw bytes of an UploadedFile, leaving it rewound"""
+    data = b''.join(uploaded_file.chunks())
+    uploaded_file.seek(0)
+    return data
+
+
+def exif_orientation(data):
+    """Read the EXIF orientation from the image header without decoding pixels"""
+    from PIL import Image
+
+    try:
+        with Image.open(BytesIO(data)) as header:
+            return header.getexif().get(EXIF_ORIENTATION_TAG, 1)
+    except Exception:
+        return 1
+
+
+def decode_image(data):
+    """Decode image bytes to an upright BGR array"""
+    pixels = cv2.imdecode(
+        np.frombuffer(data, dtype=np.uint8),
+        cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+    )
+    if pixels is None:
+        raise ValueError('Could not decode the uploaded image')
+
+    fix = _ORIENTATION_FIXES.get(exif_orientation(data))
+    return fix(pixels) if fix else pixels
+
+
+def downscale(pixels, max_side):
+    """Shrink so that the longer side is at most ``max_side``; never upscale"""
+    height, width = pixels.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return pixels
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(pixels, size, interpolation=cv2.INTER_AREA)
+
+
+def encode_jpeg(pixels, quality):
+    ok, buffer = cv2.imencode('.jpg', pixels, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError('Could not encode image')
+    return buffer.tobytes()
+
+
+def prepare_upload(data, original_name):
+    """Decode, normalize and downscale an upload, producing the files to store"""
+    stem = Path(original_name).stem
+    pixels = downscale(decode_image(data), getattr(settings, 'EWASTE_DETECTOR_INPUT_SIZE', 640))
+    thumbnail = downscale(pixels, getattr(settings, 'EWASTE_THUMBNAIL_SIZE', 320))
+
+    return PreparedImage(
+        image_file=ContentFile(
+            encode_jpeg(pixels, getattr(settings, 'EWASTE_IMAGE_JPEG_QUALITY', 85)), name=f'{stem}.jpg'
+        ),
+        thumbnail_file=ContentFile(
+            encode_jpeg(thumbnail, getattr(settings, 'EWASTE_THUMBNAIL_JPEG_QUALITY', 75)), name=f'{stem}_thumb.jpg'
+        ),
+    )
+
+
+def encode_analyzed_image(pixels, image_name):
+    """Encode the detector's annotated output as a JPEG named after the source image"""
+    return ContentFile(
+        encode_jpeg(pixels, getattr(settings, 'EWASTE_IMAGE_JPEG_QUALITY', 85)),
+        name=f'{Path(image_name).stem}_analyzed.jpg'
+    )
@@ -0,0 +1,181 @@
+"""
+Micro-batching front end for the image detector.
+
+Concurrent callers submit single images; a dispatcher thread collects them
+for up to ``max_wait_ms`` or ``max_batch_size`` images, runs them through
+the detector as one batch and resolves each caller's future with its own
+result. A bounded queue applies backpressure when the detector falls behind.
+
+Batching needs an ``analyze_batch`` method on the detector. Without one,
+each image runs as soon as it is dequeued, with no collection window, and
+the metrics report no batches.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+
+from .model_registry import registry
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceBusy(Exception):
+    """Raised when the inference queue is full"""
+
+
+class _Request:
+    __slots__ = ('image', 'future', 'enqueued_at')
+
+    def __init__(self, image):
+        self.image = image
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchingInferenceService:
+    """Collects concurrent analyze_image calls into detector batches"""
+
+    def __init__(self, model_name='image_analyzer', max_batch_size=8, max_wait_ms=20, max_queue_size=64):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        # Whether the detector takes batches; None until it has loaded
+        self._batching = None
+        self._metrics_lock = threading.Lock()
+        self._batches = 0
+        self._images = 0
+        self._rejected = 0
+        self._max_batch = 0
+        self._batch_size_counts = {}
+        self._total_wait = 0.0
+        self._total_inference = 0.0
+        self._total_batch_inference = 0.0
+
+    def submit(self, image, timeout=None):
+        """
+        Queue one image (a path or decoded array) and return a Future for its
+        ``(annotated_image, detections)`` result.
+
+        Waits up to ``timeout`` seconds for queue space (``None`` fails
+        immediately) and raises InferenceBusy if none frees up.
+        """
+        self._ensure_started()
+        request = _Request(image)
+        try:
+            if timeout is None:
+                self._queue.put_nowait(request)
+            else:
+                self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            with self._metrics_lock:
+                self._rejected += 1
+            raise InferenceBusy(f'Inference queue is full ({self._queue.maxsize} images waiting)')
+        return request.future
+
+    def analyze(self, image, queue_timeout=5, result_timeout=120):
+        """Blocking convenience wrapper around ``submit``"""
+        return self.submit(image, timeout=queue_timeout).result(timeout=result_timeout)
+
+    def metrics(self):
+        with self._metrics_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'batching': self._batching,
+                'batches': self._batches,
+                'images': self._images,
+                'rejected': self._rejected,
+                'mean_batch_size': round(self._images / self._batches, 2) if self._batches else 0,
+                'max_batch_size': self._max_batch,
+                'batch_size_counts': dict(self._batch_size_counts),
+                'mean_queue_wait_ms': round(1000 * self._total_wait / self._images, 2) if self._images else 0,
+                'mean_batch_inference_ms': (
+                    round(1000 * self._total_batch_inference / self._batches, 2) if self._batches else 0
+                ),
+                'mean_image_inference_ms': round(1000 * self._total_inference / self._images, 2) if self._images else 0,
+            }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ewaste-inference', daemon=True)
+                self._thread.start()
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        if not self._batching:
+            # One image per detector call anyway: waiting for more would only add latency
+            return batch
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            batched = False
+            try:
+                batched = self._run_batch(batch)
+            except Exception as e:
+                logger.error(f'Inference batch of {len(batch)} failed: {str(e)}')
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            finished = time.perf_counter()
+
+            with self._metrics_lock:
+                self._images += len(batch)
+                self._total_wait += sum(started - request.enqueued_at for request in batch)
+                self._total_inference += finished - started
+                if batched:
+                    self._batches += 1
+                    self._max_batch = max(self._max_batch, len(batch))
+                    self._batch_size_counts[len(batch)] = self._batch_size_counts.get(len(batch), 0) + 1
+                    self._total_batch_inference += finished - started
+
+    def _run_batch(self, batch):
+        """Run the detector over the batch; True if it was one batch call"""
+        images = [request.image for request in batch]
+        with registry.acquire(self.model_name) as analyzer:
+            self._batching = hasattr(analyzer, 'analyze_batch')
+            if self._batching:
+                results = analyzer.analyze_batch(images)
+            else:
+                # No batch entry point, so _collect_batch hands over one image at a time
+                results = []
+                for image in images:
+                    try:
+                        results.append(analyzer.analyze_image(image))
+                    except Exception as e:
+                        results.append(e)
+
+        for request, result in zip(batch, results):
+            if isinstance(result, Exception):
+                request.future.set_exception(result)
+            else:
+                request.future.set_result(result)
+        return self._batching
+
+
+inference_service = BatchingInferenceService(
+    max_batch_size=getattr(settings, 'EWASTE_INFERENCE_BATCH_SIZE', 8),
+    max_wait_ms=getattr(settings, 'EWASTE_INFERENCE_BATCH_WINDOW_MS', 20),
+    max_queue_size=getattr(settings, 'EWASTE_INFERENCE_MAX_QUEUE', 64),
+)
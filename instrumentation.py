@@ -0,0 +1,147 @@
+"""
+Low-overhead logging and timing for the prediction hot path.
+
+``StructuredLogger`` only formats an event when its level is enabled, so
+disabled DEBUG calls cost one level check. ``StageTimer`` times named
+stages for a configurable fraction of calls and keeps running aggregates.
+
+This module does not import Django at import time, so that ml_model.py and
+the training scripts can use it standalone. The sample rate is read from
+the Django settings when they are configured, otherwise from the environment.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+
+class _Fields:
+    """Formats ``key=value`` pairs only when a handler renders the record"""
+    __slots__ = ('fields',)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return ' '.join(f'{key}={value!r}' for key, value in self.fields.items())
+
+
+class StructuredLogger:
+    """Logs ``event key=value ...`` records, formatted lazily"""
+
+    def __init__(self, name):
+        self.logger = logging.getLogger(name)
+
+    def _log(self, level, event, fields, exc_info=None):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(
+                level, '%s %s', event, _Fields(fields),
+                extra={'event': event, 'fields': fields}, exc_info=exc_info
+            )
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, exc_info=None, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=exc_info)
+
+
+class _NullSample:
+    """Stand-in for unsampled calls; every stage is a no-op"""
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+
+_NULL_SAMPLE = _NullSample()
+
+
+class _Sample:
+    def __init__(self, timer):
+        self._timer = timer
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._timer.record(name, time.perf_counter() - started)
+
+
+def configured_sample_rate():
+    """
+    EWASTE_TIMING_SAMPLE_RATE from the Django settings, or from the
+    environment when running without Django (training and benchmark scripts)
+    """
+    try:
+        from django.conf import settings
+        from django.core.exceptions import ImproperlyConfigured
+    except ImportError:
+        pass
+    else:
+        try:
+            return float(getattr(settings, 'EWASTE_TIMING_SAMPLE_RATE'))
+        except (AttributeError, ImproperlyConfigured):
+            pass
+    return float(os.environ.get('EWASTE_TIMING_SAMPLE_RATE', 0.01))
+
+
+class StageTimer:
+    """Per-stage latency aggregates for a sampled fraction of calls"""
+
+    def __init__(self, sample_rate=None):
+        # None: read EWASTE_TIMING_SAMPLE_RATE on first use, once settings are loaded
+        self._sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    @property
+    def sample_rate(self):
+        if self._sample_rate is None:
+            self._sample_rate = configured_sample_rate()
+        return self._sample_rate
+
+    @sample_rate.setter
+    def sample_rate(self, value):
+        self._sample_rate = value
+
+    def sample(self):
+        """Return a sample to time this call's stages with, or a no-op stand-in"""
+        sample_rate = self.sample_rate
+        if sample_rate > 0 and random.random() < sample_rate:
+            return _Sample(self)
+        return _NULL_SAMPLE
+
+    def record(self, name, seconds):
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: {
+                    'samples': count,
+                    'mean_ms': round(1000 * total / count, 4),
+                    'max_ms': round(1000 * worst, 4),
+                }
+                for name, (count, total, worst) in self._stages.items()
+            }
+
+
+# Shared by ml_model.py and the ops stats view, which must not import ml_model
+prediction_timer = StageTimer()
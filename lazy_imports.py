@@ -0,0 +1,47 @@
+"""
+Deferred imports for the heavy ML and vision dependencies.
+
+Importing numpy, OpenCV, torch and friends costs seconds and hundreds of MB
+per process, and most processes never need them: ``manage.py migrate``,
+static pages, catalog lookups. Modules on the request path import these
+dependencies from here instead. The real import happens on first attribute
+access. Use ``python -m ewaste.benchmark_startup`` to check that nothing
+pulls them in eagerly.
+"""
+import importlib
+import sys
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+
+    def _load(self):
+        return importlib.import_module(self._name)
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        # Cache on the proxy so later lookups skip __getattr__
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        state = 'loaded' if self._name in sys.modules else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def is_loaded(name):
+    return name in sys.modules
+
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+# Modules that must not be imported when the app starts
+HEAVY_MODULES = ('cv2', 'numpy', 'torch', 'torchvision', 'ultralytics', 'sklearn', 'joblib', 'pandas')
@@ -0,0 +1,96 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from ewaste import views
+from ewaste.depreciation import depreciation_index
+from ewaste.material_values import material_value_table
+from ewaste.models import DeviceModel, EWasteItem
+from ewaste.query_audit import QueryBudgetExceeded, assert_max_queries, explain, full_scans
+from ewaste.quote_cache import quote_cache
+from ewaste.version_stamps import refresh_all
+
+# Tables large enough in production that a full scan is a regression
+LARGE_TABLES = ('ewaste_ewasteitem', 'ewaste_collectionschedule', 'ewaste_devicemodel', 'ewaste_pricehistory')
+
+# Caches are disabled during the audit, so each budget covers a cold request
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = 'Check query counts and plans of the hot views; exits non-zero on a regression'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True,
+                            help='User whose dashboard and items are audited')
+        parser.add_argument('--explain', action='store_true',
+                            help='Print the query plan of every SELECT')
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help='Also fail when a plan reads a large table without an index '
+                                 '(only meaningful on production-sized data)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}")
+
+        factory = RequestFactory()
+        failures = []
+        with override_settings(CACHES=NO_CACHE):
+            quote_cache.clear()
+            for label, budget, request_view in self._checks(factory, user):
+                # Version stamps are re-read every few seconds, not per request, so they are not counted
+                refresh_all()
+                try:
+                    with assert_max_queries(budget, label=label) as captured:
+                        request_view()
+                except QueryBudgetExceeded as e:
+                    failures.append(str(e))
+                    continue
+                self._report(label, budget, captured, options, failures)
+
+        if failures:
+            raise CommandError('\n\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All views are within their query budgets'))
+
+    def _checks(self, factory, user):
+        """Yield (label, query budget, callable that runs the view)"""
+        def call(view, request, *args):
+            request.user = user
+            return lambda: view(request, *args)
+
+        yield 'dashboard', 2, call(views.dashboard, factory.get('/dashboard/'))
+
+        item_id = EWasteItem.objects.filter(user=user).order_by('-created_at', '-id').values_list('id', flat=True).first()
+        if item_id is not None:
+            yield 'analysis_status', 1, call(views.analysis_status, factory.get('/'), item_id)
+
+        device = DeviceModel.objects.select_related('brand').order_by('id').first()
+        if device is not None:
+            yield 'get_brands', 1, call(views.get_brands, factory.get('/', {'type': device.device_type}))
+            yield 'get_models', 1, call(views.get_models, factory.get('/', {
+                'type': device.device_type, 'brand': device.brand.name
+            }))
+            body = json.dumps({'model_id': device.id, 'condition': 'working', 'age': 2})
+            # One query for the device; material values and curves come from in-memory tables, built here
+            material_value_table.total_for(device.device_type)
+            depreciation_index.curve_for(device.pk, device.brand_id, device.device_type)
+            yield 'calculate_price', 1, call(views.calculate_price, factory.post(
+                '/', body, content_type='application/json'
+            ))
+
+    def _report(self, label, budget, captured, options, failures):
+        self.stdout.write(f'{label}: {len(captured)} queries (budget {budget})')
+        if not (options['explain'] or options['fail_on_scan']):
+            return
+        plans = explain(captured)
+        if options['explain']:
+            for sql, plan in plans:
+                self.stdout.write(f'  {sql}\n    {plan.replace(chr(10), chr(10) + "    ")}')
+        if options['fail_on_scan']:
+            for sql, plan in full_scans(plans, LARGE_TABLES):
+                failures.append(f'{label} reads a large table without an index:\n  {sql}\n  {plan}')
@@ -0,0 +1,119 @@
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from ewaste.ml_model import ML_MODELS_DIR, encode_feature_matrix
+from ewaste.models import EWasteItem
+
+DEFAULT_OUTPUT_DIR = ML_MODELS_DIR / 'training_data'
+WATERMARK_FILE = 'watermark.json'
+
+FIELDS = (
+    'pk', 'updated_at', 'item_type', 'age', 'functional_status',
+    'battery_status', 'screen_condition', 'motherboard_status', 'price_estimation',
+)
+
+
+def read_watermark(output_dir):
+    """Return (updated_at, pk) of the last exported row, or None before the first export"""
+    path = Path(output_dir) / WATERMARK_FILE
+    if not path.exists():
+        return None
+    watermark = json.loads(path.read_text())
+    return datetime.fromisoformat(watermark['updated_at']), watermark['pk']
+
+
+def write_watermark(output_dir, updated_at, pk, rows):
+    path = Path(output_dir) / WATERMARK_FILE
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps({'updated_at': updated_at.isoformat(), 'pk': pk, 'rows': rows}))
+    # Replace atomically so an interrupted export never leaves a torn watermark
+    tmp_path.replace(path)
+
+
+def rows_since(watermark):
+    """Priced items past the watermark, in (updated_at, pk) order"""
+    items = EWasteItem.objects.filter(price_estimation__isnull=False)
+    if watermark is not None:
+        updated_at, pk = watermark
+        items = items.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, pk__gt=pk))
+    return items.order_by('updated_at', 'pk').values_list(*FIELDS)
+
+
+def encode_rows(rows):
+    """Encode (FIELDS) tuples as (ids, X, y) with the predictor's category maps"""
+    ids, _, item_types, ages, conditions, batteries, screens, motherboards, prices = zip(*rows)
+    X = encode_feature_matrix({
+        'device_type': item_types,
+        'age': ages,
+        'condition': conditions,
+        'battery_status': [status or 'na' for status in batteries],
+        'screen_condition': [status or 'na' for status in screens],
+        'motherboard_status': [status or 'na' for status in motherboards],
+    })
+    return np.array(ids, dtype=np.int64), X, np.array(prices, dtype=np.float64)
+
+
+class Command(BaseCommand):
+    help = 'Export priced e-waste items as npz training shards for python -m ewaste.train_model --data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(DEFAULT_OUTPUT_DIR),
+                            help='Directory for the shards and the watermark file')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched from the database per round trip')
+        parser.add_argument('--shard-rows', type=int, default=100000,
+                            help='Rows written per shard')
+        parser.add_argument('--full', action='store_true',
+                            help='Ignore the watermark, export every row and replace the existing shards')
+
+    def handle(self, *args, **options):
+        output_dir = Path(options['output'])
+        output_dir.mkdir(parents=True, exist_ok=True)
+        watermark = None if options['full'] else read_watermark(output_dir)
+        if watermark:
+            self.stdout.write(f'Exporting rows updated after {watermark[0].isoformat()}')
+
+        # Shards from one run sort after earlier runs, and train_model reads them in name order
+        run_stamp = time.strftime('%Y%m%d%H%M%S')
+        started = time.perf_counter()
+        exported = shards = 0
+        batch = []
+        last_row = None
+
+        for row in rows_since(watermark).iterator(chunk_size=options['chunk_size']):
+            batch.append(row)
+            if len(batch) >= options['shard_rows']:
+                self._write_shard(output_dir, f'part-{run_stamp}-{shards:05d}.npz', batch)
+                exported, shards, last_row = exported + len(batch), shards + 1, batch[-1]
+                batch = []
+        if batch:
+            self._write_shard(output_dir, f'part-{run_stamp}-{shards:05d}.npz', batch)
+            exported, shards, last_row = exported + len(batch), shards + 1, batch[-1]
+
+        if last_row is None:
+            self.stdout.write('No new rows to export')
+            return
+
+        # Only advance the watermark once every shard is on disk
+        write_watermark(output_dir, last_row[1], last_row[0], exported)
+        if options['full']:
+            # A full export supersedes the shards of earlier runs
+            for path in output_dir.glob('part-*.npz'):
+                if not path.name.startswith(f'part-{run_stamp}-'):
+                    path.unlink()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {exported} rows in {shards} shards to {output_dir} '
+            f'({exported / elapsed:,.0f} rows/s)'
+        ))
+
+    @staticmethod
+    def _write_shard(output_dir, name, rows):
+        ids, X, y = encode_rows(rows)
+        np.savez(output_dir / name, X=X, y=y, ids=ids)
@@ -0,0 +1,44 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from ewaste.depreciation import depreciation_index, fit_curves
+from ewaste.models import DepreciationCurve
+from ewaste.quote_cache import bump_pricing_version
+
+
+class Command(BaseCommand):
+    help = 'Refit the depreciation curves from the monthly price rollups (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Fit and report the curves without storing them')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        curves = fit_curves()
+        by_scope = Counter(curve.scope for curve in curves)
+
+        if not options['dry_run']:
+            with transaction.atomic():
+                # A queryset delete() would load every row to send its post_delete signal, each bumping the
+                # version stamps; nothing references curves, so delete them in one statement instead
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DELETE FROM {connection.ops.quote_name(DepreciationCurve._meta.db_table)}')
+                DepreciationCurve.objects.bulk_create(curves, batch_size=5000)
+            # Neither write sends signals: expire the index and cached quotes once, in every process
+            depreciation_index.invalidate()
+            bump_pricing_version()
+
+        if options['verbosity'] > 1:
+            for curve in curves:
+                self.stdout.write(f'{curve.key}: rate {curve.rate:.3f}/year, floor {curve.floor:.2f}, '
+                                  f'{curve.sample_count} points')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Fitted' if options['dry_run'] else 'Stored'} {len(curves)} depreciation curves "
+            f"({by_scope['model']} model, {by_scope['brand']} brand, {by_scope['type']} type) in {elapsed:.1f}s"
+        ))
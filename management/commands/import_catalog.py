@@ -0,0 +1,221 @@
+import csv
+import json
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from ewaste.catalog_cache import bump_catalog_version
+from ewaste.material_recovery import material_recovery_table
+from ewaste.material_values import material_value_table
+from ewaste.models import DeviceBrand, DeviceModel, DeviceModelComponent
+from ewaste.price_series import record_prices
+from ewaste.quote_cache import bump_pricing_version
+
+REQUIRED_FIELDS = ('device_type', 'brand', 'name', 'release_year', 'base_price')
+VALID_DEVICE_TYPES = {device_type for device_type, _ in DeviceModel.DEVICE_TYPES}
+
+
+def iter_records(stream, file_format):
+    """Yield raw catalog records from a CSV or JSON Lines stream"""
+    if file_format == 'csv':
+        for row in csv.DictReader(stream):
+            # Components come as a JSON list in an optional column
+            components = row.pop('components', None)
+            row['components'] = json.loads(components) if components else None
+            yield row
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def parse_record(record):
+    """Validate one record into (device_type, brand, name, release_year, base_price, components)"""
+    missing = [field for field in REQUIRED_FIELDS if record.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    device_type = str(record['device_type']).strip().lower()
+    if device_type not in VALID_DEVICE_TYPES:
+        raise ValueError(f'unknown device type {device_type!r}')
+    try:
+        base_price = Decimal(str(record['base_price'])).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"invalid base price {record['base_price']!r}")
+
+    components = None
+    if record.get('components') is not None:
+        components = [
+            (str(c['component_name']), str(c['material_name']), Decimal(str(c['weight'])))
+            for c in record['components']
+        ]
+    return (
+        device_type, str(record['brand']).strip(), str(record['name']).strip(),
+        int(record['release_year']), base_price, components,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Upsert a vendor device catalog (CSV or JSON Lines) into brands, models and components'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Catalog file, or '-' for standard input")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Records upserted per transaction')
+        parser.add_argument('--strict', action='store_true',
+                            help='Abort on the first invalid record instead of skipping it')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        stream = sys.stdin if path == '-' else open(path, newline='' if file_format == 'csv' else None,
+                                                      encoding='utf-8')
+
+        self._brands = {}
+        totals = {'models': 0, 'created': 0, 'price_changes': 0, 'components': 0, 'skipped': 0}
+        started = time.perf_counter()
+        try:
+            records = self._valid_records(iter_records(stream, file_format), options['strict'], totals)
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+                self._import_batch(batch, totals)
+                if options['verbosity'] > 1:
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(f"{totals['models']} models ({totals['models'] / elapsed:,.0f}/s)")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        # Bulk writes skip the signals that expire the catalog, quote and material tables; these stamps
+        # live in the database, so the bumps reach the web workers too
+        if totals['models']:
+            bump_catalog_version()
+            bump_pricing_version()
+            material_value_table.invalidate()
+            material_recovery_table.invalidate()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['models']} models ({totals['created']} new, {totals['price_changes']} price changes, "
+            f"{totals['components']} components) in {elapsed:.1f}s "
+            f"({totals['models'] / elapsed if elapsed else 0:,.0f} models/s); skipped {totals['skipped']} invalid records"
+        ))
+
+    def _valid_records(self, records, strict, totals):
+        for line_number, record in enumerate(records, start=1):
+            try:
+                yield parse_record(record)
+            except (ValueError, TypeError, KeyError) as e:
+                if strict:
+                    raise CommandError(f'Record {line_number}: {e}')
+                totals['skipped'] += 1
+                if totals['skipped'] <= 10:
+                    self.stderr.write(f'Skipping record {line_number}: {e}')
+
+    @transaction.atomic
+    def _import_batch(self, batch, totals):
+        # Later duplicates of a model in the same batch win
+        records = {record[:3]: record for record in batch}
+        brand_ids = self._brand_ids({(device_type, brand) for device_type, brand, _ in records})
+
+        # (brand_id, name) -> (pk, base_price) of the batch's models that already exist
+        existing = {
+            (brand_id, name): (pk, price)
+            for pk, brand_id, name, price in DeviceModel.objects.filter(
+                brand_id__in={brand_ids[device_type, brand] for device_type, brand, _ in records},
+                name__in={name for _, _, name in records}
+            ).values_list('id', 'brand_id', 'name', 'base_price')
+        }
+
+        models = {
+            key: DeviceModel(brand_id=brand_ids[device_type, brand], name=name, device_type=device_type,
+                             release_year=release_year, base_price=base_price)
+            for key, (device_type, brand, name, release_year, base_price, _) in records.items()
+        }
+        DeviceModel.objects.bulk_create(
+            list(models.values()), update_conflicts=True, unique_fields=['brand', 'name'],
+            update_fields=['device_type', 'release_year', 'base_price'],
+        )
+
+        self._resolve_ids(models.values(), existing)
+
+        # The update_price_history signal does not fire for bulk writes, so history is recorded here
+        created = [(model.pk, model.base_price) for model in models.values()
+                   if (model.brand_id, model.name) not in existing]
+        changed = [(model.pk, model.base_price) for model in models.values()
+                   if (model.brand_id, model.name) in existing
+                   and existing[model.brand_id, model.name][1] != model.base_price]
+        record_prices(created, notes='Initial price')
+        record_prices(changed, notes='Catalog import')
+
+        totals['models'] += len(models)
+        totals['created'] += len(created)
+        totals['price_changes'] += len(changed)
+        totals['components'] += self._replace_components(
+            [(models[key], record[5]) for key, record in records.items() if record[5] is not None]
+        )
+
+    @staticmethod
+    def _resolve_ids(models, existing):
+        """Set the pk of every upserted model"""
+        for model in models:
+            if (model.brand_id, model.name) in existing:
+                model.pk = existing[model.brand_id, model.name][0]
+        new_models = [model for model in models if model.pk is None]
+        if new_models:
+            # Backends that do not return ids from an upsert: look up the new rows
+            ids = {
+                (brand_id, name): pk
+                for pk, brand_id, name in DeviceModel.objects.filter(
+                    brand_id__in={model.brand_id for model in new_models},
+                    name__in={model.name for model in new_models}
+                ).values_list('id', 'brand_id', 'name')
+            }
+            for model in new_models:
+                model.pk = ids[model.brand_id, model.name]
+
+    def _brand_ids(self, brand_keys):
+        """Map (device_type, brand name) to DeviceBrand ids, creating missing brands"""
+        missing = brand_keys - self._brands.keys()
+        if missing:
+            DeviceBrand.objects.bulk_create(
+                [DeviceBrand(device_type=device_type, name=name) for device_type, name in missing],
+                ignore_conflicts=True
+            )
+            for pk, device_type, name in DeviceBrand.objects.filter(
+                device_type__in={device_type for device_type, _ in missing},
+                name__in={name for _, name in missing}
+            ).values_list('id', 'device_type', 'name'):
+                self._brands[device_type, name] = pk
+        return self._brands
+
+    @staticmethod
+    def _replace_components(model_components):
+        """Replace the components of every model whose record lists them"""
+        if not model_components:
+            return 0
+        # Plain DELETE: a queryset delete() would load each row to send post_delete signals that bump the
+        # material and pricing stamps per row; handle() bumps them once at the end instead
+        model_ids = [model.pk for model, _ in model_components]
+        field = DeviceModelComponent._meta.get_field('device_model')
+        table = connection.ops.quote_name(DeviceModelComponent._meta.db_table)
+        column = connection.ops.quote_name(field.column)
+        chunk_size = connection.ops.bulk_batch_size([field], model_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(model_ids), chunk_size):
+                chunk = model_ids[start:start + chunk_size]
+                cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(chunk))})", chunk)
+        components = DeviceModelComponent.objects.bulk_create([
+            DeviceModelComponent(device_model_id=model.pk, component_name=component_name,
+                                 material_name=material_name, weight=weight)
+            for model, components in model_components
+            for component_name, material_name, weight in components
+        ], ignore_conflicts=True)
+        return len(components)
@@ -0,0 +1,66 @@
+import csv
+import sys
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ewaste.models import GeocodedAddress
+from ewaste.scheduling import address_key, default_zone, encode_geohash
+
+
+class Command(BaseCommand):
+    help = 'Load pickup address geocodes (CSV with address, latitude, longitude and optional zone columns)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Geocode CSV file, or '-' for standard input")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Addresses upserted per query')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        self._skipped = 0
+        imported = 0
+        try:
+            rows = self._addresses(csv.DictReader(stream))
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                # Later rows for the same address win
+                batch = list({address.address_key: address for address in batch}.values())
+                GeocodedAddress.objects.bulk_create(
+                    batch, update_conflicts=True, unique_fields=['address_key'],
+                    update_fields=['address', 'latitude', 'longitude', 'geohash', 'zone'],
+                )
+                imported += len(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} geocoded addresses; skipped {self._skipped} invalid rows'
+        ))
+
+    def _addresses(self, rows):
+        for line_number, row in enumerate(rows, start=2):
+            try:
+                address = row['address'].strip()
+                latitude, longitude = float(row['latitude']), float(row['longitude'])
+            except KeyError as e:
+                raise CommandError(f'Missing column {e}')
+            except (TypeError, ValueError) as e:
+                self._skip(line_number, e)
+                continue
+            if not address or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                self._skip(line_number, 'missing address or coordinates out of range')
+                continue
+            geohash = encode_geohash(latitude, longitude)
+            yield GeocodedAddress(
+                address_key=address_key(address), address=address, latitude=latitude, longitude=longitude,
+                geohash=geohash, zone=(row.get('zone') or '').strip() or default_zone(geohash),
+            )
+
+    def _skip(self, line_number, reason):
+        self._skipped += 1
+        if self._skipped <= 10:
+            self.stderr.write(f'Skipping line {line_number}: {reason}')
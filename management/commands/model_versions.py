@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ewaste.model_store import DEFAULT_STORE_DIR, ModelStore, ModelStoreError
+
+
+class Command(BaseCommand):
+    help = 'List, activate, shadow or prune price model versions in the model store'
+
+    def add_arguments(self, parser):
+        subcommands = parser.add_subparsers(dest='action', required=True)
+        subcommands.add_parser('list', help='Show published versions and which ones are live')
+        activate = subcommands.add_parser('activate', help='Serve a version (also used to roll back)')
+        activate.add_argument('version')
+        shadow = subcommands.add_parser('shadow', help='Score versions alongside the active one; none clears')
+        shadow.add_argument('versions', nargs='*')
+        prune = subcommands.add_parser('prune', help='Delete old versions that are neither active nor shadow')
+        prune.add_argument('--keep', type=int, default=5)
+
+    def handle(self, *args, **options):
+        store = ModelStore(getattr(settings, 'EWASTE_MODEL_STORE_DIR', DEFAULT_STORE_DIR))
+        try:
+            if options['action'] == 'activate':
+                store.activate(options['version'])
+                self.stdout.write(self.style.SUCCESS(f"Activated {options['version']}"))
+            elif options['action'] == 'shadow':
+                store.set_shadows(options['versions'])
+                self.stdout.write(self.style.SUCCESS(f"Shadow versions: {', '.join(options['versions']) or 'none'}"))
+            elif options['action'] == 'prune':
+                removed = store.prune(options['keep'])
+                self.stdout.write(self.style.SUCCESS(f"Removed {len(removed)} versions"))
+            else:
+                self._list(store)
+        except ModelStoreError as e:
+            raise CommandError(str(e))
+
+    def _list(self, store):
+        manifest = store.read_manifest()
+        if not manifest['versions']:
+            self.stdout.write(f'No versions published in {store.root}')
+            return
+        for version, entry in sorted(manifest['versions'].items(), key=lambda item: item[1]['published_at']):
+            if version == manifest['active']:
+                state = 'active'
+            elif version in manifest['shadows']:
+                state = 'shadow'
+            else:
+                state = ''
+            self.stdout.write(f"{version:<20} {entry['published_at']:<34} {entry['sha256'][:12]}  {state}")
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ewaste.scheduling import open_slots
+
+
+class Command(BaseCommand):
+    help = 'Create pickup slots for every zone and window over the coming days (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=14,
+                            help='Open slots for this many days, starting tomorrow')
+        parser.add_argument('--capacity', type=int,
+                            help='Pickups per slot (default: EWASTE_SLOT_CAPACITY)')
+        parser.add_argument('--zone', dest='zones', action='append',
+                            help='Only open slots in this zone (may be repeated; default: every geocoded zone)')
+
+    def handle(self, *args, **options):
+        capacity = options['capacity'] or getattr(settings, 'EWASTE_SLOT_CAPACITY', 40)
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        dates = [tomorrow + timedelta(days=offset) for offset in range(options['days'])]
+        created = open_slots(dates, capacity, options['zones'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Opened {created} slots of {capacity} pickups from {dates[0]} to {dates[-1]}'
+        ))
@@ -0,0 +1,76 @@
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ewaste.scheduling import route_stops, save_vehicle_routes
+
+
+def parse_depot(value):
+    """NAME:LATITUDE,LONGITUDE"""
+    try:
+        name, coordinates = value.split(':', 1)
+        latitude, longitude = (float(part) for part in coordinates.split(','))
+    except ValueError:
+        raise CommandError(f'Invalid depot {value!r}, expected NAME:LATITUDE,LONGITUDE')
+    return name, latitude, longitude
+
+
+class Command(BaseCommand):
+    help = "Order a day's confirmed collections into vehicle routes from each depot"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to route, YYYY-MM-DD (default: tomorrow)')
+        parser.add_argument('--depot', dest='depots', action='append', type=parse_depot,
+                            help='Depot as NAME:LATITUDE,LONGITUDE (may be repeated; default: EWASTE_DEPOTS)')
+        parser.add_argument('--vehicles', type=int,
+                            help='Vehicles per depot (default: EWASTE_VEHICLES_PER_DEPOT)')
+        parser.add_argument('--capacity-kg', type=float,
+                            help='Capacity of each vehicle (default: EWASTE_VEHICLE_CAPACITY_KG)')
+        parser.add_argument('--time-limit', type=float,
+                            help='Seconds of route improvement per depot (default: until no move helps)')
+        parser.add_argument('--processes', type=int,
+                            help='Worker processes for multiple depots (default: one per CPU)')
+
+    def handle(self, *args, **options):
+        from ewaste.route_optimizer import Depot, assign_to_depots, solve_depots
+
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else timezone.localdate() + timedelta(days=1)
+        except ValueError:
+            raise CommandError(f"Invalid date {options['date']!r}, expected YYYY-MM-DD")
+        depots = [Depot(*depot) for depot in options['depots'] or getattr(settings, 'EWASTE_DEPOTS', [])]
+        if not depots:
+            raise CommandError('No depots: pass --depot or set EWASTE_DEPOTS')
+        vehicles = options['vehicles'] or getattr(settings, 'EWASTE_VEHICLES_PER_DEPOT', 10)
+        capacity = options['capacity_kg'] or getattr(settings, 'EWASTE_VEHICLE_CAPACITY_KG', 500)
+
+        started = time.perf_counter()
+        stops, unlocated = route_stops(day)
+        capacities = [capacity] * vehicles
+        solutions = solve_depots(
+            [(depot, depot_stops, capacities) for depot, depot_stops in zip(depots, assign_to_depots(depots, stops))],
+            processes=options['processes'],
+            speed_kmh=getattr(settings, 'EWASTE_ROUTE_SPEED_KMH', 25),
+            service_minutes=getattr(settings, 'EWASTE_PICKUP_SERVICE_MINUTES', 10),
+            time_limit=options['time_limit'],
+        )
+        routes = save_vehicle_routes(day, solutions)
+        elapsed = time.perf_counter() - started
+
+        for solution in solutions:
+            self.stdout.write(f'{solution.depot.name}: {len(solution.routes)} routes, '
+                              f'{solution.distance_km:,.1f} km, {len(solution.unassigned)} stops unassigned')
+            if options['verbosity'] > 1:
+                for route in solution.routes:
+                    self.stdout.write(f'  vehicle {route.vehicle + 1}: {len(route.stops)} stops, '
+                                      f'{route.load_kg:,.0f} kg, {route.distance_km:,.1f} km')
+        unassigned = sum(len(solution.unassigned) for solution in solutions)
+        if unassigned or unlocated:
+            self.stderr.write(f'{unassigned} collections did not fit any vehicle and {len(unlocated)} '
+                              f'have no geocoded address; they are left off the routes')
+        self.stdout.write(self.style.SUCCESS(
+            f'Saved {len(routes)} vehicle routes for {day} in {elapsed:.1f}s'
+        ))
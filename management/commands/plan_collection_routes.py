@@ -0,0 +1,34 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ewaste.scheduling import plan_routes
+
+
+class Command(BaseCommand):
+    help = "Group a day's confirmed collections into pickup routes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to plan, YYYY-MM-DD (default: tomorrow)')
+        parser.add_argument('--max-stops', type=int,
+                            help='Stops per route (default: EWASTE_ROUTE_MAX_STOPS)')
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else timezone.localdate() + timedelta(days=1)
+        except ValueError:
+            raise CommandError(f"Invalid date {options['date']!r}, expected YYYY-MM-DD")
+
+        started = time.perf_counter()
+        routes = plan_routes(day, max_stops=options['max_stops'])
+        elapsed = time.perf_counter() - started
+
+        if options['verbosity'] > 1:
+            for route in routes:
+                self.stdout.write(str(route))
+        self.stdout.write(self.style.SUCCESS(
+            f'Planned {len(routes)} routes with {sum(route.stop_count for route in routes)} stops '
+            f'for {day} in {elapsed:.1f}s'
+        ))
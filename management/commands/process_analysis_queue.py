@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ewaste.analysis_pipeline import DEFAULT_STALE_AFTER, pending_item_ids, process_item, requeue_stale
+
+
+class Command(BaseCommand):
+    help = 'Analyze e-waste items waiting in the pending analysis queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Number of pending items fetched per pass')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for new items instead of exiting when the queue is empty')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep between polls when the queue is empty')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Items analyzed concurrently, so the detector can batch them')
+        parser.add_argument('--stale-minutes', type=int,
+                            default=int(DEFAULT_STALE_AFTER.total_seconds() // 60),
+                            help='Requeue items stuck in processing for longer than this')
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(minutes=options['stale_minutes'])
+        processed = 0
+        executor = ThreadPoolExecutor(max_workers=options['concurrency'])
+
+        while True:
+            requeued = requeue_stale(stale_after)
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale items')
+
+            item_ids = pending_item_ids(options['batch_size'])
+            processed += sum(executor.map(self._process, item_ids))
+
+            if not item_ids:
+                if not options['loop']:
+                    break
+                time.sleep(options['poll_interval'])
+
+        executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} items'))
+
+    @staticmethod
+    def _process(item_id):
+        try:
+            return process_item(item_id)
+        finally:
+            close_old_connections()
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from ewaste.price_series import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily and monthly price rollups from PriceHistory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', dest='model_ids', type=int, action='append',
+                            help='Only rebuild this device model (may be repeated)')
+
+    def handle(self, *args, **options):
+        written = rebuild_rollups(options['model_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} price rollup buckets'))
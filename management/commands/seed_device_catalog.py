@@ -0,0 +1,219 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ewaste.catalog_cache import bump_catalog_version
+from ewaste.models import DeviceBrand, DeviceModel
+
+# Release years below are relative to this year
+CURRENT_YEAR = 2025
+
+SEED_BRANDS = {
+    'phone': [
+        'Apple', 'Google', 'OnePlus', 'Samsung', 'Xiaomi',
+        'OPPO', 'Vivo', 'Realme', 'Nothing', 'Motorola'
+    ],
+    'laptop': [
+        'Apple', 'Dell', 'HP', 'Lenovo', 'Acer',
+        'ASUS', 'MSI', 'Razer', 'Microsoft', 'LG'
+    ],
+    'tablet': [
+        'Apple', 'Samsung', 'Microsoft', 'Lenovo',
+        'Xiaomi', 'HUAWEI', 'Realme', 'OPPO'
+    ],
+    'tv': [
+        'Samsung', 'LG', 'Sony', 'TCL', 'Hisense',
+        'OnePlus', 'Xiaomi', 'Vu', 'Panasonic'
+    ],
+    'console': [
+        'Sony', 'Microsoft', 'Nintendo',
+        'Sega', 'Atari', 'Steam'
+    ],
+}
+
+# (name, years before CURRENT_YEAR, base price) per (device type, brand)
+SEED_MODELS = {
+    ('phone', 'Apple'): [
+        ('iPhone 15 Pro Max', 0, 159900),
+        ('iPhone 15 Pro', 0, 134900),
+        ('iPhone 15', 0, 79900),
+        ('iPhone 14 Pro', 1, 119900),
+        ('iPhone 14', 1, 69900),
+        ('iPhone 13', 2, 59900),
+        ('iPhone 12', 3, 49900)
+    ],
+    ('phone', 'Samsung'): [
+        ('Galaxy S24 Ultra', 0, 129900),
+        ('Galaxy S24+', 0, 99900),
+        ('Galaxy S24', 0, 79900),
+        ('Galaxy S23 Ultra', 1, 124900),
+        ('Galaxy S23', 1, 74900),
+        ('Galaxy A54', 1, 38900)
+    ],
+    ('phone', 'Google'): [
+        ('Pixel 8 Pro', 0, 106900),
+        ('Pixel 8', 0, 75900),
+        ('Pixel 7a', 1, 39900),
+        ('Pixel 7', 1, 59900),
+        ('Pixel 6a', 2, 29900)
+    ],
+    ('phone', 'OnePlus'): [
+        ('12', 0, 64900),
+        ('11', 1, 56900),
+        ('Nord 3', 1, 33900),
+        ('10 Pro', 2, 49900)
+    ],
+    ('phone', 'Nothing'): [
+        ('Phone (2)', 0, 44900),
+        ('Phone (1)', 1, 32900)
+    ],
+    ('phone', 'Xiaomi'): [
+        ('13 Pro', 0, 79900),
+        ('12 Pro', 1, 62900),
+        ('Note 12 Pro', 1, 29900)
+    ],
+    ('laptop', 'Apple'): [
+        ('MacBook Pro 16" M3 Max', 0, 399900),
+        ('MacBook Pro 14" M3 Pro', 0, 249900),
+        ('MacBook Air 15" M2', 1, 154900),
+        ('MacBook Air 13" M1', 2, 99900)
+    ],
+    ('laptop', 'ASUS'): [
+        ('ROG Zephyrus', 0, 224900),
+        ('TUF Gaming', 0, 124900),
+        ('VivoBook Pro', 1, 89900),
+        ('VivoBook', 1, 54900)
+    ],
+    ('laptop', 'MSI'): [
+        ('Titan', 0, 399900),
+        ('Raider', 0, 299900),
+        ('Stealth', 1, 199900),
+        ('Katana', 1, 99900)
+    ],
+    ('laptop', 'Razer'): [
+        ('Blade 18', 0, 399900),
+        ('Blade 16', 0, 299900),
+        ('Blade 14', 1, 199900)
+    ],
+    ('tablet', 'Apple'): [
+        ('iPad Pro 12.9" M2', 0, 119900),
+        ('iPad Pro 11" M2', 0, 89900),
+        ('iPad Air M1', 1, 59900),
+        ('iPad 10th Gen', 2, 44900)
+    ],
+    ('tablet', 'Samsung'): [
+        ('Galaxy Tab S9 Ultra', 0, 108900),
+        ('Galaxy Tab S9+', 0, 89900),
+        ('Galaxy Tab S9', 0, 74900),
+        ('Galaxy Tab S8', 1, 58900)
+    ],
+    ('tablet', 'Microsoft'): [
+        ('Surface Pro 9', 0, 149900),
+        ('Surface Pro 8', 1, 119900),
+        ('Surface Go 4', 0, 79900)
+    ],
+    ('console', 'Sony'): [
+        ('PlayStation 5 Pro', 0, 59900),
+        ('PlayStation 5', 2, 49900),
+        ('PlayStation 4 Pro', 6, 29900)
+    ],
+    ('console', 'Microsoft'): [
+        ('Xbox Series X', 2, 49900),
+        ('Xbox Series S', 2, 29900)
+    ],
+    ('console', 'Nintendo'): [
+        ('Switch OLED', 3, 34900),
+        ('Switch', 5, 29900),
+        ('Switch Lite', 4, 19900)
+    ],
+    ('console', 'Steam'): [
+        ('Steam Deck OLED', 0, 54900),
+        ('Steam Deck LCD', 1, 39900)
+    ],
+}
+
+# Brands sharing a generic line-up; '{brand}' is replaced with the brand name
+TEMPLATE_MODELS = {
+    ('phone', ('OPPO', 'Vivo', 'Realme')): [
+        ('{brand} Flagship', 0, 54900),
+        ('{brand} Mid-range', 1, 32900),
+        ('{brand} Budget', 1, 18900)
+    ],
+    ('laptop', ('Dell', 'HP', 'Lenovo')): [
+        ('{brand} Premium Pro', 0, 189900),
+        ('{brand} Premium', 0, 129900),
+        ('{brand} Mid-range', 1, 79900),
+        ('{brand} Entry', 2, 49900)
+    ],
+    ('tablet', ('Xiaomi', 'Realme', 'OPPO')): [
+        ('{brand} Premium Tab', 0, 45900),
+        ('{brand} Mid Tab', 1, 28900),
+        ('{brand} Basic Tab', 1, 15900)
+    ],
+}
+
+# TV prices for 75", 65", 55" and 50" sets
+TV_PRICES = {
+    'Samsung': [249900, 199900, 149900, 99900],
+    'LG': [239900, 189900, 139900, 89900],
+    'Sony': [299900, 249900, 189900, 129900],
+    'OnePlus': [149900, 119900, 89900, 59900],
+    'TCL': [99900, 79900, 59900, 39900],
+    'Xiaomi': [89900, 69900, 49900, 34900],
+    'Vu': [79900, 59900, 44900, 29900]
+}
+DEFAULT_TV_PRICES = [99900, 79900, 59900, 39900]
+
+
+def seed_models(device_type, brand_name):
+    """Return (name, release_year, base_price) tuples to seed for a brand"""
+    if device_type == 'tv':
+        prices = TV_PRICES.get(brand_name, DEFAULT_TV_PRICES)
+        models = [
+            (f'{brand_name} 75" Premium OLED', 0, prices[0]),
+            (f'{brand_name} 65" OLED', 0, prices[1]),
+            (f'{brand_name} 55" QLED', 1, prices[2]),
+            (f'{brand_name} 50" LED', 2, prices[3])
+        ]
+    else:
+        models = SEED_MODELS.get((device_type, brand_name), [])
+        for (template_type, brands), template in TEMPLATE_MODELS.items():
+            if template_type == device_type and brand_name in brands:
+                models = [(name.format(brand=brand_name), age, price) for name, age, price in template]
+    return [(name, CURRENT_YEAR - age, price) for name, age, price in models]
+
+
+class Command(BaseCommand):
+    help = 'Seed the device catalog with the default brands and models'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', dest='device_types', action='append',
+                            choices=sorted(SEED_BRANDS),
+                            help='Only seed this device type (may be repeated)')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        device_types = options['device_types'] or sorted(SEED_BRANDS)
+
+        DeviceBrand.objects.bulk_create(
+            [DeviceBrand(name=name, device_type=device_type)
+             for device_type in device_types for name in SEED_BRANDS[device_type]],
+            ignore_conflicts=True
+        )
+        brands = {
+            (brand.device_type, brand.name): brand
+            for brand in DeviceBrand.objects.filter(device_type__in=device_types)
+        }
+
+        models = [
+            DeviceModel(brand=brand, name=name, device_type=device_type, release_year=year, base_price=price)
+            for (device_type, brand_name), brand in brands.items()
+            for name, year, price in seed_models(device_type, brand_name)
+        ]
+        # Existing models keep their current prices
+        DeviceModel.objects.bulk_create(models, ignore_conflicts=True)
+
+        # bulk_create skips the signals that normally expire the catalog cache
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(brands)} brands and {len(models)} models for {", ".join(device_types)}'
+        ))
@@ -0,0 +1,260 @@
+"""
+Recoverable material mass and value per catalog model and per lot.
+
+Two dense matrices are built once from the catalog:
+
+* weights, models x components: grams of each component in each model,
+  from DeviceModelComponent.
+* composition, components x materials: the share of each material in a
+  component. It comes from the DeviceComponent percentages when a
+  DeviceComponent has the component's name. Otherwise the component is
+  all of its row's material_name.
+
+``weights @ composition`` is then the contained mass of every material in
+every model. Multiplying by the recovery rates gives the recoverable
+mass, and multiplying that by the material prices gives its value.
+Device types get the average of their models, and types without
+component data get the default weights from ``material_values``.
+
+Valuing a lot is then a bincount of its items over those rows and one
+vector-matrix product, so thousands of items take milliseconds. The
+matrices are rebuilt only after components, compositions or material
+prices change, in any process (see ``version_stamps``).
+"""
+import logging
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .depreciation import ITEM_TYPE_ALIASES
+from .lazy_imports import np
+from .material_values import DEFAULT_MATERIAL_WEIGHTS, DEFAULT_OTHER_WEIGHTS, material_prices
+from .models import DeviceComponent, DeviceModelComponent, MaterialPrice
+from .version_stamps import version_stamp
+
+logger = logging.getLogger(__name__)
+
+VERSION_STAMP = version_stamp('material-recovery')
+
+# DeviceComponent percentage fields by material
+COMPOSITION_FIELDS = {
+    'copper': 'copper_percentage',
+    'gold': 'gold_percentage',
+    'silver': 'silver_percentage',
+    'plastic': 'plastic_percentage',
+    'aluminum': 'aluminum_percentage',
+    'steel': 'steel_percentage',
+}
+
+LotValuation = namedtuple('LotValuation', 'items matched recoverable_g value total_value')
+
+
+class MaterialRecoveryTable:
+    """Contained and recoverable material per catalog model, rebuilt when the source rows change"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._state = None
+
+    def model_materials(self, device_model_id):
+        """
+        {material: {'contained_g', 'recoverable_g', 'value'}} for a catalog model.
+
+        Models without component data get their device type's figures
+        only through ``value_lot``; here they return an empty mapping.
+        """
+        state = self._current()
+        row = state.model_rows.get(device_model_id)
+        if row is None:
+            return {}
+        return {
+            material: {
+                'contained_g': float(state.contained[row, column]),
+                'recoverable_g': float(state.recoverable[row, column]),
+                'value': float(state.recoverable[row, column] * state.prices[column]),
+            }
+            for column, material in enumerate(state.materials)
+            if state.contained[row, column] > 0
+        }
+
+    def material_weight(self, device_model_id, material_name):
+        """Grams of ``material_name`` contained in a catalog model, over all its components"""
+        state = self._current()
+        row = state.model_rows.get(device_model_id)
+        column = state.material_columns.get(material_name.lower())
+        if row is None or column is None:
+            return 0.0
+        return float(state.contained[row, column])
+
+    def model_values(self, device_model_ids):
+        """Recoverable material value in INR of each catalog model, NaN for models without component data"""
+        state = self._current()
+        rows = np.array([state.model_rows.get(pk, -1) for pk in device_model_ids], dtype=np.intp)
+        return np.where(rows >= 0, state.row_values[rows], np.nan)
+
+    def rows_for_items(self, items):
+        """
+        Matrix row of each (item_type, brand, model) and how many matched a catalog model.
+
+        Unmatched items fall back to their device type's row.
+        """
+        state = self._current()
+        rows = np.empty(len(items), dtype=np.intp)
+        matched = 0
+        for i, (item_type, brand, model) in enumerate(items):
+            row = state.name_rows.get(((brand or '').strip().lower(), (model or '').strip().lower()))
+            if row is None:
+                device_type = ITEM_TYPE_ALIASES.get(item_type, item_type)
+                row = state.type_rows.get(device_type, state.other_row)
+            else:
+                matched += 1
+            rows[i] = row
+        return rows, matched
+
+    def value_lot(self, items):
+        """Recoverable mass and value of a lot of (item_type, brand, model) items"""
+        state = self._current()
+        rows, matched = self.rows_for_items(items)
+        counts = np.bincount(rows, minlength=len(state.row_values)).astype(np.float64)
+        recoverable = counts @ state.recoverable
+        value = recoverable * state.prices
+        return LotValuation(
+            items=len(items),
+            matched=matched,
+            recoverable_g={m: float(g) for m, g in zip(state.materials, recoverable) if g > 0},
+            value={m: float(v) for m, v in zip(state.materials, value) if v > 0},
+            total_value=float(value.sum()),
+        )
+
+    def invalidate(self):
+        """Mark the table stale in every process"""
+        VERSION_STAMP.bump()
+        with self._lock:
+            self._version = None
+
+    def _current(self):
+        version = VERSION_STAMP.get()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._state = _build()
+                    self._version = version
+        return self._state
+
+
+_State = namedtuple('_State', 'materials material_columns prices weights composition contained recoverable '
+                              'row_values model_rows name_rows type_rows other_row')
+
+
+def _build():
+    compositions = {
+        name.lower(): {material: float(share or 0) / 100 for material, share in zip(COMPOSITION_FIELDS, shares)}
+        for name, *shares in DeviceComponent.objects.values_list('name', *COMPOSITION_FIELDS.values())
+    }
+
+    model_rows, name_rows, model_types = {}, {}, []
+    component_columns, component_materials = {}, []
+    cells = []
+    for model_id, device_type, brand, name, component, material, weight in (
+        DeviceModelComponent.objects.values_list(
+            'device_model_id', 'device_model__device_type', 'device_model__brand__name', 'device_model__name',
+            'component_name', 'material_name', 'weight',
+        ).iterator(chunk_size=5000)
+    ):
+        row = model_rows.get(model_id)
+        if row is None:
+            row = model_rows[model_id] = len(model_types)
+            name_rows[brand.lower(), name.lower()] = row
+            model_types.append(device_type)
+        component = component.lower()
+        # A component without a DeviceComponent composition is all of its row's material
+        key = component if component in compositions else f'{component}:{material.lower()}'
+        column = component_columns.get(key)
+        if column is None:
+            column = component_columns[key] = len(component_materials)
+            component_materials.append(compositions.get(component) or {material.lower(): 1.0})
+        cells.append((row, column, float(weight or 0)))
+
+    prices = material_prices()
+    materials = sorted(
+        set(COMPOSITION_FIELDS) | set(prices)
+        | {material for shares in component_materials for material in shares}
+        | {material for weights in DEFAULT_MATERIAL_WEIGHTS.values() for material in weights}
+    )
+    material_columns = {material: column for column, material in enumerate(materials)}
+
+    weights = np.zeros((len(model_types), len(component_materials)))
+    if cells:
+        rows, columns, grams = zip(*cells)
+        np.add.at(weights, (np.array(rows), np.array(columns)), np.array(grams))
+    composition = np.zeros((len(component_materials), len(materials)))
+    for column, shares in enumerate(component_materials):
+        for material, share in shares.items():
+            composition[column, material_columns[material]] = share
+
+    # Contained grams per model, then one averaged row per device type, then the defaults
+    model_contained = weights @ composition
+    type_rows, extra_rows = {}, []
+    type_index = {}
+    for device_type in model_types:
+        type_index.setdefault(device_type, len(type_index))
+    if model_types:
+        type_of_row = np.array([type_index[device_type] for device_type in model_types])
+        type_sums = np.zeros((len(type_index), len(materials)))
+        np.add.at(type_sums, type_of_row, model_contained)
+        type_means = type_sums / np.bincount(type_of_row)[:, None]
+    for device_type, grams in DEFAULT_MATERIAL_WEIGHTS.items():
+        if device_type not in type_index:
+            type_rows[device_type] = len(model_types) + len(type_index) + len(extra_rows)
+            extra_rows.append(_material_vector(grams, material_columns))
+    for device_type, index in type_index.items():
+        type_rows[device_type] = len(model_types) + index
+    other_row = len(model_types) + len(type_index) + len(extra_rows)
+    extra_rows.append(_material_vector(DEFAULT_OTHER_WEIGHTS, material_columns))
+
+    contained = np.vstack(
+        [model_contained] + ([type_means] if model_types else []) + [np.array(extra_rows)]
+    )
+    rates = getattr(settings, 'EWASTE_MATERIAL_RECOVERY_RATES', {})
+    rate_vector = np.array([rates.get(material, 1.0) for material in materials])
+    recoverable = contained * rate_vector
+    price_vector = np.array([prices.get(material, 0.0) for material in materials])
+
+    logger.info(f"Built material recovery table: {len(model_types)} models x {len(component_materials)} "
+                f"components x {len(materials)} materials")
+    return _State(
+        materials=materials,
+        material_columns=material_columns,
+        prices=price_vector,
+        weights=weights,
+        composition=composition,
+        contained=contained,
+        recoverable=recoverable,
+        row_values=recoverable @ price_vector,
+        model_rows=model_rows,
+        name_rows=name_rows,
+        type_rows=type_rows,
+        other_row=other_row,
+    )
+
+
+def _material_vector(grams, material_columns):
+    vector = np.zeros(len(material_columns))
+    for material, weight in grams.items():
+        vector[material_columns[material]] = weight
+    return vector
+
+
+material_recovery_table = MaterialRecoveryTable()
+
+
+@receiver([post_save, post_delete], sender=MaterialPrice)
+@receiver([post_save, post_delete], sender=DeviceComponent)
+@receiver([post_save, post_delete], sender=DeviceModelComponent)
+def invalidate_material_recovery(sender, **kwargs):
+    """Rebuild the recovery table after price, composition or component changes"""
+    material_recovery_table.invalidate()
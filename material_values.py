@@ -0,0 +1,131 @@
+"""
+Precomputed recyclable-material values per device type.
+
+The table is built from MaterialPrice (INR per gram) and the
+DeviceModelComponent material weights (grams), averaged over the models of
+each device type. It is rebuilt only after those rows change, in whichever
+process changed them (see ``version_stamps``), so the pricing path reads it
+at dictionary-lookup cost.
+"""
+import logging
+import threading
+from types import MappingProxyType
+
+from django.db.models import Count, Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import DeviceModelComponent, MaterialPrice
+from .version_stamps import version_stamp
+
+logger = logging.getLogger(__name__)
+
+# Fallback material prices in INR per gram, used for materials without a MaterialPrice row
+DEFAULT_MATERIAL_PRICES = {
+    'gold': 5000.0,
+    'silver': 75.0,
+    'copper': 0.8,
+    'aluminum': 0.2,
+    'plastic': 0.05,
+}
+
+# Fallback material weights in grams, used for device types without component data
+DEFAULT_MATERIAL_WEIGHTS = {
+    'phone': {'gold': 0.034, 'silver': 0.34, 'copper': 9, 'aluminum': 25, 'plastic': 80},
+    'laptop': {'gold': 0.2, 'silver': 0.7, 'copper': 65, 'aluminum': 250, 'plastic': 500},
+    'tablet': {'gold': 0.1, 'silver': 0.5, 'copper': 30, 'aluminum': 150, 'plastic': 200},
+    'tv': {'gold': 0.1, 'silver': 0.5, 'copper': 450, 'aluminum': 700, 'plastic': 3000},
+}
+# Device types not listed above use gaming-console weights
+DEFAULT_OTHER_WEIGHTS = {'gold': 0.15, 'silver': 0.6, 'copper': 100, 'aluminum': 300, 'plastic': 1000}
+
+VERSION_STAMP = version_stamp('material-values')
+
+
+def material_prices():
+    """INR per gram by lowercase material name: MaterialPrice rows over the defaults"""
+    prices = dict(DEFAULT_MATERIAL_PRICES)
+    for name, price in MaterialPrice.objects.values_list('material_name', 'price_per_unit'):
+        prices[name.lower()] = float(price)
+    return prices
+
+
+class MaterialValueTable:
+    """Material values in INR per device type, rebuilt when the source rows change"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._values = {}
+        self._default_values = MappingProxyType({})
+        self._totals = {}
+        self._default_total = 0.0
+
+    def values_for(self, device_type):
+        """Return a read-only {material: value in INR} mapping for ``device_type``"""
+        self._refresh_if_stale()
+        return self._values.get(device_type, self._default_values)
+
+    def total_for(self, device_type):
+        """Return the total material value in INR for ``device_type``"""
+        self._refresh_if_stale()
+        return self._totals.get(device_type, self._default_total)
+
+    def invalidate(self):
+        """Mark the table stale in every process"""
+        VERSION_STAMP.bump()
+        with self._lock:
+            self._version = None
+
+    def _refresh_if_stale(self):
+        version = VERSION_STAMP.get()
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._values, self._default_values = self._build()
+                self._totals = {device_type: sum(v.values()) for device_type, v in self._values.items()}
+                self._default_total = sum(self._default_values.values())
+                self._version = version
+
+    @staticmethod
+    def _build():
+        prices = material_prices()
+        weights = {device_type: dict(w) for device_type, w in DEFAULT_MATERIAL_WEIGHTS.items()}
+
+        # Average grams of each material per model, for types that have component data
+        model_counts = dict(
+            DeviceModelComponent.objects.values_list('device_model__device_type')
+            .annotate(models=Count('device_model', distinct=True))
+        )
+        totals = (
+            DeviceModelComponent.objects.values_list('device_model__device_type', 'material_name')
+            .annotate(total=Sum('weight'))
+        )
+        component_weights = {}
+        for device_type, material_name, total in totals:
+            per_model = float(total or 0) / model_counts[device_type]
+            type_weights = component_weights.setdefault(device_type, {})
+            material = material_name.lower()
+            type_weights[material] = type_weights.get(material, 0.0) + per_model
+        weights.update(component_weights)
+
+        def price_out(material_weights):
+            return MappingProxyType({
+                material: float(weight) * prices.get(material, 0.0)
+                for material, weight in material_weights.items()
+            })
+
+        values = {device_type: price_out(w) for device_type, w in weights.items()}
+        logger.info(f"Rebuilt material value table for {len(values)} device types")
+        return values, price_out(DEFAULT_OTHER_WEIGHTS)
+
+
+material_value_table = MaterialValueTable()
+
+
+@receiver([post_save, post_delete], sender=MaterialPrice)
+@receiver([post_save, post_delete], sender=DeviceModelComponent)
+def invalidate_material_values(sender, **kwargs):
+    """Rebuild the material value table after price or composition changes"""
+    material_value_table.invalidate()
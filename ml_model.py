@@ -1,105 +1,197 @@
-import joblib
+import json
 import numpy as np
 from pathlib import Path
-import logging
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger(__name__)
+from .instrumentation import StructuredLogger, prediction_timer as stage_timer
+
+# Logging is configured by the host application; nothing is formatted unless enabled
+logger = StructuredLogger(__name__)
+
+ML_MODELS_DIR = Path(__file__).parent / 'ml_models'
+
+# Fused linear model exported by train_model.py: weights, intercept and category maps
+FUSED_MODEL_PATH = ML_MODELS_DIR / 'ewaste_price_model.json'
+FUSED_MODEL_FORMAT = 1
+
+# Legacy scikit-learn pickles, only read when no fused model has been exported
+LEGACY_MODEL_PATH = ML_MODELS_DIR / 'ewaste_price_model.pkl'
+LEGACY_SCALER_PATH = ML_MODELS_DIR / 'ewaste_price_scaler.pkl'
+
+# Feature columns in the exact order expected by the model
+FEATURE_COLUMNS = (
+    'device_type',
+    'age',
+    'condition',
+    'battery_status',
+    'screen_condition',
+    'motherboard_status',
+)
+
+# Request-style names accepted by predict_price, mapped to column names
+COLUMN_ALIASES = {
+    'batteryStatus': 'battery_status',
+    'screenCondition': 'screen_condition',
+    'motherboardStatus': 'motherboard_status',
+}
+
+# Default mappings for categorical variables; a fused model carries its own
+DEVICE_TYPE_MAP = {
+    'phone': 0,
+    'mobile': 0,  # EWasteItem.item_type name for phones
+    'laptop': 1,
+    'tablet': 2,
+    'desktop': 3,
+    'tv': 4,
+    'console': 5
+}
+
+CONDITION_MAP = {
+    'working': 2,
+    'partially_working': 1,
+    'partial': 1,  # EWasteItem.FUNCTIONAL_STATUS name
+    'not_working': 0
+}
+
+STATUS_MAP = {
+    'good': 2,
+    'average': 1,
+    'fair': 1,  # EWasteItem.COMPONENT_STATUS name
+    'poor': 0,
+    'na': 1
+}
+
+MIN_PRICE = 100
+
+
+def fuse_linear_model(model, scaler):
+    """
+    Fold a fitted StandardScaler into a fitted linear model.
+
+    model.predict(scaler.transform(X)) == X @ weights + intercept, because
+    (x - mean) / scale . coef + b == x . (coef / scale) + (b - coef . mean / scale).
+    """
+    coef = np.asarray(model.coef_, dtype=np.float64)
+    weights = coef / scaler.scale_
+    intercept = float(model.intercept_) - float(np.dot(weights, scaler.mean_))
+    return weights, intercept
+
+
+def encode_feature_matrix(columns, device_type_map=DEVICE_TYPE_MAP, condition_map=CONDITION_MAP,
+                          status_map=STATUS_MAP):
+    """
+    Encode a dict of FEATURE_COLUMNS sequences as the model's raw feature matrix
+    """
+    n_rows = len(columns['device_type'])
+    features = np.empty((n_rows, len(FEATURE_COLUMNS)), dtype=np.float64)
+    if n_rows == 0:
+        return features
+    # Same order and defaults as EWastePricePredictor.encode_features
+    features[:, 0] = _encode_column(columns['device_type'], device_type_map, 0)
+    features[:, 1] = np.asarray(columns['age'], dtype=np.float64)
+    features[:, 2] = _encode_column(columns['condition'], condition_map, 1)
+    features[:, 3] = _encode_column(columns['battery_status'], status_map, 1)
+    features[:, 4] = _encode_column(columns['screen_condition'], status_map, 1)
+    features[:, 5] = _encode_column(columns['motherboard_status'], status_map, 1)
+    return features
+
+
+def _encode_column(values, mapping, default):
+    """Encode a categorical column by mapping only its distinct values"""
+    uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    codes = np.array([mapping.get(value.lower(), default) for value in uniques], dtype=np.float64)
+    return codes[inverse]
+
+
+def save_fused_model(path, weights, intercept, version):
+    """Write a fused model artifact with the category maps it was trained with"""
+    artifact = {
+        'format': FUSED_MODEL_FORMAT,
+        'version': version,
+        'features': list(FEATURE_COLUMNS),
+        'weights': [float(w) for w in weights],
+        'intercept': float(intercept),
+        'min_price': MIN_PRICE,
+        'category_maps': {
+            'device_type': DEVICE_TYPE_MAP,
+            'condition': CONDITION_MAP,
+            'status': STATUS_MAP,
+        },
+    }
+    Path(path).write_text(json.dumps(artifact, indent=2))
+
 
 class EWastePricePredictor:
-    def __init__(self):
+    def __init__(self, model_path=FUSED_MODEL_PATH):
         try:
-            model_path = Path(__file__).parent / 'ml_models' / 'ewaste_price_model.pkl'
-            scaler_path = Path(__file__).parent / 'ml_models' / 'ewaste_price_scaler.pkl'
-            
-            logger.debug(f"Loading model from: {model_path}")
-            logger.debug(f"Loading scaler from: {scaler_path}")
-            
-            if not model_path.exists():
+            model_path = Path(model_path)
+            logger.debug('predictor.load', model_path=model_path)
+
+            if model_path.exists():
+                self._load_fused(model_path)
+            elif LEGACY_MODEL_PATH.exists() and LEGACY_SCALER_PATH.exists():
+                self._load_legacy()
+            else:
                 raise FileNotFoundError(f"Model file not found at {model_path}")
-            if not scaler_path.exists():
-                raise FileNotFoundError(f"Scaler file not found at {scaler_path}")
-            
-            self.model = joblib.load(model_path)
-            self.scaler = joblib.load(scaler_path)
-            
-            logger.debug("Model and scaler loaded successfully")
-            
+
         except Exception as e:
-            logger.error(f"Error initializing predictor: {str(e)}")
+            logger.error('predictor.load_failed', error=str(e))
             raise
-        
-        # Define mappings for categorical variables
-        self.device_type_map = {
-            'phone': 0,
-            'laptop': 1,
-            'tablet': 2,
-            'desktop': 3,
-            'tv': 4,
-            'console': 5
-        }
-        
-        self.condition_map = {
-            'working': 2,
-            'partially_working': 1,
-            'not_working': 0
-        }
-        
-        self.status_map = {
-            'good': 2,
-            'average': 1,
-            'poor': 0,
-            'na': 1
-        }
+
+    def _load_fused(self, model_path):
+        artifact = json.loads(model_path.read_text())
+        if artifact.get('format') != FUSED_MODEL_FORMAT:
+            raise ValueError(f"Unsupported model format {artifact.get('format')!r} in {model_path}")
+        if tuple(artifact['features']) != FEATURE_COLUMNS:
+            raise ValueError(f"Model features {artifact['features']} do not match {list(FEATURE_COLUMNS)}")
+
+        self.model_version = artifact['version']
+        self.weights = np.asarray(artifact['weights'], dtype=np.float64)
+        self.intercept = float(artifact['intercept'])
+        self._weight_list = self.weights.tolist()
+        category_maps = artifact['category_maps']
+        self.device_type_map = category_maps['device_type']
+        self.condition_map = category_maps['condition']
+        self.status_map = category_maps['status']
+
+    def _load_legacy(self):
+        # scikit-learn is only imported for models trained before fused export
+        import joblib
+
+        model = joblib.load(LEGACY_MODEL_PATH)
+        scaler = joblib.load(LEGACY_SCALER_PATH)
+        self.model_version = 'legacy-pickle'
+        self.weights, self.intercept = fuse_linear_model(model, scaler)
+        self._weight_list = self.weights.tolist()
+        self.device_type_map = DEVICE_TYPE_MAP
+        self.condition_map = CONDITION_MAP
+        self.status_map = STATUS_MAP
     
+    def encode_features(self, device_type, condition, age, battery_status='na', screen_condition='na', motherboard_status='na'):
+        """
+        Encode one device as the model's raw (unscaled) feature row
+        """
+        return [
+            # Unknown device types default to phone
+            self.device_type_map.get(device_type.lower(), 0),
+            float(age),
+            # Unknown conditions default to partially working
+            self.condition_map.get(condition.lower(), 1),
+            self.status_map.get(battery_status.lower(), 1),
+            self.status_map.get(screen_condition.lower(), 1),
+            self.status_map.get(motherboard_status.lower(), 1),
+        ]
+
     def preprocess_input(self, device_type, condition, age, battery_status='na', screen_condition='na', motherboard_status='na'):
         """
         Preprocess the input data before making predictions
         """
         try:
-            logger.debug("\nPreprocessing input:")
-            logger.debug(f"Device Type: {device_type}")
-            logger.debug(f"Condition: {condition}")
-            logger.debug(f"Age: {age}")
-            logger.debug(f"Battery Status: {battery_status}")
-            logger.debug(f"Screen Condition: {screen_condition}")
-            logger.debug(f"Motherboard Status: {motherboard_status}")
-            
-            # Convert device type to numerical (default to -1 if not found)
-            device_type_num = self.device_type_map.get(device_type.lower(), 0)  # Default to mobile/phone
-            
-            # Convert condition/functional status
-            condition_num = self.condition_map.get(condition.lower(), 1)  # Default to partially working
-            
-            # Convert age to float
-            age_num = float(age)
-            
-            # Convert component statuses
-            battery_num = self.status_map.get(battery_status.lower(), 1)
-            screen_num = self.status_map.get(screen_condition.lower(), 1)
-            mb_num = self.status_map.get(motherboard_status.lower(), 1)
-            
-            # Create feature array in the exact order expected by the model
-            features = [
-                device_type_num,
-                age_num,
-                condition_num,
-                battery_num,
-                screen_num,
-                mb_num
-            ]
-            
-            logger.debug(f"Preprocessed features: {features}")
-            
-            # Scale features
-            features_scaled = self.scaler.transform(np.array(features).reshape(1, -1))
-            logger.debug(f"Scaled features: {features_scaled}")
-            
-            return features_scaled
-            
+            features = self.encode_features(
+                device_type, condition, age, battery_status, screen_condition, motherboard_status
+            )
+            return np.array(features, dtype=np.float64).reshape(1, -1)
         except Exception as e:
-            logger.error(f"Error in preprocessing: {str(e)}")
+            logger.error('predictor.preprocess_failed', error=str(e))
             return None
     
     def predict_price(self, device_type, condition, age, **features):
@@ -113,33 +205,79 @@ class EWastePricePredictor:
         Returns:
             float: Predicted price
         """
+        sample = stage_timer.sample()
         try:
-            logger.debug("\nMaking price prediction:")
-            logger.debug(f"Input - Device Type: {device_type}, Condition: {condition}, Age: {age}")
-            logger.debug(f"Additional features: {features}")
-            
-            processed_input = self.preprocess_input(
-                device_type, 
-                condition, 
-                age,
-                features.get('batteryStatus', 'na'),
-                features.get('screenCondition', 'na'),
-                features.get('motherboardStatus', 'na')
-            )
-            
-            if processed_input is None:
-                logger.error("Failed to preprocess input")
-                return None
-                
-            prediction = self.model.predict(processed_input)
-            logger.debug(f"Raw prediction: {prediction}")
+            with sample.stage('preprocess'):
+                encoded = self.encode_features(
+                    device_type,
+                    condition,
+                    age,
+                    features.get('batteryStatus', 'na'),
+                    features.get('screenCondition', 'na'),
+                    features.get('motherboardStatus', 'na')
+                )
+            with sample.stage('predict'):
+                # Scaling is folded into the weights: a single dot product
+                prediction = sum(w * x for w, x in zip(self._weight_list, encoded)) + self.intercept
             
             # Ensure prediction is non-negative and round to 2 decimal places
-            final_price = max(round(float(prediction[0]), 2), 100)
-            logger.debug(f"Final price: {final_price}")
+            final_price = max(round(float(prediction), 2), MIN_PRICE)
+            logger.debug('predictor.predict', device_type=device_type, condition=condition, age=age, price=final_price)
             
             return final_price
             
         except Exception as e:
-            logger.error(f"Error in price prediction: {str(e)}")
+            logger.error('predictor.predict_failed', device_type=device_type, error=str(e))
             return None
+
+    def predict_batch(self, data):
+        """
+        Predict prices for many devices in one matrix operation
+        Args:
+            data: A pandas DataFrame, a dict of equal-length arrays/lists, or a
+                list of dicts, using the FEATURE_COLUMNS names (the camelCase
+                status names accepted by predict_price also work). Missing
+                status columns default to 'na'.
+        Returns:
+            numpy.ndarray: Predicted prices, rounded to 2 decimal places and
+            floored at MIN_PRICE
+        """
+        sample = stage_timer.sample()
+        with sample.stage('preprocess'):
+            columns = self._to_columns(data)
+            n_rows = len(columns['device_type'])
+            if n_rows == 0:
+                return np.empty(0, dtype=np.float64)
+
+            features = encode_feature_matrix(
+                columns, self.device_type_map, self.condition_map, self.status_map
+            )
+
+        with sample.stage('predict'):
+            predictions = features @ self.weights + self.intercept
+        logger.debug('predictor.predict_batch', rows=n_rows)
+        return np.maximum(np.round(predictions, 2), MIN_PRICE)
+
+    @staticmethod
+    def _to_columns(data):
+        """Normalize the supported batch inputs to a dict of column sequences"""
+        if hasattr(data, 'columns') and hasattr(data, 'to_numpy'):
+            # pandas DataFrame
+            columns = {COLUMN_ALIASES.get(name, name): data[name].to_numpy() for name in data.columns}
+        elif isinstance(data, dict):
+            columns = {COLUMN_ALIASES.get(name, name): values for name, values in data.items()}
+        else:
+            rows = list(data)
+            columns = {}
+            for name in FEATURE_COLUMNS:
+                alias = next((a for a, target in COLUMN_ALIASES.items() if target == name), None)
+                columns[name] = [row.get(name, row.get(alias, 'na')) for row in rows]
+
+        for name in ('device_type', 'condition', 'age'):
+            if name not in columns:
+                raise ValueError(f"Missing required column '{name}'")
+        n_rows = len(columns['device_type'])
+        for name in ('battery_status', 'screen_condition', 'motherboard_status'):
+            if name not in columns:
+                columns[name] = np.full(n_rows, 'na')
+        return columns
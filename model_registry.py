@@ -0,0 +1,152 @@
+"""
+Process-wide registry for the ML and vision models.
+
+Each model is loaded at most once per worker process and handed out as a
+shared instance. Load time and resident memory are recorded per model so
+that gunicorn worker counts can be sized from real numbers.
+"""
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_bytes():
+    """Return the current resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Not on Linux: fall back to the peak RSS (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+class ModelRegistry:
+    """Lazily loads registered models once and shares them across threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._factories = {}
+        self._instances = {}
+        self._usage_locks = {}
+        self._stats = {}
+
+    def register(self, name, factory, serialize=False):
+        """
+        Register a model factory under ``name``.
+
+        ``serialize`` marks models whose inference is not thread-safe; callers
+        using ``acquire`` will then take turns on the shared instance.
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._usage_locks[name] = threading.Lock() if serialize else None
+            self._instances.pop(name, None)
+
+    def get(self, name):
+        """Return the shared instance for ``name``, loading it on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            instance = self._instances.get(name)
+            if instance is not None:
+                return instance
+
+            try:
+                factory = self._factories[name]
+            except KeyError:
+                raise KeyError(f"No model registered under '{name}'")
+
+            rss_before = current_rss_bytes()
+            started = time.perf_counter()
+            instance = factory()
+            load_seconds = time.perf_counter() - started
+            rss_after = current_rss_bytes()
+
+            self._instances[name] = instance
+            self._stats[name] = {
+                'load_seconds': round(load_seconds, 4),
+                'rss_delta_bytes': max(rss_after - rss_before, 0),
+                'loaded_at': time.time(),
+                'pid': os.getpid(),
+            }
+            logger.info(
+                "Loaded model '%s' in %.2fs (+%.1f MiB RSS)",
+                name, load_seconds, self._stats[name]['rss_delta_bytes'] / 2**20
+            )
+            return instance
+
+    @contextmanager
+    def acquire(self, name):
+        """Yield the shared instance, holding its usage lock if it is serialized"""
+        instance = self.get(name)
+        usage_lock = self._usage_locks.get(name)
+        if usage_lock is None:
+            yield instance
+            return
+        with usage_lock:
+            yield instance
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def warm_up(self, names=None):
+        """Load the given models (all registered ones by default), logging failures"""
+        for name in names or list(self._factories):
+            try:
+                self.get(name)
+            except Exception as e:
+                # A broken model must not stop the app from starting; the first
+                # request that needs it will retry the load and surface the error
+                logger.error(f"Warm-up failed for model '{name}': {str(e)}")
+
+    def stats(self):
+        """Return load statistics for every loaded model plus the process RSS"""
+        return {
+            'pid': os.getpid(),
+            'rss_bytes': current_rss_bytes(),
+            'models': {name: dict(stats) for name, stats in self._stats.items()},
+        }
+
+
+def _load_price_predictor():
+    from django.conf import settings
+
+    from .model_store import DEFAULT_STORE_DIR, HotSwapPredictor, ModelStore
+
+    # Follows the model store's manifest, so new versions load without a restart
+    return HotSwapPredictor(
+        store=ModelStore(getattr(settings, 'EWASTE_MODEL_STORE_DIR', DEFAULT_STORE_DIR)),
+        poll_seconds=getattr(settings, 'EWASTE_MODEL_POLL_SECONDS', 5.0),
+        max_shadows=getattr(settings, 'EWASTE_MODEL_MAX_SHADOWS', 2),
+    )
+
+
+def _load_image_analyzer():
+    from .image_analysis import EwasteImageAnalyzer
+    return EwasteImageAnalyzer()
+
+
+registry = ModelRegistry()
+registry.register('price_predictor', _load_price_predictor)
+# The detector keeps per-call state, so concurrent requests take turns on it
+registry.register('image_analyzer', _load_image_analyzer, serialize=True)
+
+
+def get_price_predictor():
+    """Return the process-wide price predictor (a HotSwapPredictor)"""
+    return registry.get('price_predictor')
+
+
+def get_image_analyzer():
+    """Return the process-wide EwasteImageAnalyzer"""
+    return registry.get('image_analyzer')
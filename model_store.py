@@ -0,0 +1,282 @@
+"""
+Versioned price model artifacts that workers pick up without a restart.
+
+Each published model lives in its own directory under the store root with a
+SHA-256 checksum, and ``manifest.json`` names the active version plus any
+shadow versions:
+
+    ml_models/store/
+        manifest.json
+        20250101120000/model.json
+        20250108120000/model.json
+
+``HotSwapPredictor`` stands in for ``EWastePricePredictor``. It checks the
+manifest's mtime at most every ``poll_seconds``. When the manifest changes,
+it loads and verifies the new versions, then replaces its snapshot in one
+reference assignment. A prediction already running keeps the snapshot it
+started with. Shadow versions score every request as well; only their
+disagreement with the active model is recorded.
+
+Like ml_model.py, this module does not import Django, so train_model can
+publish to the store directly.
+"""
+import hashlib
+import json
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .instrumentation import StructuredLogger
+from .ml_model import ML_MODELS_DIR, EWastePricePredictor
+
+logger = StructuredLogger(__name__)
+
+DEFAULT_STORE_DIR = ML_MODELS_DIR / 'store'
+MANIFEST_FILE = 'manifest.json'
+ARTIFACT_FILE = 'model.json'
+
+
+class ModelStoreError(Exception):
+    """The manifest or an artifact is missing, unknown or fails its checksum"""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as artifact:
+        for block in iter(lambda: artifact.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelStore:
+    """Versioned artifact directories plus a manifest naming the live versions"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.manifest_path = self.root / MANIFEST_FILE
+
+    def read_manifest(self):
+        if not self.manifest_path.exists():
+            return {'active': None, 'shadows': [], 'versions': {}}
+        return json.loads(self.manifest_path.read_text())
+
+    def _write_manifest(self, manifest):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(manifest, indent=2))
+        # Workers only ever see the old or the new manifest, never a partial one
+        tmp_path.replace(self.manifest_path)
+
+    def mtime_ns(self):
+        try:
+            return self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def publish(self, artifact_path, version, activate=True):
+        """Copy a fused model artifact into the store under ``version``"""
+        manifest = self.read_manifest()
+        if version in manifest['versions']:
+            raise ModelStoreError(f"Version {version} is already published")
+
+        version_dir = self.root / version
+        version_dir.mkdir(parents=True)
+        shutil.copyfile(artifact_path, version_dir / ARTIFACT_FILE)
+        manifest['versions'][version] = {
+            'path': f'{version}/{ARTIFACT_FILE}',
+            'sha256': file_sha256(version_dir / ARTIFACT_FILE),
+            'published_at': datetime.now(timezone.utc).isoformat(),
+        }
+        if activate:
+            manifest['active'] = version
+        self._write_manifest(manifest)
+        logger.info('model_store.publish', version=version, active=activate)
+
+    def activate(self, version):
+        """Make ``version`` the active model; also how a rollback is done"""
+        manifest = self.read_manifest()
+        self._require(manifest, version)
+        manifest['active'] = version
+        manifest['shadows'] = [v for v in manifest['shadows'] if v != version]
+        self._write_manifest(manifest)
+
+    def set_shadows(self, versions):
+        """Score these versions alongside the active one without serving them"""
+        manifest = self.read_manifest()
+        for version in versions:
+            self._require(manifest, version)
+        manifest['shadows'] = [v for v in versions if v != manifest['active']]
+        self._write_manifest(manifest)
+
+    def prune(self, keep):
+        """Delete all but the ``keep`` newest versions, never the active or shadow ones"""
+        manifest = self.read_manifest()
+        live = {manifest['active'], *manifest['shadows']}
+        by_age = sorted(manifest['versions'], key=lambda v: manifest['versions'][v]['published_at'], reverse=True)
+        removed = [v for v in by_age[keep:] if v not in live]
+        for version in removed:
+            del manifest['versions'][version]
+        self._write_manifest(manifest)
+        for version in removed:
+            shutil.rmtree(self.root / version, ignore_errors=True)
+        return removed
+
+    def artifact_path(self, version, manifest=None):
+        """Path of the version's artifact after checking it against its checksum"""
+        manifest = manifest or self.read_manifest()
+        entry = self._require(manifest, version)
+        path = self.root / entry['path']
+        if not path.exists():
+            raise ModelStoreError(f"Artifact for version {version} is missing at {path}")
+        if file_sha256(path) != entry['sha256']:
+            raise ModelStoreError(f"Artifact for version {version} does not match its checksum")
+        return path
+
+    @staticmethod
+    def _require(manifest, version):
+        try:
+            return manifest['versions'][version]
+        except KeyError:
+            raise ModelStoreError(f"Unknown model version {version!r}")
+
+
+class _Snapshot:
+    __slots__ = ('mtime_ns', 'active', 'shadows')
+
+    def __init__(self, mtime_ns, active, shadows):
+        self.mtime_ns = mtime_ns
+        self.active = active
+        self.shadows = shadows
+
+
+class HotSwapPredictor:
+    """EWastePricePredictor facade that follows the store's manifest"""
+
+    def __init__(self, store=None, poll_seconds=5.0, max_shadows=2):
+        self.store = store or ModelStore()
+        self.poll_seconds = poll_seconds
+        self.max_shadows = max_shadows
+        self._swap_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._next_check = 0.0
+        self._shadow_stats = {}
+        self._swaps = 0
+        self._snapshot = self._load_snapshot()
+
+    @property
+    def model_version(self):
+        return self.current().active.model_version
+
+    def current(self):
+        """The snapshot to serve this call from, refreshed if the manifest changed"""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.poll_seconds
+            self.refresh()
+        return self._snapshot
+
+    def refresh(self):
+        """Swap in the manifest's versions if it changed; a failed load keeps the current models"""
+        if self.store.mtime_ns() == self._snapshot.mtime_ns:
+            return False
+        # One thread reloads; the others keep serving the current snapshot meanwhile
+        if not self._swap_lock.acquire(blocking=False):
+            return False
+        try:
+            previous = self._snapshot
+            if self.store.mtime_ns() == previous.mtime_ns:
+                return False
+            snapshot = self._load_snapshot(previous)
+            self._snapshot = snapshot
+            self._swaps += 1
+            logger.info(
+                'model_store.swap', previous=previous.active.model_version,
+                active=snapshot.active.model_version, shadows=list(snapshot.shadows)
+            )
+            return True
+        except Exception as e:
+            # Remember the mtime so a broken publish is not retried on every call
+            self._snapshot = _Snapshot(self.store.mtime_ns(), self._snapshot.active, self._snapshot.shadows)
+            logger.error('model_store.swap_failed', error=str(e))
+            return False
+        finally:
+            self._swap_lock.release()
+
+    def _load_snapshot(self, previous=None):
+        mtime_ns = self.store.mtime_ns()
+        manifest = self.store.read_manifest()
+        if manifest['active'] is None:
+            # Nothing published yet: serve the fused model train_model writes
+            return _Snapshot(mtime_ns, EWastePricePredictor(), {})
+
+        # Versions already in memory are reused rather than reloaded
+        loaded = {}
+        if previous is not None:
+            loaded = {p.model_version: p for p in (previous.active, *previous.shadows.values())}
+
+        def load(version):
+            if version in loaded:
+                return loaded[version]
+            predictor = EWastePricePredictor(self.store.artifact_path(version, manifest))
+            # The artifact's own version stamp may differ from the store's directory name
+            predictor.model_version = version
+            return predictor
+
+        active = load(manifest['active'])
+        shadows = {version: load(version) for version in manifest['shadows'][:self.max_shadows]}
+        return _Snapshot(mtime_ns, active, shadows)
+
+    def predict_price(self, device_type, condition, age, **features):
+        return self.predict_price_versioned(device_type, condition, age, **features)[0]
+
+    def predict_price_versioned(self, device_type, condition, age, **features):
+        """Return (price, model_version) from the active model"""
+        snapshot = self.current()
+        price = snapshot.active.predict_price(device_type, condition, age, **features)
+        if snapshot.shadows and price is not None:
+            for version, shadow in snapshot.shadows.items():
+                shadow_price = shadow.predict_price(device_type, condition, age, **features)
+                if shadow_price is not None:
+                    difference = abs(shadow_price - price)
+                    self._record_shadow(version, 1, difference, difference)
+        return price, snapshot.active.model_version
+
+    def predict_batch(self, data):
+        return self.predict_batch_versioned(data)[0]
+
+    def predict_batch_versioned(self, data):
+        """Return (prices, model_version) from the active model"""
+        snapshot = self.current()
+        prices = snapshot.active.predict_batch(data)
+        for version, shadow in snapshot.shadows.items():
+            differences = abs(shadow.predict_batch(data) - prices)
+            if len(differences):
+                self._record_shadow(version, len(differences), float(differences.sum()), float(differences.max()))
+        return prices, snapshot.active.model_version
+
+    def _record_shadow(self, version, count, total, worst):
+        with self._stats_lock:
+            stats = self._shadow_stats.setdefault(version, [0, 0.0, 0.0])
+            stats[0] += count
+            stats[1] += total
+            stats[2] = max(stats[2], worst)
+
+    def stats(self):
+        snapshot = self._snapshot
+        with self._stats_lock:
+            shadows = {
+                version: {
+                    'predictions': count,
+                    'mean_abs_diff': round(total / count, 4) if count else None,
+                    'max_abs_diff': round(worst, 4),
+                }
+                for version, (count, total, worst) in self._shadow_stats.items()
+                if version in snapshot.shadows
+            }
+        return {
+            'active': snapshot.active.model_version,
+            'shadows': shadows,
+            'swaps': self._swaps,
+        }
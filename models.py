@@ -74,8 +74,20 @@ class DeviceModel(models.Model):
     base_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     release_year = models.IntegerField()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored price so a save can tell whether it changed without re-reading the row
+        if 'base_price' in field_names:
+            instance._loaded_base_price = instance.base_price
+        return instance
+
     class Meta:
         unique_together = ['brand', 'name']
+        indexes = [
+            # Catalog model lists: filter by (device_type, brand), newest release first
+            models.Index(fields=['device_type', 'brand', '-release_year', 'name'], name='devicemodel_type_brand_idx'),
+        ]
 
     def __str__(self):
         return f"{self.brand.name} {self.name} ({self.release_year})"
@@ -114,6 +126,13 @@ class EWasteItem(models.Model):
         ('poor', 'Poor'),
         ('na', 'Not Applicable')
     ]
+
+    ANALYSIS_STATUS = [
+        ('pending', 'Pending Analysis'),
+        ('processing', 'Analyzing'),
+        ('completed', 'Analyzed'),
+        ('failed', 'Analysis Failed')
+    ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     item_type = models.CharField(max_length=50)
@@ -126,15 +145,112 @@ class EWasteItem(models.Model):
     motherboard_status = models.CharField(max_length=50, choices=COMPONENT_STATUS, null=True, blank=True)
     description = models.TextField(null=True, blank=True)
     image = models.ImageField(upload_to='ewaste_images/')
+    thumbnail = models.ImageField(upload_to='thumbnails/', null=True, blank=True)
     analyzed_image = models.ImageField(upload_to='analyzed_images/', null=True, blank=True)
     analysis_results = models.JSONField(null=True, blank=True)
+    analysis_status = models.CharField(max_length=20, choices=ANALYSIS_STATUS, default='pending')
+    analysis_error = models.TextField(blank=True, default='')
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
     price_estimation = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    # ML model version that produced price_estimation, or 'rules'
+    price_model_version = models.CharField(max_length=50, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Dashboard pages: a user's items, newest first, keyset-paginated on (created_at, id)
+            models.Index(fields=['user', '-created_at', '-id'], name='ewasteitem_user_created_idx'),
+            # Analysis queue: oldest pending items first
+            models.Index(fields=['analysis_status', 'created_at'], name='ewasteitem_status_created_idx'),
+            # Incremental training exports read rows past an (updated_at, id) watermark
+            models.Index(fields=['updated_at', 'id'], name='ewasteitem_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.item_type} - {self.brand} {self.model}"
 
+class ImageAnalysisCache(models.Model):
+    """Stored upload and detector output for an image, keyed by its SHA-256 and the detector version"""
+    content_hash = models.CharField(max_length=64)
+    model_version = models.CharField(max_length=50)
+    image = models.ImageField(upload_to='ewaste_images/')
+    thumbnail = models.ImageField(upload_to='thumbnails/', null=True, blank=True)
+    analyzed_image = models.ImageField(upload_to='analyzed_images/', null=True, blank=True)
+    analysis_results = models.JSONField(null=True, blank=True)
+    size_bytes = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = ['content_hash', 'model_version']
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.model_version})"
+
+class GeocodedAddress(models.Model):
+    """Local geocode table for pickup addresses, looked up by normalized address"""
+    # sha1 of the normalized address text (see scheduling.address_key)
+    address_key = models.CharField(max_length=40, unique=True)
+    address = models.TextField()
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    geohash = models.CharField(max_length=12, db_index=True)
+    zone = models.CharField(max_length=20, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.address} ({self.zone})"
+
+class CollectionSlot(models.Model):
+    """Pickup capacity for one zone in one time window of a day"""
+    WINDOWS = [
+        ('morning', 'Morning (9:00 - 12:00)'),
+        ('afternoon', 'Afternoon (12:00 - 15:00)'),
+        ('evening', 'Evening (15:00 - 18:00)'),
+    ]
+
+    date = models.DateField()
+    window = models.CharField(max_length=20, choices=WINDOWS)
+    zone = models.CharField(max_length=20)
+    capacity = models.PositiveIntegerField()
+    reserved = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['date', 'window', 'zone']
+        constraints = [
+            models.CheckConstraint(check=models.Q(reserved__lte=models.F('capacity')),
+                                   name='collectionslot_within_capacity'),
+        ]
+
+    @property
+    def remaining(self):
+        return self.capacity - self.reserved
+
+    def __str__(self):
+        return f"{self.zone} {self.date} {self.window} ({self.reserved}/{self.capacity})"
+
+class PickupRoute(models.Model):
+    """A batch of confirmed collections picked up together, built by scheduling.plan_routes
+    or, as ordered vehicle routes from a depot, by scheduling.save_vehicle_routes"""
+    date = models.DateField()
+    # Empty for vehicle routes, which span the whole day
+    window = models.CharField(max_length=20, choices=CollectionSlot.WINDOWS, blank=True)
+    # Zone, or depot name for vehicle routes
+    zone = models.CharField(max_length=20)
+    number = models.PositiveIntegerField()
+    stop_count = models.PositiveIntegerField()
+    distance_km = models.FloatField(null=True, blank=True)
+    load_kg = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['date', 'window', 'zone', 'number']
+
+    def __str__(self):
+        return f"Route {self.zone}-{self.number} {self.date} {self.window or 'all day'} ({self.stop_count} stops)"
+
 class CollectionSchedule(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -149,8 +265,25 @@ class CollectionSchedule(models.Model):
     preferred_time = models.TimeField(default=timezone.now)
     pickup_address = models.TextField(default='')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Set when the pickup is booked into a slot; released again on cancellation
+    slot = models.ForeignKey(CollectionSlot, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='collections')
+    geocode = models.ForeignKey(GeocodedAddress, on_delete=models.SET_NULL, null=True, blank=True)
+    route = models.ForeignKey(PickupRoute, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='stops')
+    route_stop = models.PositiveIntegerField(null=True, blank=True)
+    # Saved without a slot (address not geocoded, no slot opened, or outside pickup hours); ops place it by hand
+    needs_review = models.BooleanField(default=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # A user's collections by status and date; also serves plain filter(user=...)
+            models.Index(fields=['user', 'status', '-preferred_date'], name='collection_user_status_idx'),
+            # The day's confirmed collections, read by the route planner
+            models.Index(fields=['preferred_date', 'status'], name='collection_date_status_idx'),
+        ]
     
     def get_status_color(self):
         """Return Bootstrap color class based on status"""
@@ -172,9 +305,63 @@ class PriceHistory(models.Model):
     market_condition = models.CharField(max_length=100)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            # A model's price history over a time range
+            models.Index(fields=['device_model', 'recorded_at'], name='pricehistory_model_time_idx'),
+        ]
+
     def __str__(self):
         return f"{self.device_model} - ₹{self.base_price} ({self.recorded_at.date()})"
 
+class PriceRollup(models.Model):
+    """Daily or monthly aggregate of a device model's recorded prices, kept up to date incrementally"""
+    PERIODS = [
+        ('day', 'Daily'),
+        ('month', 'Monthly'),
+    ]
+
+    device_model = models.ForeignKey(DeviceModel, on_delete=models.CASCADE, related_name='price_rollups')
+    period = models.CharField(max_length=5, choices=PERIODS)
+    bucket_start = models.DateField()
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2)
+    sum_price = models.DecimalField(max_digits=16, decimal_places=2)
+    sample_count = models.PositiveIntegerField(default=0)
+    # Price at the end of the bucket, for trend lines
+    close_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        # Also the index for range scans of one model's buckets
+        unique_together = ['device_model', 'period', 'bucket_start']
+
+    @property
+    def avg_price(self):
+        return self.sum_price / self.sample_count if self.sample_count else None
+
+    def __str__(self):
+        return f"{self.device_model} - {self.period} {self.bucket_start}"
+
+class DepreciationCurve(models.Model):
+    """Fitted value retention ``max(floor, exp(-rate * age_years))`` for a model, a brand or a device type"""
+    SCOPES = [
+        ('model', 'Device Model'),
+        ('brand', 'Brand'),
+        ('type', 'Device Type'),
+    ]
+
+    scope = models.CharField(max_length=10, choices=SCOPES)
+    # 'model:<id>', 'brand:<id>' or 'type:<device_type>'
+    key = models.CharField(max_length=80, unique=True)
+    device_type = models.CharField(max_length=50)
+    rate = models.FloatField()
+    floor = models.FloatField()
+    sample_count = models.PositiveIntegerField()
+    fitted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key}: max({self.floor:.2f}, exp(-{self.rate:.3f} * age))"
+
 class PriceEstimation(models.Model):
     COMPONENT_TYPES = [
         ('copper', 'Copper'),
@@ -197,18 +384,11 @@ class PriceEstimation(models.Model):
     def __str__(self):
         return f"{self.get_component_display()} price for {self.item_type}"
 
-@receiver(pre_save, sender=DeviceModel)
-def update_price_history(sender, instance, **kwargs):
-    """Create price history entry when base price changes"""
-    try:
-        old_instance = DeviceModel.objects.get(pk=instance.pk)
-        if old_instance.base_price != instance.base_price:
-            PriceHistory.objects.create(
-                device_model=instance,
-                base_price=instance.base_price,
-                market_condition='Normal',  # You might want to make this configurable
-                notes='Automatic price history entry'
-            )
-    except DeviceModel.DoesNotExist:
-        # This is a new instance, no need to create history
-        pass
+class CacheVersion(models.Model):
+    """Version stamp of an in-memory table or cache, shared by every process (see version_stamps)"""
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
@@ -0,0 +1,216 @@
+"""
+Device model prices as a time series.
+
+Every recorded price is appended to PriceHistory and folded into one daily
+and one monthly PriceRollup bucket (min, max, sum, count, close).
+Trend queries therefore read one row per bucket: a two-year monthly trend
+is 24 rows, however many price changes happened in that time.
+
+A DeviceModel remembers the price it was loaded with (see
+``DeviceModel.from_db``). A save can then tell whether the price changed
+without reading the row again.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import DeviceModel, PriceHistory, PriceRollup
+
+DAY = 'day'
+MONTH = 'month'
+PERIODS = (DAY, MONTH)
+
+# Ranges longer than this are answered from monthly buckets by default
+DAILY_TREND_MAX_DAYS = 92
+
+
+def _as_price(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def bucket_start(period, moment):
+    day = timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+    return day.replace(day=1) if period == MONTH else day
+
+
+def _new_rollup(device_model_id, period, start, price):
+    return PriceRollup(
+        device_model_id=device_model_id, period=period, bucket_start=start,
+        min_price=price, max_price=price, sum_price=price, sample_count=1, close_price=price,
+    )
+
+
+def _fold(rollup, price):
+    """Add a price to a rollup in memory"""
+    rollup.min_price = min(rollup.min_price, price)
+    rollup.max_price = max(rollup.max_price, price)
+    rollup.sum_price += price
+    rollup.sample_count += 1
+    rollup.close_price = price
+
+
+def _fold_expressions(price):
+    """Update expressions that add a price to a rollup row in the database"""
+    return {
+        'min_price': Least('min_price', Value(price)),
+        'max_price': Greatest('max_price', Value(price)),
+        'sum_price': F('sum_price') + price,
+        'sample_count': F('sample_count') + 1,
+        'close_price': price,
+    }
+
+
+def _record_in_rollups(device_model_id, price, recorded_at):
+    for period in PERIODS:
+        start = bucket_start(period, recorded_at)
+        bucket = PriceRollup.objects.filter(device_model_id=device_model_id, period=period, bucket_start=start)
+        # One conditional UPDATE folds the price in, so concurrent writers never lose a sample
+        updated = bucket.update(**_fold_expressions(price))
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                _new_rollup(device_model_id, period, start, price).save(force_insert=True)
+        except IntegrityError:
+            # Another writer created the bucket first; fold into theirs
+            bucket.update(**_fold_expressions(price))
+
+
+@transaction.atomic
+def record_price(device_model_id, price, notes='Automatic price history entry', recorded_at=None):
+    """Append one price point and update its daily and monthly rollups"""
+    price = _as_price(price)
+    entry = PriceHistory.objects.create(
+        device_model_id=device_model_id,
+        base_price=price,
+        market_condition='Normal',
+        notes=notes,
+    )
+    _record_in_rollups(device_model_id, price, recorded_at or entry.recorded_at)
+    return entry
+
+
+def record_prices(prices, notes, recorded_at=None):
+    """
+    Bulk record_price for [(device_model_id, price)], for catalog imports.
+
+    Call inside a transaction. Each affected bucket is read once and then
+    written back with one bulk update plus one bulk insert per batch.
+    """
+    if not prices:
+        return
+    prices = [(model_id, _as_price(price)) for model_id, price in prices]
+    recorded_at = recorded_at or timezone.now()
+    PriceHistory.objects.bulk_create([
+        PriceHistory(device_model_id=model_id, base_price=price, market_condition='Normal', notes=notes)
+        for model_id, price in prices
+    ])
+
+    for period in PERIODS:
+        start = bucket_start(period, recorded_at)
+        model_ids = {model_id for model_id, _ in prices}
+        buckets = {
+            rollup.device_model_id: rollup
+            for rollup in PriceRollup.objects.select_for_update().filter(
+                period=period, bucket_start=start, device_model_id__in=model_ids
+            )
+        }
+        new_buckets = {}
+        for model_id, price in prices:
+            rollup = buckets.get(model_id) or new_buckets.get(model_id)
+            if rollup is None:
+                new_buckets[model_id] = _new_rollup(model_id, period, start, price)
+            else:
+                _fold(rollup, price)
+        PriceRollup.objects.bulk_update(
+            buckets.values(), ['min_price', 'max_price', 'sum_price', 'sample_count', 'close_price']
+        )
+        PriceRollup.objects.bulk_create(new_buckets.values())
+
+
+def price_trend(device_model_id, start, end=None, period=None):
+    """
+    Price buckets for a device model between two dates, oldest first.
+
+    ``period`` defaults to daily buckets for ranges up to
+    DAILY_TREND_MAX_DAYS and monthly buckets beyond that.
+    """
+    end = end or timezone.localdate()
+    if period is None:
+        period = DAY if (end - start) <= timedelta(days=DAILY_TREND_MAX_DAYS) else MONTH
+    if period == MONTH:
+        start = start.replace(day=1)
+    rows = (
+        PriceRollup.objects.filter(
+            device_model_id=device_model_id, period=period, bucket_start__gte=start, bucket_start__lte=end
+        )
+        .order_by('bucket_start')
+        .values_list('bucket_start', 'min_price', 'max_price', 'sum_price', 'sample_count', 'close_price')
+    )
+    return [
+        {
+            'bucket': bucket.isoformat(),
+            'min': float(low),
+            'max': float(high),
+            'avg': float(total / count),
+            'close': float(close),
+            'samples': count,
+        }
+        for bucket, low, high, total, count, close in rows
+    ]
+
+
+def rebuild_rollups(device_model_ids=None):
+    """Recompute every rollup from PriceHistory, e.g. after a backfill. Returns the buckets written."""
+    history = PriceHistory.objects.order_by('device_model_id', 'recorded_at', 'id')
+    if device_model_ids is not None:
+        history = history.filter(device_model_id__in=device_model_ids)
+
+    buckets = defaultdict(dict)
+    for model_id, price, recorded_at in history.values_list('device_model_id', 'base_price', 'recorded_at').iterator():
+        for period in PERIODS:
+            key = (model_id, bucket_start(period, recorded_at))
+            rollup = buckets[period].get(key)
+            if rollup is None:
+                buckets[period][key] = _new_rollup(model_id, period, key[1], price)
+            else:
+                _fold(rollup, price)
+
+    with transaction.atomic():
+        existing = PriceRollup.objects.all()
+        if device_model_ids is not None:
+            existing = existing.filter(device_model_id__in=device_model_ids)
+        existing.delete()
+        rollups = [rollup for period_buckets in buckets.values() for rollup in period_buckets.values()]
+        PriceRollup.objects.bulk_create(rollups, batch_size=5000)
+    return len(rollups)
+
+
+@receiver(pre_save, sender=DeviceModel)
+def remember_stored_price(sender, instance, raw=False, **kwargs):
+    """Read the stored price only for instances that were built by hand rather than loaded"""
+    if raw or instance.pk is None or hasattr(instance, '_loaded_base_price'):
+        return
+    instance._loaded_base_price = (
+        DeviceModel.objects.filter(pk=instance.pk).values_list('base_price', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=DeviceModel)
+def update_price_history(sender, instance, created, raw=False, **kwargs):
+    """Record the price of a new model, and of an existing model whenever it changes"""
+    if raw:
+        # Fixture loading
+        return
+    price = _as_price(instance.base_price)
+    previous = getattr(instance, '_loaded_base_price', None)
+    if created or previous is None or _as_price(previous) != price:
+        record_price(instance.pk, price, notes='Initial price' if created else 'Automatic price history entry')
+    instance._loaded_base_price = price
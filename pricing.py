@@ -0,0 +1,243 @@
+"""
+Single pricing engine for submitted items and catalog quotes.
+
+The multiplier tables used to be rebuilt as Decimal dicts inside each view
+on every call. They are compiled once here into read-only lookup arrays,
+with a scalar entry point for single requests and a numpy entry point for
+batches. Both share the same tables, so the two paths cannot drift apart.
+
+Two rule sets exist:
+
+* item estimates (``estimate_item_price``), used for submitted e-waste
+  items. They run either on the fixed rules or on the ML model, chosen by
+  ``strategy`` / ``EWASTE_PRICING_STRATEGY``.
+* catalog quotes (``quote_catalog_price``), used by the price calculator.
+  They depreciate a DeviceModel's base price and never go below the
+  device's material value.
+
+Both rule sets depreciate along the fitted per-model, brand or device type
+curve from ``depreciation`` when one exists, and along the fixed linear
+schedules below otherwise.
+"""
+import logging
+from types import MappingProxyType
+
+from django.conf import settings
+
+from .depreciation import depreciation_index
+from .lazy_imports import np
+from .model_registry import get_price_predictor
+
+logger = logging.getLogger(__name__)
+
+RULES = 'rules'
+ML = 'ml'
+STRATEGIES = (RULES, ML)
+
+
+class RuleTable:
+    """An immutable category -> multiplier table with a default for unknown keys"""
+
+    def __init__(self, mapping, default):
+        self.default = float(default)
+        self._scalar = MappingProxyType({key: float(value) for key, value in mapping.items()})
+        self._index = MappingProxyType({key: i for i, key in enumerate(mapping)})
+        self._values = None
+
+    @property
+    def values(self):
+        """Lookup array, built on first batch use so the scalar path never imports numpy"""
+        if self._values is None:
+            # The default sits after the known values so unknown keys can index it
+            values = np.array([*self._scalar.values(), self.default], dtype=np.float64)
+            values.setflags(write=False)
+            self._values = values
+        return self._values
+
+    def lookup(self, key):
+        return self._scalar.get(key, self.default)
+
+    def take(self, keys):
+        """Vectorized lookup, resolving each distinct key only once"""
+        uniques, inverse = np.unique(np.asarray(keys, dtype=str), return_inverse=True)
+        default_index = len(self.values) - 1
+        codes = np.array([self._index.get(key, default_index) for key in uniques], dtype=np.intp)
+        return self.values[codes[inverse]]
+
+
+# Item estimates: base prices in Indian Rupees
+ITEM_BASE_PRICES = RuleTable({
+    'mobile': 2000,   # Smartphones
+    'laptop': 5000,   # Laptops
+    'tablet': 1500,   # Tablets
+    'tv': 3000,       # Smart TVs
+    'other': 1000,    # Other devices
+}, default=1000)
+
+# Functional status multipliers
+FUNCTIONAL_MULTIPLIERS = RuleTable({
+    'working': 0.8,            # 80% of base price
+    'partially_working': 0.5,  # 50% of base price
+    'damaged': 0.3,            # 30% of base price
+    'not_working': 0.1,        # 10% of base price
+}, default=0.3)
+
+# Component status multipliers
+COMPONENT_MULTIPLIERS = RuleTable({
+    'good': 1.0,
+    'bad': 0.5,
+    'na': 0.7,  # Not applicable
+}, default=0.7)
+
+# 10% depreciation per year, at most 70%
+ITEM_AGE_DEPRECIATION = 0.1
+ITEM_MIN_AGE_MULTIPLIER = 0.3
+
+# Catalog quotes: condition multipliers on the model's base price
+CONDITION_MULTIPLIERS = RuleTable({
+    'working': 1.00,            # 100% of base price
+    'partially_working': 0.60,  # 60% of base price
+    'not_working': 0.30,        # 30% of base price
+}, default=0.30)
+
+# Up to 80% depreciation, spread over 5 years
+CATALOG_MAX_AGE_DEPRECIATION = 0.80
+CATALOG_DEPRECIATION_PER_YEAR = CATALOG_MAX_AGE_DEPRECIATION / 5
+CATALOG_MIN_AGE_MULTIPLIER = 1 - CATALOG_MAX_AGE_DEPRECIATION
+
+
+def default_strategy():
+    return getattr(settings, 'EWASTE_PRICING_STRATEGY', RULES)
+
+
+def active_model_version(strategy=None):
+    """Version that would price an item now: the active ML model's, or RULES"""
+    if (strategy or default_strategy()) == ML:
+        try:
+            return get_price_predictor().model_version
+        except Exception:
+            logger.exception('Price model unavailable, items are priced by rules')
+    return RULES
+
+
+def estimate_item_price(item_type, functional_status, age, battery_status, screen_condition,
+                        motherboard_status, strategy=None, brand=None):
+    """Estimated price of a submitted item in INR, unrounded"""
+    return estimate_item_price_versioned(
+        item_type, functional_status, age, battery_status, screen_condition, motherboard_status, strategy, brand
+    )[0]
+
+
+def item_age_multiplier(item_type, age, brand=None):
+    """Share of an item's base price kept at ``age``: fitted curve, else 10% a year down to 0.3"""
+    curve = depreciation_index.curve_for_item(item_type, brand)
+    if curve is not None:
+        return curve.multiplier(age, ITEM_MIN_AGE_MULTIPLIER)
+    return max(ITEM_MIN_AGE_MULTIPLIER, 1 - float(age) * ITEM_AGE_DEPRECIATION)
+
+
+def estimate_item_price_versioned(item_type, functional_status, age, battery_status, screen_condition,
+                                  motherboard_status, strategy=None, brand=None):
+    """Return (price, version): the ML model version that produced the price, or RULES"""
+    if (strategy or default_strategy()) == ML:
+        try:
+            price, model_version = get_price_predictor().predict_price_versioned(
+                item_type,
+                functional_status,
+                age,
+                batteryStatus=battery_status or 'na',
+                screenCondition=screen_condition or 'na',
+                motherboardStatus=motherboard_status or 'na'
+            )
+        except Exception:
+            # A missing or unloadable model must not fail submissions or analysis jobs
+            logger.exception('Price model unavailable, falling back to rules')
+        else:
+            if price is not None:
+                return price, model_version
+            logger.warning('ML price prediction failed, falling back to rules')
+
+    component_multiplier = (
+        COMPONENT_MULTIPLIERS.lookup(battery_status)
+        + COMPONENT_MULTIPLIERS.lookup(screen_condition)
+        + COMPONENT_MULTIPLIERS.lookup(motherboard_status)
+    ) / 3
+    age_multiplier = item_age_multiplier(item_type, age, brand)
+    price = (
+        ITEM_BASE_PRICES.lookup(item_type)
+        * FUNCTIONAL_MULTIPLIERS.lookup(functional_status)
+        * component_multiplier
+        * age_multiplier
+    )
+    return price, RULES
+
+
+def estimate_item_prices(item_types, functional_statuses, ages, battery_statuses, screen_conditions,
+                         motherboard_statuses, strategy=None, brands=None):
+    """Vectorized estimate_item_price over equal-length columns"""
+    if (strategy or default_strategy()) == ML:
+        try:
+            return get_price_predictor().predict_batch({
+                'device_type': item_types,
+                'condition': functional_statuses,
+                'age': ages,
+                'battery_status': battery_statuses,
+                'screen_condition': screen_conditions,
+                'motherboard_status': motherboard_statuses,
+            })
+        except Exception:
+            logger.exception('Price model unavailable, falling back to rules')
+
+    component_multiplier = (
+        COMPONENT_MULTIPLIERS.take(battery_statuses)
+        + COMPONENT_MULTIPLIERS.take(screen_conditions)
+        + COMPONENT_MULTIPLIERS.take(motherboard_statuses)
+    ) / 3
+    ages = np.asarray(ages, dtype=np.float64)
+    if brands is None:
+        brands = [None] * len(ages)
+    curves = [depreciation_index.curve_for_item(item_type, brand) for item_type, brand in zip(item_types, brands)]
+    age_multiplier = _age_multipliers(
+        curves, ages, np.maximum(ITEM_MIN_AGE_MULTIPLIER, 1 - ages * ITEM_AGE_DEPRECIATION), ITEM_MIN_AGE_MULTIPLIER
+    )
+    return (
+        ITEM_BASE_PRICES.take(item_types)
+        * FUNCTIONAL_MULTIPLIERS.take(functional_statuses)
+        * component_multiplier
+        * age_multiplier
+    )
+
+
+def catalog_curve(device_model):
+    """Fitted depreciation curve for a DeviceModel, or None for the fixed schedule"""
+    return depreciation_index.curve_for(device_model.pk, device_model.brand_id, device_model.device_type)
+
+
+def quote_catalog_price(base_price, condition, age, material_total=0.0, curve=None):
+    """Quote for a catalog model, floored at its material value and rounded to the rupee"""
+    if curve is not None:
+        age_multiplier = curve.multiplier(age, CATALOG_MIN_AGE_MULTIPLIER)
+    else:
+        age_multiplier = 1 - min(CATALOG_MAX_AGE_DEPRECIATION, float(age) * CATALOG_DEPRECIATION_PER_YEAR)
+    price = float(base_price) * CONDITION_MULTIPLIERS.lookup(condition) * age_multiplier
+    return float(round(max(price, material_total)))
+
+
+def quote_catalog_prices(base_prices, conditions, ages, material_totals, curves=None):
+    """Vectorized quote_catalog_price over equal-length columns; ``curves`` holds a curve or None per row"""
+    ages = np.asarray(ages, dtype=np.float64)
+    age_multiplier = 1 - np.minimum(CATALOG_MAX_AGE_DEPRECIATION, ages * CATALOG_DEPRECIATION_PER_YEAR)
+    if curves is not None:
+        age_multiplier = _age_multipliers(curves, ages, age_multiplier, CATALOG_MIN_AGE_MULTIPLIER)
+    prices = np.asarray(base_prices, dtype=np.float64) * CONDITION_MULTIPLIERS.take(conditions) * age_multiplier
+    return np.round(np.maximum(prices, np.asarray(material_totals, dtype=np.float64)))
+
+
+def _age_multipliers(curves, ages, fallback, max_floor):
+    """Evaluate per-row curves (floors capped at ``max_floor``), using ``fallback`` for rows without one"""
+    if not any(curve is not None for curve in curves):
+        return fallback
+    rates = np.array([curve.rate if curve is not None else np.nan for curve in curves])
+    floors = np.minimum(np.array([curve.floor if curve is not None else np.nan for curve in curves]), max_floor)
+    fitted = np.maximum(floors, np.exp(-rates * np.maximum(ages, 0.0)))
+    return np.where(np.isnan(rates), fallback, fitted)
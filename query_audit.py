@@ -0,0 +1,60 @@
+"""
+Query-count and query-plan checks for the hot views.
+
+``assert_max_queries`` fails when a block runs more queries than its budget,
+and ``explain`` returns the database's plan for each captured SELECT. The
+``audit_queries`` management command runs both against the hot views, and
+in CI it fails the build when a budget or an index is lost.
+"""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A block ran more queries than its budget allows"""
+
+
+@contextmanager
+def assert_max_queries(budget, using=DEFAULT_DB_ALIAS, label='block'):
+    """Capture the queries run in the block and fail if there are more than ``budget``"""
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+    if len(captured) > budget:
+        statements = '\n'.join(f'  {query["sql"]}' for query in captured.captured_queries)
+        raise QueryBudgetExceeded(
+            f'{label} ran {len(captured)} queries, budget is {budget}:\n{statements}'
+        )
+
+
+def explain(captured, using=DEFAULT_DB_ALIAS):
+    """Return [(sql, plan)] for the SELECTs in a CaptureQueriesContext"""
+    connection = connections[using]
+    prefix = connection.ops.explain_query_prefix()
+    plans = []
+    with connection.cursor() as cursor:
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            # Captured SQL has its parameters inlined, so it can be explained as is
+            cursor.execute(f'{prefix} {sql}')
+            plans.append((sql, '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())))
+    return plans
+
+
+# Plan lines that mean a table was read in full (SQLite, PostgreSQL)
+FULL_SCAN_MARKERS = ('SCAN ', 'Seq Scan')
+
+
+def full_scans(plans, tables):
+    """The (sql, plan) pairs whose plan scans one of ``tables`` without an index"""
+    flagged = []
+    for sql, plan in plans:
+        for line in plan.splitlines():
+            if any(marker in line for marker in FULL_SCAN_MARKERS) and 'INDEX' not in line.upper() \
+                    and any(table in line for table in tables):
+                flagged.append((sql, plan))
+                break
+    return flagged
@@ -0,0 +1,122 @@
+"""
+Memoized price quotes.
+
+Pricing inputs take few distinct values, so identical quotes are computed
+over and over. Quotes are cached under their normalized input tuple plus a
+pricing version stamp. The stamp is bumped whenever DeviceModel prices,
+material data or depreciation curves change. It lives in the database (see
+``version_stamps``), so every worker stops serving the old quotes within
+EWASTE_VERSION_CHECK_SECONDS of a change made by any process.
+
+Each process keeps a bounded LRU with a TTL. With
+``EWASTE_QUOTE_CACHE_SHARED = True`` misses also go to the Django cache,
+so gunicorn workers share each other's results.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import DepreciationCurve, DeviceModel, DeviceModelComponent, MaterialPrice
+from .version_stamps import version_stamp
+
+VERSION_STAMP = version_stamp('pricing')
+
+_MISSING = object()
+
+
+def pricing_version():
+    return VERSION_STAMP.get()
+
+
+def bump_pricing_version():
+    VERSION_STAMP.bump()
+
+
+class QuoteCache:
+    """Bounded LRU/TTL cache of quotes keyed on normalized pricing inputs"""
+
+    def __init__(self, max_entries=10000, ttl=3600, shared=False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        """Return the cached quote for ``key``, calling ``compute()`` on a miss"""
+        key = (pricing_version(),) + tuple(key)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.local_hits += 1
+                return entry[1]
+
+        value = _MISSING
+        if self.shared:
+            shared_key = self._shared_key(key)
+            value = cache.get(shared_key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            if self.shared:
+                cache.set(shared_key, value, timeout=self.ttl)
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.shared_hits += 1
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.local_hits + self.shared_hits) / lookups, 4) if lookups else 0,
+                'pricing_version': pricing_version(),
+            }
+
+    @staticmethod
+    def _shared_key(key):
+        return 'ewaste:quote:' + hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+quote_cache = QuoteCache(
+    max_entries=getattr(settings, 'EWASTE_QUOTE_CACHE_MAX_ENTRIES', 10000),
+    ttl=getattr(settings, 'EWASTE_QUOTE_CACHE_TTL', 3600),
+    shared=getattr(settings, 'EWASTE_QUOTE_CACHE_SHARED', False),
+)
+
+
+@receiver([post_save, post_delete], sender=DeviceModel)
+@receiver([post_save, post_delete], sender=MaterialPrice)
+@receiver([post_save, post_delete], sender=DeviceModelComponent)
+@receiver([post_save, post_delete], sender=DepreciationCurve)
+def invalidate_quotes(sender, **kwargs):
+    """New prices, material data or depreciation curves make every cached quote stale"""
+    bump_pricing_version()
@@ -0,0 +1,246 @@
+"""
+Vehicle routing for a day's pickups.
+
+Each depot's problem is solved on its own: stops have a demand in kg and a
+time window, vehicles have a capacity in kg and a shift. ``solve`` works in
+two phases over a precomputed distance matrix:
+
+1. Construction. Each vehicle in turn goes to the stop it can start
+   serving soonest, as long as capacity, the stop's window and the return
+   to the depot before the end of the shift all allow it.
+2. Improvement. Each route is improved with 2-opt (reverse a segment) and
+   Or-opt (move a run of 1-3 stops elsewhere in the route) until no move
+   shortens it. The gain of every move is computed at once with numpy;
+   only the best candidates are checked against the time windows.
+
+``solve_depots`` solves several depots in a process pool. This module does
+not touch Django, so pool workers start quickly and the benchmark
+(``python -m ewaste.benchmark_routes``) runs without a database.
+"""
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Times are minutes since midnight
+Stop = namedtuple('Stop', 'id latitude longitude demand_kg earliest latest')
+Depot = namedtuple('Depot', 'name latitude longitude')
+Route = namedtuple('Route', 'vehicle stops arrivals distance_km load_kg')
+Solution = namedtuple('Solution', 'depot routes unassigned distance_km')
+
+DEFAULT_SPEED_KMH = 25.0
+DEFAULT_SERVICE_MINUTES = 10.0
+DEFAULT_SHIFT = (8 * 60, 19 * 60)
+
+# Improving moves checked against the time windows per pass before giving up
+MAX_CANDIDATES = 32
+EPSILON = 1e-9
+
+
+def distance_matrix(latitudes, longitudes):
+    """Great-circle distances in km between every pair of points"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    h = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+class _Problem:
+    """One depot's instance; node 0 is the depot and node i is stops[i - 1]"""
+
+    def __init__(self, depot, stops, speed_kmh, service_minutes, shift, distances):
+        self.stops = stops
+        if distances is None:
+            distances = distance_matrix(
+                [depot.latitude] + [stop.latitude for stop in stops],
+                [depot.longitude] + [stop.longitude for stop in stops],
+            )
+        self.distances = distances
+        self.travel = distances * (60.0 / speed_kmh)
+        self.service = float(service_minutes)
+        self.shift_start, self.shift_end = shift
+        self.demand = np.array([0.0] + [stop.demand_kg for stop in stops])
+        self.earliest = np.array([self.shift_start] + [stop.earliest for stop in stops], dtype=np.float64)
+        self.latest = np.array([self.shift_end] + [stop.latest for stop in stops], dtype=np.float64)
+        # Plain lists are faster than numpy scalars in the schedule loop
+        self._earliest = self.earliest.tolist()
+        self._latest = self.latest.tolist()
+
+    def schedule(self, route):
+        """Service start time at each node of a depot-to-depot route, or None if a window is missed"""
+        travel, earliest, latest = self.travel, self._earliest, self._latest
+        now = self.shift_start
+        starts = [now]
+        for prev, node in zip(route, route[1:]):
+            if prev:
+                now += self.service
+            now = max(now + travel[prev, node], earliest[node])
+            if now > latest[node]:
+                return None
+            starts.append(now)
+        return starts
+
+    def construct(self, capacities):
+        """Nearest-neighbour routes (node arrays from depot to depot), one per vehicle used"""
+        unvisited = np.ones(len(self.stops) + 1, dtype=bool)
+        unvisited[0] = False
+        back_to_depot = self.travel[:, 0]
+        routes = []
+        for vehicle, capacity in enumerate(capacities):
+            if not unvisited.any():
+                break
+            route, load, now, current = [0], 0.0, float(self.shift_start), 0
+            while True:
+                arrival = now + (self.service if current else 0.0) + self.travel[current]
+                start = np.maximum(arrival, self.earliest)
+                feasible = (
+                    unvisited
+                    & (start <= self.latest)
+                    & (load + self.demand <= capacity)
+                    & (start + self.service + back_to_depot <= self.shift_end)
+                )
+                if not feasible.any():
+                    break
+                current = int(np.argmin(np.where(feasible, start, np.inf)))
+                route.append(current)
+                unvisited[current] = False
+                load += self.demand[current]
+                now = start[current]
+            if len(route) > 1:
+                routes.append((vehicle, np.array(route + [0])))
+        return routes, np.flatnonzero(unvisited)
+
+    def length(self, route):
+        return float(self.distances[route[:-1], route[1:]].sum())
+
+    def improve(self, route, deadline):
+        """Apply 2-opt and Or-opt moves until neither shortens the route"""
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            for move in (self._two_opt, self._or_opt):
+                better = move(route)
+                while better is not None:
+                    route, improved = better, True
+                    if time.perf_counter() >= deadline:
+                        return route
+                    better = move(route)
+        return route
+
+    def _first_feasible(self, delta, build):
+        """The feasible route of the most improving candidate move, or None"""
+        candidates = np.flatnonzero(delta < -EPSILON)
+        if not len(candidates):
+            return None
+        candidates = candidates[np.argsort(delta.ravel()[candidates])][:MAX_CANDIDATES]
+        for flat in candidates:
+            new_route = build(*np.unravel_index(flat, delta.shape))
+            if self.schedule(new_route) is not None:
+                return new_route
+        return None
+
+    def _two_opt(self, route):
+        """Reverse route[i + 1:j + 1] for the best feasible (i, j)"""
+        a, b = route[:-1], route[1:]
+        d = self.distances
+        edge = d[a, b]
+        delta = d[a[:, None], a[None, :]] + d[b[:, None], b[None, :]] - edge[:, None] - edge[None, :]
+        # Only j >= i + 2 changes the route
+        delta[np.tril_indices(len(a), 1)] = 0.0
+
+        def build(i, j):
+            return np.concatenate([route[:i + 1], route[j:i:-1], route[j + 1:]])
+        return self._first_feasible(delta, build)
+
+    def _or_opt(self, route):
+        """Move the best feasible run of 1-3 stops to another position in the route"""
+        d = self.distances
+        a, b = route[:-1], route[1:]
+        edge = d[a, b]
+        for length in (1, 2, 3):
+            starts = np.arange(1, len(route) - length)
+            if not len(starts):
+                continue
+            first, last = route[starts], route[starts + length - 1]
+            prev, nxt = route[starts - 1], route[starts + length]
+            removal = d[prev, first] + d[last, nxt] - d[prev, nxt]
+            insertion = d[a[None, :], first[:, None]] + d[last[:, None], b[None, :]] - edge[None, :]
+            delta = insertion - removal[:, None]
+            # Inserting next to or inside the run itself is not a move
+            positions = np.arange(len(a))
+            delta[(positions[None, :] >= starts[:, None] - 1) & (positions[None, :] < starts[:, None] + length)] = 0.0
+
+            def build(row, j, length=length):
+                i = starts[row]
+                segment = route[i:i + length]
+                rest = np.concatenate([route[:i], route[i + length:]])
+                # Edge j of the original route sits at j - length in ``rest`` once j is past the run
+                at = j + 1 if j < i else j + 1 - length
+                return np.concatenate([rest[:at], segment, rest[at:]])
+            better = self._first_feasible(delta, build)
+            if better is not None:
+                return better
+        return None
+
+
+def solve(depot, stops, capacities, speed_kmh=DEFAULT_SPEED_KMH, service_minutes=DEFAULT_SERVICE_MINUTES,
+          shift=DEFAULT_SHIFT, distances=None, time_limit=None):
+    """
+    Route ``stops`` from ``depot`` with one vehicle per entry of ``capacities`` (kg).
+
+    ``distances`` may pass a precomputed (n + 1) x (n + 1) km matrix with
+    the depot first. ``time_limit`` caps the improvement phase in seconds.
+    Stops no vehicle can serve are returned in ``unassigned``.
+    """
+    problem = _Problem(depot, stops, speed_kmh, service_minutes, shift, distances)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else float('inf')
+    constructed, unvisited = problem.construct(capacities)
+
+    routes = []
+    for vehicle, nodes in constructed:
+        nodes = problem.improve(nodes, deadline)
+        routes.append(Route(
+            vehicle=vehicle,
+            stops=[stops[node - 1].id for node in nodes[1:-1]],
+            arrivals=problem.schedule(nodes)[1:-1],
+            distance_km=problem.length(nodes),
+            load_kg=float(problem.demand[nodes].sum()),
+        ))
+    return Solution(
+        depot=depot,
+        routes=routes,
+        unassigned=[stops[node - 1].id for node in unvisited],
+        distance_km=sum(route.distance_km for route in routes),
+    )
+
+
+def assign_to_depots(depots, stops):
+    """Split stops between depots, each stop going to its nearest depot"""
+    if not stops:
+        return [[] for _ in depots]
+    distances = distance_matrix(
+        [depot.latitude for depot in depots] + [stop.latitude for stop in stops],
+        [depot.longitude for depot in depots] + [stop.longitude for stop in stops],
+    )[:len(depots), len(depots):]
+    nearest = np.argmin(distances, axis=0)
+    return [[stop for stop, depot_index in zip(stops, nearest) if depot_index == index]
+            for index in range(len(depots))]
+
+
+def _solve_problem(args):
+    depot, stops, capacities, options = args
+    return solve(depot, stops, capacities, **options)
+
+
+def solve_depots(problems, processes=None, **options):
+    """Solve [(depot, stops, capacities)] in parallel; returns a Solution per depot, in order"""
+    tasks = [(depot, stops, capacities, options) for depot, stops, capacities in problems]
+    if len(tasks) <= 1 or processes == 1:
+        return [_solve_problem(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(_solve_problem, tasks))
@@ -0,0 +1,322 @@
+"""
+Capacity-aware collection scheduling.
+
+Pickup addresses are geocoded from the local GeocodedAddress table, whose
+rows carry a geohash and a zone. Each zone has a CollectionSlot per date
+and time window with a fixed capacity. Booking reserves one place in the
+slot with a single conditional UPDATE, so concurrent bookings can never
+push a slot past its capacity. Collections that cannot be matched to a
+slot are still saved, flagged ``needs_review`` for ops to place by hand.
+
+``plan_routes`` batches a day's confirmed collections into PickupRoutes.
+Stops are grouped by time window and zone, sorted by geohash (a Z-order
+curve, so nearby stops sort together), and cut into routes along geohash
+cell boundaries. Planning is one query plus a sort, so a day with tens of
+thousands of pickups plans in about a second.
+
+``route_stops`` and ``save_vehicle_routes`` connect the same collections to
+``route_optimizer``, which orders them into vehicle routes from a depot.
+Its numpy dependency is imported only when those run.
+"""
+import hashlib
+import logging
+from datetime import time
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .depreciation import ITEM_TYPE_ALIASES
+from .material_values import DEFAULT_MATERIAL_WEIGHTS, DEFAULT_OTHER_WEIGHTS
+from .models import CollectionSchedule, CollectionSlot, DeviceModelComponent, GeocodedAddress, PickupRoute
+
+logger = logging.getLogger(__name__)
+
+# Start (inclusive) and end (exclusive) of each pickup window
+WINDOW_HOURS = {
+    'morning': (time(9), time(12)),
+    'afternoon': (time(12), time(15)),
+    'evening': (time(15), time(18)),
+}
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+
+
+class SlotUnavailable(Exception):
+    """The slot for the requested address, date and time is full"""
+
+
+def normalize_address(address):
+    return ' '.join(address.lower().replace(',', ' ').split())
+
+
+def address_key(address):
+    """GeocodedAddress.address_key for a free-text address"""
+    return hashlib.sha1(normalize_address(address).encode('utf-8')).hexdigest()
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Standard base32 geohash of a point"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value_range, value = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def default_zone(geohash):
+    """Zone of an address without one assigned: its geohash cell (precision 5 is about 5 x 5 km)"""
+    return geohash[:getattr(settings, 'EWASTE_ZONE_GEOHASH_PRECISION', 5)]
+
+
+def lookup_address(address):
+    return GeocodedAddress.objects.filter(address_key=address_key(address)).first()
+
+
+def window_for(preferred_time):
+    """The pickup window containing ``preferred_time``, or None outside pickup hours"""
+    for window, (start, end) in WINDOW_HOURS.items():
+        if start <= preferred_time < end:
+            return window
+    return None
+
+
+def reserve_slot(slot_id):
+    """Take one place in a slot; False when it is full"""
+    # The capacity check and the increment are one statement, so concurrent bookings serialize on the row
+    return CollectionSlot.objects.filter(pk=slot_id, reserved__lt=F('capacity')).update(
+        reserved=F('reserved') + 1
+    ) == 1
+
+
+def release_slot(slot_id):
+    CollectionSlot.objects.filter(pk=slot_id, reserved__gt=0).update(reserved=F('reserved') - 1)
+
+
+@transaction.atomic
+def book_collection(schedule):
+    """
+    Save an unsaved CollectionSchedule, reserving a slot when its zone has one open.
+
+    Raises SlotUnavailable only when the slot exists and is full. Addresses
+    missing from GeocodedAddress, times outside pickup hours and dates
+    without open slots are saved without a slot and flagged for ops review.
+    """
+    geocode = lookup_address(schedule.pickup_address)
+    window = window_for(schedule.preferred_time)
+    slot_id = None
+    if geocode is not None and window is not None:
+        slot_id = CollectionSlot.objects.filter(
+            date=schedule.preferred_date, window=window, zone=geocode.zone
+        ).values_list('id', flat=True).first()
+        if slot_id is not None and not reserve_slot(slot_id):
+            raise SlotUnavailable(f'No pickups are left in the {window} of {schedule.preferred_date:%d %b %Y} '
+                                  f'for your area. Please choose another date or time.')
+
+    schedule.slot_id = slot_id
+    schedule.geocode = geocode
+    schedule.needs_review = slot_id is None
+    schedule.save()
+    return schedule
+
+
+def open_slots(dates, capacity, zones=None):
+    """Create the missing slots for every zone, date and window. Returns the number created."""
+    if zones is None:
+        zones = GeocodedAddress.objects.values_list('zone', flat=True).distinct()
+    zones = list(zones)
+    existing = set(
+        CollectionSlot.objects.filter(date__in=dates, zone__in=zones).values_list('date', 'window', 'zone')
+    )
+    slots = [
+        CollectionSlot(date=date, window=window, zone=zone, capacity=capacity)
+        for date in dates for window in WINDOW_HOURS for zone in zones
+        if (date, window, zone) not in existing
+    ]
+    CollectionSlot.objects.bulk_create(slots, batch_size=5000, ignore_conflicts=True)
+    return len(slots)
+
+
+def _split_routes(stops, max_stops, cell_precision):
+    """Cut geohash-sorted (id, geohash) stops into routes, keeping each cell in one route when it fits"""
+    routes, current = [], []
+    for _, cell_stops in groupby(stops, key=lambda stop: stop[1][:cell_precision]):
+        cell_ids = [stop_id for stop_id, _ in cell_stops]
+        if current and len(current) + len(cell_ids) > max_stops:
+            routes.append(current)
+            current = []
+        while len(cell_ids) > max_stops:
+            routes.append(cell_ids[:max_stops])
+            cell_ids = cell_ids[max_stops:]
+        current.extend(cell_ids)
+    if current:
+        routes.append(current)
+    return routes
+
+
+@transaction.atomic
+def _replace_routes(date, planned):
+    """Swap the PickupRoutes of ``date`` for [(unsaved PickupRoute, stop ids in order)]"""
+    PickupRoute.objects.filter(date=date).delete()
+    routes = PickupRoute.objects.bulk_create([route for route, _ in planned])
+    CollectionSchedule.objects.bulk_update(
+        [
+            CollectionSchedule(pk=stop_id, route_id=route.pk, route_stop=position)
+            for route, (_, stop_ids) in zip(routes, planned)
+            for position, stop_id in enumerate(stop_ids, start=1)
+        ],
+        ['route', 'route_stop'],
+        batch_size=2000,
+    )
+    return routes
+
+
+def plan_routes(date, max_stops=None, cell_precision=None):
+    """
+    Replace the PickupRoutes of ``date`` with routes over its confirmed collections.
+
+    Each route holds at most ``max_stops`` stops from one window and zone;
+    stops are numbered in geohash order. Returns the new PickupRoute rows.
+    """
+    max_stops = max_stops or getattr(settings, 'EWASTE_ROUTE_MAX_STOPS', 25)
+    cell_precision = cell_precision or getattr(settings, 'EWASTE_ROUTE_CELL_PRECISION', 6)
+
+    groups = {}
+    rows = CollectionSchedule.objects.filter(preferred_date=date, status='confirmed').values_list(
+        'id', 'preferred_time', 'slot__window', 'slot__zone', 'geocode__zone', 'geocode__geohash'
+    )
+    for schedule_id, preferred_time, window, slot_zone, zone, geohash in rows.iterator(chunk_size=5000):
+        # Collections booked before slots existed are placed by their preferred time and address
+        window = window or window_for(preferred_time) or 'evening'
+        groups.setdefault((window, slot_zone or zone or ''), []).append((schedule_id, geohash or ''))
+
+    planned = []
+    for (window, zone), stops in sorted(groups.items()):
+        stops.sort(key=lambda stop: stop[1])
+        for number, stop_ids in enumerate(_split_routes(stops, max_stops, cell_precision), start=1):
+            planned.append((PickupRoute(date=date, window=window, zone=zone, number=number,
+                                        stop_count=len(stop_ids)), stop_ids))
+
+    routes = _replace_routes(date, planned)
+    logger.info(f"Planned {len(routes)} pickup routes for {date}")
+    return routes
+
+
+def pickup_weights_kg(items):
+    """
+    Estimated weight in kg of each (item_type, brand, model).
+
+    Uses the DeviceModelComponent weights (grams) of the matching catalog
+    model, else the average over models of the device type, else the
+    default material weights of the device type.
+    """
+    # Submitted brand and model names are matched case-insensitively, as in material_recovery
+    items = [
+        (ITEM_TYPE_ALIASES.get(item_type, item_type), (brand or '').strip().lower(), (model or '').strip().lower())
+        for item_type, brand, model in items
+    ]
+    model_grams = {}
+    for brand, name, total in (
+        DeviceModelComponent.objects.annotate(model_name=Lower('device_model__name'))
+        .filter(model_name__in={model for _, _, model in items})
+        .values_list('device_model__brand__name', 'device_model__name').annotate(total=Sum('weight'))
+    ):
+        model_grams[brand.strip().lower(), name.strip().lower()] = float(total or 0)
+    type_grams = {
+        device_type: float(total or 0) / models
+        for device_type, total, models in DeviceModelComponent.objects.values_list('device_model__device_type')
+        .annotate(total=Sum('weight'), models=Count('device_model', distinct=True))
+    }
+
+    def grams(device_type, brand, model):
+        known = model_grams.get((brand, model))
+        if known:
+            return known
+        if type_grams.get(device_type):
+            return type_grams[device_type]
+        return sum(DEFAULT_MATERIAL_WEIGHTS.get(device_type, DEFAULT_OTHER_WEIGHTS).values())
+
+    return [grams(*item) / 1000 for item in items]
+
+
+def route_stops(date):
+    """
+    route_optimizer Stops for the confirmed collections of ``date``.
+
+    Returns (stops, unlocated ids). The time window is the booked slot's,
+    else the window containing the preferred time, else an hour either
+    side of it. Collections without a geocode cannot be routed.
+    """
+    from .route_optimizer import Stop
+
+    rows = list(
+        CollectionSchedule.objects.filter(preferred_date=date, status='confirmed').values_list(
+            'id', 'preferred_time', 'slot__window', 'geocode__latitude', 'geocode__longitude',
+            'e_waste_item__item_type', 'e_waste_item__brand', 'e_waste_item__model',
+        )
+    )
+    weights = pickup_weights_kg([row[5:] for row in rows])
+
+    stops, unlocated = [], []
+    for (schedule_id, preferred_time, window, latitude, longitude, *_), weight in zip(rows, weights):
+        if latitude is None:
+            unlocated.append(schedule_id)
+            continue
+        window = window or window_for(preferred_time)
+        if window is not None:
+            start, end = WINDOW_HOURS[window]
+            earliest, latest = start.hour * 60 + start.minute, end.hour * 60 + end.minute
+        else:
+            minutes = preferred_time.hour * 60 + preferred_time.minute
+            earliest, latest = minutes - 60, minutes + 60
+        stops.append(Stop(schedule_id, latitude, longitude, weight, earliest, latest))
+    return stops, unlocated
+
+
+def save_vehicle_routes(date, solutions):
+    """Replace the PickupRoutes of ``date`` with the vehicle routes of route_optimizer Solutions"""
+    planned = [
+        (PickupRoute(date=date, window='', zone=solution.depot.name[:20], number=route.vehicle + 1,
+                     stop_count=len(route.stops), distance_km=route.distance_km, load_kg=route.load_kg),
+         route.stops)
+        for solution in solutions for route in solution.routes
+    ]
+    return _replace_routes(date, planned)
+
+
+@receiver(post_save, sender=CollectionSchedule)
+def release_cancelled_slot(sender, instance, raw=False, **kwargs):
+    """Give a cancelled collection's place back to its slot"""
+    if raw or instance.status != 'cancelled' or instance.slot_id is None:
+        return
+    release_slot(instance.slot_id)
+    CollectionSchedule.objects.filter(pk=instance.pk).update(slot=None)
+    instance.slot_id = None
+
+
+@receiver(post_delete, sender=CollectionSchedule)
+def release_deleted_slot(sender, instance, **kwargs):
+    if instance.slot_id is not None:
+        release_slot(instance.slot_id)
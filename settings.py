@@ -45,6 +45,94 @@ INSTALLED_APPS = [
 
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
+# Models loaded once per worker at startup instead of on the first request.
+# Valid names: 'price_predictor', 'image_analyzer'. Leave empty to load lazily.
+EWASTE_WARM_UP_MODELS = [
+    name for name in os.environ.get('EWASTE_WARM_UP_MODELS', '').split(',') if name
+]
+
+# Threads per worker process that analyze submitted images in the background.
+# They mostly wait on the batching inference service, so keep this at least
+# EWASTE_INFERENCE_BATCH_SIZE. Set to 0 to leave the queue to
+# `manage.py process_analysis_queue` alone.
+EWASTE_ANALYSIS_WORKERS = int(os.environ.get('EWASTE_ANALYSIS_WORKERS', 8))
+
+# Micro-batching of detector calls, for detectors with an analyze_batch method:
+# a batch runs once it has BATCH_SIZE images or BATCH_WINDOW_MS has passed since
+# its first image. At most MAX_QUEUE images may wait before callers are turned
+# away.
+EWASTE_INFERENCE_BATCH_SIZE = 8
+EWASTE_INFERENCE_BATCH_WINDOW_MS = 20
+EWASTE_INFERENCE_MAX_QUEUE = 64
+
+# Identifies the detector weights; cached analyses of re-uploaded images are
+# only reused for the same version. Bump it when the detector changes.
+EWASTE_DETECTOR_VERSION = os.environ.get('EWASTE_DETECTOR_VERSION', 'default')
+
+# Fraction of predictions whose preprocess/predict stages are timed
+# (reported by /ops/model-stats/)
+EWASTE_TIMING_SAMPLE_RATE = float(os.environ.get('EWASTE_TIMING_SAMPLE_RATE', 0.01))
+
+# How submitted items are priced: 'rules' (fixed multiplier tables) or 'ml'
+# (the trained EWastePricePredictor, falling back to rules if it fails)
+EWASTE_PRICING_STRATEGY = os.environ.get('EWASTE_PRICING_STRATEGY', 'rules')
+
+# Memoized price quotes per worker. Set EWASTE_QUOTE_CACHE_SHARED to also
+# share quotes between workers through the default cache backend.
+EWASTE_QUOTE_CACHE_MAX_ENTRIES = 10000
+EWASTE_QUOTE_CACHE_TTL = 3600
+EWASTE_QUOTE_CACHE_SHARED = False
+
+# Uploads are stored downscaled to the detector's input size (longest side, px),
+# plus a dashboard thumbnail; the full-resolution original is not kept.
+EWASTE_DETECTOR_INPUT_SIZE = 640
+EWASTE_THUMBNAIL_SIZE = 320
+EWASTE_IMAGE_JPEG_QUALITY = 85
+EWASTE_THUMBNAIL_JPEG_QUALITY = 75
+
+# Uploaded images remembered for deduplication (least recently used are evicted)
+EWASTE_IMAGE_CACHE_MAX_ENTRIES = 10000
+
+# Price model store. Workers check its manifest every EWASTE_MODEL_POLL_SECONDS
+# and swap in newly activated versions; up to EWASTE_MODEL_MAX_SHADOWS shadow
+# versions are scored alongside the active one. `python -m ewaste.train_model`
+# publishes to the same directory through the environment variable.
+EWASTE_MODEL_STORE_DIR = os.environ.get(
+    'EWASTE_MODEL_STORE_DIR', str(BASE_DIR / 'ewaste' / 'ml_models' / 'store')
+)
+EWASTE_MODEL_POLL_SECONDS = 5
+EWASTE_MODEL_MAX_SHADOWS = 2
+
+# Collection scheduling. Addresses without an assigned zone fall in the
+# geohash cell of EWASTE_ZONE_GEOHASH_PRECISION characters (5 is about 5 km
+# square). New slots take EWASTE_SLOT_CAPACITY pickups. The route planner
+# puts at most EWASTE_ROUTE_MAX_STOPS stops in a route and keeps geohash
+# cells of EWASTE_ROUTE_CELL_PRECISION characters together.
+EWASTE_ZONE_GEOHASH_PRECISION = 5
+EWASTE_SLOT_CAPACITY = 40
+EWASTE_ROUTE_MAX_STOPS = 25
+EWASTE_ROUTE_CELL_PRECISION = 6
+
+# Vehicle routing (manage.py optimize_collection_routes). Depots are
+# (name, latitude, longitude); each runs EWASTE_VEHICLES_PER_DEPOT vehicles
+# of EWASTE_VEHICLE_CAPACITY_KG, driving at EWASTE_ROUTE_SPEED_KMH and
+# spending EWASTE_PICKUP_SERVICE_MINUTES at each stop.
+EWASTE_DEPOTS = []
+EWASTE_VEHICLES_PER_DEPOT = 10
+EWASTE_VEHICLE_CAPACITY_KG = 500
+EWASTE_ROUTE_SPEED_KMH = 25
+EWASTE_PICKUP_SERVICE_MINUTES = 10
+
+# Share of each material's contained mass that recycling recovers, e.g.
+# {'gold': 0.95}. Materials not listed are fully recovered. Used by
+# material_recovery for model and lot valuations.
+EWASTE_MATERIAL_RECOVERY_RATES = {}
+
+# In-memory tables and caches (material values, depreciation curves, quotes,
+# catalog lookups) check their database version stamp at most this often, so
+# a change made in any process reaches every worker within this many seconds.
+EWASTE_VERSION_CHECK_SECONDS = 2
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -87,6 +175,21 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Local memory by default; point this at a shared backend (e.g. Redis) to
+# share cached catalog lookups and quotes between worker processes.
+# Invalidations do not depend on it: they go through the database (see
+# EWASTE_VERSION_CHECK_SECONDS).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ewaste',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -1,11 +1,36 @@
-import numpy as np
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
-import joblib
-from pathlib import Path
+"""
+Train the e-waste price model and export the fused artifact the app serves.
+
+Run from the project directory:
+
+    # Default: 1000 synthetic rows, scikit-learn fit, pickles plus fused JSON
+    python -m ewaste.train_model
+
+    # Stream 100M synthetic rows to disk in 1M-row npz shards
+    python -m ewaste.train_model --rows 100000000 --generate-only --output data/synthetic
+
+    # Fit out of core, on freshly generated chunks or on shards from --data
+    python -m ewaste.train_model --rows 100000000 --out-of-core
+    python -m ewaste.train_model --data data/synthetic --out-of-core
+
+Every run publishes its model to the model store (ml_models/store); running
+workers switch to it without a restart unless --no-activate is given.
+
+The out-of-core fit accumulates the normal equations chunk by chunk, so
+memory stays bounded by --chunk-rows whatever the row count. It needs
+numpy only, not scikit-learn.
+"""
+import argparse
 import os
+import tempfile
+import time
+from pathlib import Path
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .ml_model import FEATURE_COLUMNS, FUSED_MODEL_PATH, fuse_linear_model, save_fused_model
+from .model_store import DEFAULT_STORE_DIR, ModelStore
 
 # Get the current directory
 current_dir = Path(__file__).parent
@@ -14,71 +39,50 @@ current_dir = Path(__file__).parent
 ml_models_dir = current_dir / 'ml_models'
 ml_models_dir.mkdir(exist_ok=True)
 
-# Sample data for e-waste price prediction
-def generate_sample_data(n_samples=1000):
-    np.random.seed(42)
-    
+DEFAULT_CHUNK_ROWS = 1_000_000
+TEST_FRACTION = 0.2
+
+# Base prices indexed by device type: phone=0, laptop=1, tablet=2, desktop=3, tv=4, console=5
+BASE_PRICES = np.array([5000, 15000, 8000, 20000, 12000, 10000], dtype=np.float64)
+
+# Multipliers indexed by code: not_working/poor=0, partially_working/average=1, working/good=2
+CONDITION_MULTIPLIERS = np.array([0.3, 0.6, 1.0])
+BATTERY_MULTIPLIERS = np.array([0.9, 1.0, 1.1])
+SCREEN_MULTIPLIERS = np.array([0.7, 1.0, 1.2])
+MOTHERBOARD_MULTIPLIERS = np.array([0.6, 1.0, 1.2])
+
+MIN_SAMPLE_PRICE = 100
+
+
+def synthetic_prices(X):
+    """Prices for a feature matrix in FEATURE_COLUMNS order"""
+    device_types, ages, conditions, battery_status, screen_condition, mb_status = X.T
+    # Same multiplication order as the original per-row loop, so results match bit for bit
+    price = BASE_PRICES[device_types.astype(np.intp)]
+    price = price * (1 - 0.1 * ages)
+    price = price * CONDITION_MULTIPLIERS[conditions.astype(np.intp)]
+    price = price * BATTERY_MULTIPLIERS[battery_status.astype(np.intp)]
+    price = price * SCREEN_MULTIPLIERS[screen_condition.astype(np.intp)]
+    price = price * MOTHERBOARD_MULTIPLIERS[mb_status.astype(np.intp)]
+    return np.maximum(price, MIN_SAMPLE_PRICE)  # Ensure minimum price of 100
+
+
+def _draw_features(rng, n_samples):
     # Device types: phone=0, laptop=1, tablet=2, desktop=3, tv=4, console=5
-    device_types = np.random.randint(0, 6, n_samples)
-    
+    device_types = rng.randint(0, 6, n_samples)
+
     # Generate ages between 0 and 10 years
-    ages = np.random.uniform(0, 10, n_samples)
-    
+    ages = rng.uniform(0, 10, n_samples)
+
     # Conditions: working=2, partially_working=1, not_working=0
-    conditions = np.random.randint(0, 3, n_samples)
-    
-    # Battery status: good=2, average=1, poor=0, na=1
-    battery_status = np.random.randint(0, 3, n_samples)
-    
-    # Screen condition: good=2, average=1, poor=0, na=1
-    screen_condition = np.random.randint(0, 3, n_samples)
-    
-    # Motherboard status: good=2, average=1, poor=0, na=1
-    mb_status = np.random.randint(0, 3, n_samples)
-    
-    # Base prices for different device types
-    base_prices = {
-        0: 5000,  # phone
-        1: 15000, # laptop
-        2: 8000,  # tablet
-        3: 20000, # desktop
-        4: 12000, # tv
-        5: 10000  # console
-    }
-    
-    # Calculate prices
-    prices = []
-    for i in range(n_samples):
-        # Start with base price for device type
-        price = base_prices[device_types[i]]
-        
-        # Adjust for age (decrease by 10% per year)
-        price *= (1 - 0.1 * ages[i])
-        
-        # Adjust for condition
-        condition_multiplier = {2: 1.0, 1: 0.6, 0: 0.3}
-        price *= condition_multiplier[conditions[i]]
-        
-        # Adjust for component status
-        if battery_status[i] == 2:  # good
-            price *= 1.1
-        elif battery_status[i] == 0:  # poor
-            price *= 0.9
-        
-        if screen_condition[i] == 2:  # good
-            price *= 1.2
-        elif screen_condition[i] == 0:  # poor
-            price *= 0.7
-        
-        if mb_status[i] == 2:  # good
-            price *= 1.2
-        elif mb_status[i] == 0:  # poor
-            price *= 0.6
-        
-        prices.append(max(price, 100))  # Ensure minimum price of 100
-    
-    # Create feature matrix
-    X = np.column_stack([
+    conditions = rng.randint(0, 3, n_samples)
+
+    # Component status: good=2, average=1, poor=0
+    battery_status = rng.randint(0, 3, n_samples)
+    screen_condition = rng.randint(0, 3, n_samples)
+    mb_status = rng.randint(0, 3, n_samples)
+
+    return np.column_stack([
         device_types,
         ages,
         conditions,
@@ -86,15 +90,154 @@ def generate_sample_data(n_samples=1000):
         screen_condition,
         mb_status
     ])
-    
-    return X, np.array(prices)
 
-if __name__ == '__main__':
-    print("Generating training data...")
-    X, y = generate_sample_data()
+
+# Sample data for e-waste price prediction
+def generate_sample_data(n_samples=1000, seed=42):
+    """Synthetic (X, y); seed 42 reproduces the data the model was always trained on"""
+    X = _draw_features(np.random.RandomState(seed), n_samples)
+    return X, synthetic_prices(X)
+
+
+def iter_sample_chunks(n_samples, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42):
+    """Yield (X, y) chunks of synthetic data, each with its own seeded stream"""
+    for index, start in enumerate(range(0, n_samples, chunk_rows)):
+        rng = np.random.RandomState([seed, index])
+        X = _draw_features(rng, min(chunk_rows, n_samples - start))
+        yield X, synthetic_prices(X)
+
+
+def write_chunks(chunks, output_dir, file_format='npz'):
+    """Write each (X, y) chunk to its own shard and yield the chunk's row count"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for index, (X, y) in enumerate(chunks):
+        path = output_dir / f'part-{index:05d}.{file_format}'
+        if file_format == 'parquet':
+            import pandas as pd
+
+            frame = pd.DataFrame(X, columns=list(FEATURE_COLUMNS))
+            frame['price'] = y
+            frame.to_parquet(path, index=False)
+        else:
+            np.savez(path, X=X, y=y)
+        yield len(y)
+
+
+def iter_shards(data_dir):
+    """
+    Yield (X, y) from the npz or Parquet shards in data_dir, in name order.
+
+    Incremental exports re-export items that changed since the last run,
+    so an id can appear in several npz shards. Only the row from the
+    latest shard is kept.
+    """
+    paths = sorted(Path(data_dir).glob('part-*.npz')) + sorted(Path(data_dir).glob('part-*.parquet'))
+    if not paths:
+        raise SystemExit(f"No part-*.npz or part-*.parquet shards found in {data_dir}")
+    keep = _latest_rows([path for path in paths if path.suffix == '.npz'])
+    for path in paths:
+        if path.suffix == '.parquet':
+            import pandas as pd
+
+            frame = pd.read_parquet(path)
+            yield frame[list(FEATURE_COLUMNS)].to_numpy(dtype=np.float64), frame['price'].to_numpy(dtype=np.float64)
+        else:
+            with np.load(path) as shard:
+                mask = keep.get(path)
+                if mask is None:
+                    yield shard['X'], shard['y']
+                elif mask.any():
+                    yield shard['X'][mask], shard['y'][mask]
+
+
+def _latest_rows(paths):
+    """{path: row mask} dropping rows whose id reappears in a later shard; shards without ids are absent"""
+    masks = {}
+    seen = np.empty(0, dtype=np.int64)
+    for path in reversed(paths):
+        with np.load(path) as shard:
+            if 'ids' not in shard.files:
+                continue
+            ids = shard['ids']
+        masks[path] = ~np.isin(ids, seen)
+        seen = np.union1d(seen, ids)
+    return masks
+
+
+class NormalEquations:
+    """
+    Running sufficient statistics for least squares with an intercept.
+
+    Holds X'X and X'y for X with a leading column of ones, plus y'y, so the
+    fit and its R² never need more than one chunk in memory.
+    """
+
+    def __init__(self, n_features):
+        self.xtx = np.zeros((n_features + 1, n_features + 1))
+        self.xty = np.zeros(n_features + 1)
+        self.yty = 0.0
+        self.n_rows = 0
+
+    def update(self, X, y):
+        X1 = np.column_stack([np.ones(len(X)), X])
+        self.xtx += X1.T @ X1
+        self.xty += X1.T @ y
+        self.yty += float(y @ y)
+        self.n_rows += len(y)
+
+    def solve(self):
+        """Return (weights, intercept) minimizing the squared error"""
+        try:
+            beta = np.linalg.solve(self.xtx, self.xty)
+        except np.linalg.LinAlgError:
+            beta = np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+        return beta[1:], float(beta[0])
+
+    def r2_score(self, weights, intercept):
+        """R² of the given model on the rows accumulated here"""
+        beta = np.concatenate([[intercept], weights])
+        sse = self.yty - 2 * beta @ self.xty + beta @ self.xtx @ beta
+        mean = self.xty[0] / self.n_rows
+        sst = self.yty - self.n_rows * mean ** 2
+        return 1 - sse / sst
+
+
+def fit_out_of_core(chunks, test_fraction=TEST_FRACTION, seed=42):
+    """
+    Fit a linear model on an iterable of (X, y) chunks in one pass.
+
+    A seeded mask holds out test_fraction of the rows of every chunk.
+    Returns (weights, intercept, train_r2, test_r2, n_rows).
+    """
+    rng = np.random.default_rng(seed)
+    train = test = None
+    for X, y in chunks:
+        if train is None:
+            train, test = NormalEquations(X.shape[1]), NormalEquations(X.shape[1])
+        held_out = rng.random(len(y)) < test_fraction
+        train.update(X[~held_out], y[~held_out])
+        test.update(X[held_out], y[held_out])
+    if train is None:
+        raise SystemExit("No training data")
+    weights, intercept = train.solve()
+    return (
+        weights, intercept,
+        train.r2_score(weights, intercept), test.r2_score(weights, intercept),
+        train.n_rows + test.n_rows
+    )
+
+
+def train_in_memory(X, y):
+    """Fit the scikit-learn pipeline, save its pickles and return the fused (weights, intercept)"""
+    import joblib
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import StandardScaler
 
     print("Splitting data into training and testing sets...")
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_FRACTION, random_state=42)
 
     print("Scaling features...")
     scaler = StandardScaler()
@@ -123,8 +266,17 @@ if __name__ == '__main__':
     print(f"Model saved to {model_path}")
     print(f"Scaler saved to {scaler_path}")
 
+    # Check the fused model against the sklearn pipeline before exporting it
+    weights, intercept = fuse_linear_model(model, scaler)
+    fused_predictions = X_test @ weights + intercept
+    sklearn_predictions = model.predict(X_test_scaled)
+    max_difference = np.max(np.abs(fused_predictions - sklearn_predictions))
+    if not np.allclose(fused_predictions, sklearn_predictions, rtol=1e-9, atol=1e-6):
+        raise SystemExit(f"Fused model diverges from the sklearn pipeline (max difference {max_difference})")
+    print(f"\nFused model matches the sklearn pipeline (max difference {max_difference:.2e})")
+
     # Print feature importance
-    feature_names = ['Device Type', 'Age', 'Condition', 'Battery Status', 
+    feature_names = ['Device Type', 'Age', 'Condition', 'Battery Status',
                     'Screen Condition', 'Motherboard Status']
     coefficients = pd.DataFrame(
         {'Feature': feature_names, 'Coefficient': model.coef_}
@@ -132,3 +284,75 @@ if __name__ == '__main__':
 
     print("\nFeature Importance:")
     print(coefficients)
+    return weights, intercept
+
+
+def _report(action, n_rows, started):
+    elapsed = time.perf_counter() - started
+    print(f"{action} {n_rows:,} rows in {elapsed:.1f}s ({n_rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000, help='Synthetic rows to generate')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data', help='Train on npz/Parquet shards in this directory instead of generating')
+    parser.add_argument('--output', help='Write generated chunks as shards to this directory')
+    parser.add_argument('--format', choices=['npz', 'parquet'], default='npz')
+    parser.add_argument('--generate-only', action='store_true', help='Write shards to --output and stop')
+    parser.add_argument('--out-of-core', action='store_true', help='Fit on chunks with bounded memory')
+    parser.add_argument('--store', default=os.environ.get('EWASTE_MODEL_STORE_DIR', str(DEFAULT_STORE_DIR)),
+                        help='Model store to publish to (default: $EWASTE_MODEL_STORE_DIR, as the workers read it)')
+    parser.add_argument('--no-activate', action='store_true',
+                        help='Publish to the model store without making it the active version')
+    args = parser.parse_args()
+
+    if args.generate_only:
+        if not args.output:
+            parser.error('--generate-only requires --output')
+        print(f"Generating {args.rows:,} rows into {args.output}...")
+        started = time.perf_counter()
+        n_rows = sum(write_chunks(iter_sample_chunks(args.rows, args.chunk_rows, args.seed), args.output, args.format))
+        _report("Generated", n_rows, started)
+        raise SystemExit(0)
+
+    if args.out_of_core:
+        if args.data:
+            chunks = iter_shards(args.data)
+        else:
+            chunks = iter_sample_chunks(args.rows, args.chunk_rows, args.seed)
+        print("Training the model out of core...")
+        started = time.perf_counter()
+        weights, intercept, train_score, test_score, n_rows = fit_out_of_core(chunks, seed=args.seed)
+        _report("Trained on", n_rows, started)
+        print(f"Training R² score: {train_score:.4f}")
+        print(f"Testing R² score: {test_score:.4f}")
+    else:
+        if args.data:
+            X, y = (np.concatenate(parts) for parts in zip(*iter_shards(args.data)))
+        else:
+            print("Generating training data...")
+            started = time.perf_counter()
+            X, y = generate_sample_data(args.rows, args.seed)
+            _report("Generated", len(y), started)
+        started = time.perf_counter()
+        weights, intercept = train_in_memory(X, y)
+        _report("\nTrained on", len(y), started)
+
+    version = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+    store = ModelStore(args.store)
+    if args.no_activate:
+        # Workers serve FUSED_MODEL_PATH while the store has no active version, so only the store gets this one
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            artifact_path = Path(tmp_dir) / FUSED_MODEL_PATH.name
+            save_fused_model(artifact_path, weights, intercept, version)
+            store.publish(artifact_path, version, activate=False)
+        print(f"Model version {version} published in {store.root}")
+    else:
+        save_fused_model(FUSED_MODEL_PATH, weights, intercept, version)
+        print(f"Fused model version {version} saved to {FUSED_MODEL_PATH}")
+
+        # Running workers pick up the new active version without a restart
+        store.publish(FUSED_MODEL_PATH, version, activate=True)
+        print(f"Model version {version} published and activated in {store.root}")
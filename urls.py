@@ -18,9 +18,17 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from ewaste import views as ewaste_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('items/<int:item_id>/analysis-status/', ewaste_views.analysis_status, name='analysis_status'),
+    path('calculator/calculate-bulk/', ewaste_views.calculate_price_bulk, name='calculate_price_bulk'),
+    path('calculator/models/<int:model_id>/price-trend/', ewaste_views.device_price_trend, name='device_price_trend'),
+    path('calculator/models/<int:model_id>/materials/', ewaste_views.device_material_recovery,
+         name='device_material_recovery'),
+    path('ops/model-stats/', ewaste_views.model_stats, name='model_stats'),
+    path('ops/lot-valuation/', ewaste_views.lot_valuation, name='lot_valuation'),
     path('', include('ewaste.urls')),
     path('accounts/', include('django.contrib.auth.urls')),  # Add Django auth URLs
 ]
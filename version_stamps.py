@@ -0,0 +1,79 @@
+"""
+Version stamps shared by every process.
+
+Workers keep tables and caches built from the database in process memory
+(material values, depreciation curves, memoized quotes, the catalog
+cache). Each has a named stamp, stored as a CacheVersion row. Bumping a
+stamp is one UPDATE, so a change made by any worker, the admin or a
+management command reaches every process, whatever the cache backend.
+
+A process re-reads a stamp at most every EWASTE_VERSION_CHECK_SECONDS,
+so the hot path does not query per request and other processes see a
+bump within that many seconds. The process that bumps sees it at once.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CacheVersion
+
+_stamps = {}
+
+
+class VersionStamp:
+    """A named, process-shared version counter"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._current = (0, None)
+        self._checked_at = None
+
+    def get(self):
+        """The current version number"""
+        return self.read()[0]
+
+    def read(self):
+        """(version, time of the last bump or None)"""
+        interval = getattr(settings, 'EWASTE_VERSION_CHECK_SECONDS', 2)
+        now = time.monotonic()
+        checked_at = self._checked_at
+        if checked_at is not None and now - checked_at < interval:
+            return self._current
+        row = CacheVersion.objects.filter(name=self.name).values_list('version', 'updated_at').first()
+        with self._lock:
+            self._current = tuple(row) if row else (0, None)
+            self._checked_at = now
+        return self._current
+
+    def bump(self):
+        """Move every process to a new version"""
+        rows = CacheVersion.objects.filter(name=self.name)
+        if not rows.update(version=F('version') + 1, updated_at=timezone.now()):
+            try:
+                with transaction.atomic():
+                    CacheVersion.objects.create(name=self.name, version=1)
+            except IntegrityError:
+                # Another process created it first
+                rows.update(version=F('version') + 1, updated_at=timezone.now())
+        # Re-read on the next get() so this process sees its own bump
+        self._checked_at = None
+
+
+def version_stamp(name):
+    """The process-wide VersionStamp called ``name``"""
+    stamp = _stamps.get(name)
+    if stamp is None:
+        stamp = _stamps.setdefault(name, VersionStamp(name))
+    return stamp
+
+
+def refresh_all():
+    """Re-read every stamp this process uses, e.g. before counting a view's queries"""
+    for stamp in list(_stamps.values()):
+        stamp._checked_at = None
+        stamp.read()
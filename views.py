@@ -1,20 +1,35 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.db.models import Sum
 import logging
 from .forms import UserRegistrationForm, EWasteItemForm, CollectionScheduleForm
-from .models import EWasteItem, CollectionSchedule, PriceEstimation, DeviceModel, MaterialPrice, DeviceModelComponent, DeviceBrand
-from decimal import Decimal
-from django.http import JsonResponse
-from .ml_model import EWastePricePredictor
+from .models import EWasteItem, CollectionSchedule, PriceEstimation, DeviceModel, MaterialPrice
+from decimal import Decimal, InvalidOperation
+from django.http import JsonResponse, StreamingHttpResponse
+from .model_registry import registry
+from .material_values import material_value_table
+from .material_recovery import material_recovery_table
+from .analysis_pipeline import enqueue_analysis
+from .inference_batcher import inference_service
+from . import image_cache
+from .image_preprocessing import prepare_upload, read_upload
+from . import catalog_cache
+from .catalog_cache import catalog_etag, catalog_last_modified
+from .dashboard_data import dashboard_stats, items_page
+from . import pricing
+from . import scheduling
+from .price_series import price_trend
+from .quote_cache import quote_cache
+from .instrumentation import prediction_timer as prediction_stage_timer
 from django.views.decorators.csrf import csrf_exempt
+import codecs
 import json
-from datetime import datetime
-from django.views.decorators.http import require_http_methods
-from .image_analysis import EwasteImageAnalyzer
-import cv2
+import math
+from datetime import datetime, timedelta
+from django.views.decorators.http import condition, require_http_methods
+from django.utils import timezone
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -35,17 +50,20 @@ def register(request):
 
 @login_required
 def dashboard(request):
-    # Get all user items
-    user_items = EWasteItem.objects.filter(user=request.user).order_by('-created_at')
+    # Get one page of the user's items, newest first
+    cursor = request.GET.get('cursor')
+    user_items, next_cursor = items_page(request.user, cursor)
     
     # Calculate statistics
-    total_value = user_items.aggregate(total=Sum('price_estimation'))['total'] or 0
-    scheduled_collections = CollectionSchedule.objects.filter(user=request.user).count()
+    stats = dashboard_stats(request.user)
     
     context = {
         'items': user_items,
-        'total_value': total_value,
-        'scheduled_collections': scheduled_collections
+        'item_count': stats['item_count'],
+        'total_value': stats['total_value'],
+        'scheduled_collections': stats['scheduled_collections'],
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
     }
     
     return render(request, 'ewaste/dashboard.html', context)
@@ -76,43 +94,52 @@ def submit_ewaste(request):
                     messages.error(request, 'Only JPEG and PNG images are allowed')
                     return render(request, 'ewaste/submit_ewaste.html', {'form': form})
 
-                ewaste_item.image = image
-                ewaste_item.save()  # Initial save to get the image path
-
-                try:
-                    # Initialize analyzer and analyze image
-                    analyzer = EwasteImageAnalyzer()
-                    img_cv, detections = analyzer.analyze_image(ewaste_item.image.path)
-                    
-                    # Store analysis results
-                    ewaste_item.analysis_results = json.dumps(detections)
-                    
-                    # Save the analyzed image
-                    analyzed_image_path = ewaste_item.image.path.replace('.', '_analyzed.')
-                    cv2.imwrite(analyzed_image_path, img_cv)
-                    ewaste_item.analyzed_image = analyzed_image_path
-
-                    # Calculate price estimation
-                    ewaste_item.price_estimation = calculate_price_estimation(
+                # Resubmitted photos reuse the stored files and, if available, their analysis
+                data = read_upload(image)
+                ewaste_item.content_hash = image_cache.hash_bytes(data)
+                cached = image_cache.lookup(ewaste_item.content_hash)
+                if cached is not None:
+                    ewaste_item.image = cached.image.name
+                    ewaste_item.thumbnail = cached.thumbnail.name
+                else:
+                    # Store a detector-sized copy and a thumbnail, not the full-resolution upload
+                    try:
+                        prepared = prepare_upload(data, image.name)
+                    except ValueError:
+                        messages.error(request, 'The uploaded image could not be read')
+                        return render(request, 'ewaste/submit_ewaste.html', {'form': form})
+                    ewaste_item.image = prepared.image_file
+                    ewaste_item.thumbnail = prepared.thumbnail_file
+
+                if cached is not None and cached.analysis_results is not None:
+                    ewaste_item.analysis_results = cached.analysis_results
+                    ewaste_item.analyzed_image = cached.analyzed_image.name
+                    ewaste_item.price_estimation, ewaste_item.price_model_version = calculate_versioned_price_estimation(
                         ewaste_item.item_type,
                         ewaste_item.functional_status,
                         ewaste_item.age,
                         ewaste_item.battery_status,
                         ewaste_item.screen_condition,
-                        ewaste_item.motherboard_status
+                        ewaste_item.motherboard_status,
+                        ewaste_item.brand
                     )
-                    
+                    ewaste_item.analysis_status = 'completed'
                     ewaste_item.save()
                     messages.success(request, 'E-waste item submitted and analyzed successfully!')
                     return redirect('schedule_collection', item_id=ewaste_item.id)
-                    
-                except Exception as e:
-                    # Log the specific analysis error
-                    logger.error(f'Error during image analysis: {str(e)}')
-                    messages.error(request, 'Error analyzing the image. Please try again.')
-                    ewaste_item.delete()  # Clean up the partially created record
-                    return render(request, 'ewaste/submit_ewaste.html', {'form': form})
-                    
+
+                ewaste_item.analysis_status = 'pending'
+                ewaste_item.save()
+                if cached is None:
+                    image_cache.remember_upload(
+                        ewaste_item.content_hash, ewaste_item.image.name, ewaste_item.thumbnail.name, ewaste_item.image.size
+                    )
+
+                # Detection and pricing run in the background; the dashboard polls for the result
+                enqueue_analysis(ewaste_item.id)
+                messages.success(request, 'E-waste item submitted! We are analyzing your image and will update the price estimate shortly.')
+                return redirect('schedule_collection', item_id=ewaste_item.id)
+
             except Exception as e:
                 logger.error(f'Error processing e-waste submission: {str(e)}')
                 messages.error(request, 'An error occurred while processing your submission. Please try again.')
@@ -122,6 +149,22 @@ def submit_ewaste(request):
     
     return render(request, 'ewaste/submit_ewaste.html', {'form': form})
 
+@login_required
+def analysis_status(request, item_id):
+    """Lightweight polling endpoint for the background analysis of an item"""
+    item = EWasteItem.objects.filter(id=item_id, user=request.user).values(
+        'analysis_status', 'price_estimation', 'analyzed_image'
+    ).first()
+    if item is None:
+        return JsonResponse({'success': False, 'error': 'E-waste item not found'}, status=404)
+
+    return JsonResponse({
+        'success': True,
+        'status': item['analysis_status'],
+        'price_estimation': float(item['price_estimation']) if item['price_estimation'] is not None else None,
+        'analyzed_image': item['analyzed_image'] or None,
+    })
+
 @login_required
 def schedule_collection(request, item_id):
     ewaste_item = EWasteItem.objects.get(id=item_id, user=request.user)
@@ -132,9 +175,13 @@ def schedule_collection(request, item_id):
             schedule = form.save(commit=False)
             schedule.user = request.user
             schedule.e_waste_item = ewaste_item
-            schedule.save()
-            messages.success(request, 'Collection scheduled successfully!')
-            return redirect('dashboard')
+            try:
+                scheduling.book_collection(schedule)
+            except scheduling.SlotUnavailable as e:
+                form.add_error(None, str(e))
+            else:
+                messages.success(request, 'Collection scheduled successfully!')
+                return redirect('dashboard')
     else:
         form = CollectionScheduleForm()
     
@@ -157,72 +204,34 @@ def home(request):
     """Render the home page with basic price calculation information"""
     return render(request, 'ewaste/home.html')
 
-def calculate_price_estimation(item_type, functional_status, age, battery_status, screen_condition, motherboard_status):
+def calculate_price_estimation(item_type, functional_status, age, battery_status, screen_condition, motherboard_status,
+                               brand=None):
     """Calculate estimated price based on item type and various conditions"""
-    # Base prices in Indian Rupees
-    base_prices = {
-        'mobile': Decimal('2000.00'),  # Smartphones
-        'laptop': Decimal('5000.00'),  # Laptops
-        'tablet': Decimal('1500.00'),  # Tablets
-        'tv': Decimal('3000.00'),      # Smart TVs
-        'other': Decimal('1000.00'),   # Other devices
-    }
-    
-    # Functional status multipliers
-    functional_multipliers = {
-        'working': Decimal('0.8'),           # 80% of base price
-        'partially_working': Decimal('0.5'),  # 50% of base price
-        'damaged': Decimal('0.3'),           # 30% of base price
-        'not_working': Decimal('0.1'),       # 10% of base price
-    }
-    
-    # Component status multipliers
-    component_multipliers = {
-        'good': Decimal('1.0'),
-        'bad': Decimal('0.5'),
-        'na': Decimal('0.7'),  # Not applicable
-    }
-    
-    # Age depreciation (per year)
-    age_depreciation = Decimal('0.1')  # 10% depreciation per year, max 70% depreciation
-    
-    # Get base price for the item type
-    base_price = base_prices.get(item_type, base_prices['other'])
-    
-    # Apply functional status multiplier
-    multiplier = functional_multipliers.get(functional_status, Decimal('0.3'))
-    
-    # Apply component status multipliers
-    battery_multiplier = component_multipliers.get(battery_status, Decimal('0.7'))
-    screen_multiplier = component_multipliers.get(screen_condition, Decimal('0.7'))
-    motherboard_multiplier = component_multipliers.get(motherboard_status, Decimal('0.7'))
-    
-    # Calculate average component multiplier
-    component_multiplier = (battery_multiplier + screen_multiplier + motherboard_multiplier) / Decimal('3.0')
-    
-    # Apply age depreciation (max 70% depreciation)
-    age_multiplier = max(Decimal('0.3'), Decimal('1.0') - (age * age_depreciation))
-    
-    # Calculate final price
-    estimation = base_price * multiplier * component_multiplier * age_multiplier
-    
-    return estimation.quantize(Decimal('0.01'))
+    return calculate_versioned_price_estimation(
+        item_type, functional_status, age, battery_status, screen_condition, motherboard_status, brand
+    )[0]
+
+def calculate_versioned_price_estimation(item_type, functional_status, age, battery_status, screen_condition,
+                                         motherboard_status, brand=None):
+    """Return (price, model_version) for an item; the version is 'rules' unless the ML model priced it"""
+    strategy = pricing.default_strategy()
+    # Keyed on the serving model version, so a hot-swapped model never reuses old quotes
+    key = ('item', item_type, (brand or '').strip().lower(), functional_status, float(age), battery_status,
+           screen_condition, motherboard_status, strategy, pricing.active_model_version(strategy))
+
+    def compute():
+        price, model_version = pricing.estimate_item_price_versioned(
+            item_type, functional_status, age, battery_status, screen_condition, motherboard_status, strategy,
+            brand
+        )
+        return Decimal(price).quantize(Decimal('0.01')), model_version
+
+    return quote_cache.get_or_compute(key, compute)
 
 def calculate_total_material_weight(device_model, material_name):
     """Calculate total weight of a specific material across all components"""
-    total_weight = Decimal('0.00')
-    
-    # Get all components for this device model
-    components = DeviceModelComponent.objects.filter(device_model=device_model)
-    
-    for component in components:
-        # Get material percentage for this component (you'll need to implement this)
-        material_percentage = get_material_percentage(component, material_name)
-        if material_percentage:
-            # Add to total weight
-            total_weight += component.weight * (material_percentage / 100)
-    
-    return total_weight
+    grams = material_recovery_table.material_weight(device_model.pk, material_name)
+    return Decimal(str(grams)).quantize(Decimal('0.000001'))
 
 def get_device_models(request):
     """AJAX endpoint to get device models based on brand and type"""
@@ -238,6 +247,7 @@ def get_device_models(request):
         return JsonResponse({'models': model_list})
     return JsonResponse({'models': []})
 
+@condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
 def get_brands(request):
     """Get brands for a specific device type"""
     device_type = request.GET.get('type')
@@ -246,66 +256,13 @@ def get_brands(request):
             'success': False,
             'error': 'Device type is required'
         })
-    
-    # First, clean up any duplicate brands for this device type
-    existing_brands = DeviceBrand.objects.filter(device_type=device_type)
-    for brand in existing_brands:
-        duplicates = DeviceBrand.objects.filter(
-            device_type=device_type,
-            name=brand.name
-        ).exclude(id=brand.id)
-        duplicates.delete()
-    
-    # Get unique brands for this device type
-    brands = list(DeviceBrand.objects.filter(
-        device_type=device_type
-    ).values_list('name', flat=True).distinct().order_by('name'))
-    
-    # If no brands found, add test data
-    if not brands:
-        if device_type == 'phone':
-            brands = [
-                'Apple', 'Google', 'OnePlus', 'Samsung', 'Xiaomi', 
-                'OPPO', 'Vivo', 'Realme', 'Nothing', 'Motorola'
-            ]
-        elif device_type == 'laptop':
-            brands = [
-                'Apple', 'Dell', 'HP', 'Lenovo', 'Acer', 
-                'ASUS', 'MSI', 'Razer', 'Microsoft', 'LG'
-            ]
-        elif device_type == 'tablet':
-            brands = [
-                'Apple', 'Samsung', 'Microsoft', 'Lenovo',
-                'Xiaomi', 'HUAWEI', 'Realme', 'OPPO'
-            ]
-        elif device_type == 'tv':
-            brands = [
-                'Samsung', 'LG', 'Sony', 'TCL', 'Hisense',
-                'OnePlus', 'Xiaomi', 'Vu', 'Panasonic'
-            ]
-        elif device_type == 'console':
-            brands = [
-                'Sony', 'Microsoft', 'Nintendo',
-                'Sega', 'Atari', 'Steam'
-            ]
-        
-        # Save these brands to the database
-        for brand_name in brands:
-            DeviceBrand.objects.get_or_create(
-                name=brand_name,
-                device_type=device_type
-            )
-        
-        # Refresh the brands list
-        brands = list(DeviceBrand.objects.filter(
-            device_type=device_type
-        ).values_list('name', flat=True).distinct().order_by('name'))
-    
+
     return JsonResponse({
         'success': True,
-        'brands': brands
+        'brands': catalog_cache.brand_names(device_type)
     })
 
+@condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
 def get_models(request):
     """Get models for a specific brand and device type"""
     device_type = request.GET.get('type')
@@ -318,199 +275,9 @@ def get_models(request):
         })
     
     try:
-        # Get unique models for this brand and device type
-        models = list(DeviceModel.objects.filter(
-            device_type=device_type,
-            brand__name=brand_name
-        ).values('id', 'name', 'release_year', 'base_price').distinct().order_by('-release_year', 'name'))
-        
-        # If no models found, add test data
-        if not models:
-            current_year = 2025
-            test_models = []
-            
-            if device_type == 'phone':
-                if brand_name == 'Apple':
-                    test_models = [
-                        ('iPhone 15 Pro Max', current_year, 159900),
-                        ('iPhone 15 Pro', current_year, 134900),
-                        ('iPhone 15', current_year, 79900),
-                        ('iPhone 14 Pro', current_year - 1, 119900),
-                        ('iPhone 14', current_year - 1, 69900),
-                        ('iPhone 13', current_year - 2, 59900),
-                        ('iPhone 12', current_year - 3, 49900)
-                    ]
-                elif brand_name == 'Samsung':
-                    test_models = [
-                        ('Galaxy S24 Ultra', current_year, 129900),
-                        ('Galaxy S24+', current_year, 99900),
-                        ('Galaxy S24', current_year, 79900),
-                        ('Galaxy S23 Ultra', current_year - 1, 124900),
-                        ('Galaxy S23', current_year - 1, 74900),
-                        ('Galaxy A54', current_year - 1, 38900)
-                    ]
-                elif brand_name == 'Google':
-                    test_models = [
-                        ('Pixel 8 Pro', current_year, 106900),
-                        ('Pixel 8', current_year, 75900),
-                        ('Pixel 7a', current_year - 1, 39900),
-                        ('Pixel 7', current_year - 1, 59900),
-                        ('Pixel 6a', current_year - 2, 29900)
-                    ]
-                elif brand_name == 'OnePlus':
-                    test_models = [
-                        ('12', current_year, 64900),
-                        ('11', current_year - 1, 56900),
-                        ('Nord 3', current_year - 1, 33900),
-                        ('10 Pro', current_year - 2, 49900)
-                    ]
-                elif brand_name == 'Nothing':
-                    test_models = [
-                        ('Phone (2)', current_year, 44900),
-                        ('Phone (1)', current_year - 1, 32900)
-                    ]
-                elif brand_name == 'Xiaomi':
-                    test_models = [
-                        ('13 Pro', current_year, 79900),
-                        ('12 Pro', current_year - 1, 62900),
-                        ('Note 12 Pro', current_year - 1, 29900)
-                    ]
-                elif brand_name in ['OPPO', 'Vivo', 'Realme']:
-                    test_models = [
-                        (f'{brand_name} Flagship', current_year, 54900),
-                        (f'{brand_name} Mid-range', current_year - 1, 32900),
-                        (f'{brand_name} Budget', current_year - 1, 18900)
-                    ]
-            elif device_type == 'laptop':
-                if brand_name == 'Apple':
-                    test_models = [
-                        ('MacBook Pro 16" M3 Max', current_year, 399900),
-                        ('MacBook Pro 14" M3 Pro', current_year, 249900),
-                        ('MacBook Air 15" M2', current_year - 1, 154900),
-                        ('MacBook Air 13" M1', current_year - 2, 99900)
-                    ]
-                elif brand_name in ['Dell', 'HP', 'Lenovo']:
-                    test_models = [
-                        (f'{brand_name} Premium Pro', current_year, 189900),
-                        (f'{brand_name} Premium', current_year, 129900),
-                        (f'{brand_name} Mid-range', current_year - 1, 79900),
-                        (f'{brand_name} Entry', current_year - 2, 49900)
-                    ]
-                elif brand_name == 'ASUS':
-                    test_models = [
-                        ('ROG Zephyrus', current_year, 224900),
-                        ('TUF Gaming', current_year, 124900),
-                        ('VivoBook Pro', current_year - 1, 89900),
-                        ('VivoBook', current_year - 1, 54900)
-                    ]
-                elif brand_name == 'MSI':
-                    test_models = [
-                        ('Titan', current_year, 399900),
-                        ('Raider', current_year, 299900),
-                        ('Stealth', current_year - 1, 199900),
-                        ('Katana', current_year - 1, 99900)
-                    ]
-                elif brand_name == 'Razer':
-                    test_models = [
-                        ('Blade 18', current_year, 399900),
-                        ('Blade 16', current_year, 299900),
-                        ('Blade 14', current_year - 1, 199900)
-                    ]
-            elif device_type == 'tablet':
-                if brand_name == 'Apple':
-                    test_models = [
-                        ('iPad Pro 12.9" M2', current_year, 119900),
-                        ('iPad Pro 11" M2', current_year, 89900),
-                        ('iPad Air M1', current_year - 1, 59900),
-                        ('iPad 10th Gen', current_year - 2, 44900)
-                    ]
-                elif brand_name == 'Samsung':
-                    test_models = [
-                        ('Galaxy Tab S9 Ultra', current_year, 108900),
-                        ('Galaxy Tab S9+', current_year, 89900),
-                        ('Galaxy Tab S9', current_year, 74900),
-                        ('Galaxy Tab S8', current_year - 1, 58900)
-                    ]
-                elif brand_name == 'Microsoft':
-                    test_models = [
-                        ('Surface Pro 9', current_year, 149900),
-                        ('Surface Pro 8', current_year - 1, 119900),
-                        ('Surface Go 4', current_year, 79900)
-                    ]
-                elif brand_name in ['Xiaomi', 'Realme', 'OPPO']:
-                    test_models = [
-                        (f'{brand_name} Premium Tab', current_year, 45900),
-                        (f'{brand_name} Mid Tab', current_year - 1, 28900),
-                        (f'{brand_name} Basic Tab', current_year - 1, 15900)
-                    ]
-            elif device_type == 'tv':
-                base_prices = {
-                    'Samsung': [249900, 199900, 149900, 99900],  # 75", 65", 55", 50"
-                    'LG': [239900, 189900, 139900, 89900],
-                    'Sony': [299900, 249900, 189900, 129900],
-                    'OnePlus': [149900, 119900, 89900, 59900],
-                    'TCL': [99900, 79900, 59900, 39900],
-                    'Xiaomi': [89900, 69900, 49900, 34900],
-                    'Vu': [79900, 59900, 44900, 29900]
-                }
-                prices = base_prices.get(brand_name, [99900, 79900, 59900, 39900])
-                
-                test_models = [
-                    (f'{brand_name} 75" Premium OLED', current_year, prices[0]),
-                    (f'{brand_name} 65" OLED', current_year, prices[1]),
-                    (f'{brand_name} 55" QLED', current_year - 1, prices[2]),
-                    (f'{brand_name} 50" LED', current_year - 2, prices[3])
-                ]
-            elif device_type == 'console':
-                if brand_name == 'Sony':
-                    test_models = [
-                        ('PlayStation 5 Pro', current_year, 59900),
-                        ('PlayStation 5', current_year - 2, 49900),
-                        ('PlayStation 4 Pro', current_year - 6, 29900)
-                    ]
-                elif brand_name == 'Microsoft':
-                    test_models = [
-                        ('Xbox Series X', current_year - 2, 49900),
-                        ('Xbox Series S', current_year - 2, 29900)
-                    ]
-                elif brand_name == 'Nintendo':
-                    test_models = [
-                        ('Switch OLED', current_year - 3, 34900),
-                        ('Switch', current_year - 5, 29900),
-                        ('Switch Lite', current_year - 4, 19900)
-                    ]
-                elif brand_name == 'Steam':
-                    test_models = [
-                        ('Steam Deck OLED', current_year, 54900),
-                        ('Steam Deck LCD', current_year - 1, 39900)
-                    ]
-            
-            # Create brand if it doesn't exist
-            brand, _ = DeviceBrand.objects.get_or_create(
-                name=brand_name,
-                device_type=device_type
-            )
-            
-            # Create models
-            models = []
-            for name, year, price in test_models:
-                model = DeviceModel.objects.create(
-                    name=name,
-                    brand=brand,
-                    device_type=device_type,
-                    release_year=year,
-                    base_price=price
-                )
-                models.append({
-                    'id': model.id,
-                    'name': model.name,
-                    'release_year': model.release_year,
-                    'base_price': float(model.base_price)
-                })
-        
         return JsonResponse({
             'success': True,
-            'models': models
+            'models': catalog_cache.model_rows(device_type, brand_name)
         })
         
     except Exception as e:
@@ -521,67 +288,28 @@ def get_models(request):
 
 def calculate_material_value(device_model):
     """Calculate the value of recyclable materials in a device"""
-    material_prices = {}
-    
-    # Base material prices per gram in INR (using Decimal)
-    base_prices = {
-        'gold': Decimal('5000'),      # INR per gram
-        'silver': Decimal('75'),      # INR per gram
-        'copper': Decimal('0.8'),     # INR per gram
-        'aluminum': Decimal('0.2'),   # INR per gram
-        'plastic': Decimal('0.05')    # INR per gram
-    }
-    
-    # Estimated material weights based on device type (using Decimal)
-    if device_model.device_type == 'phone':
-        weights = {
-            'gold': Decimal('0.034'),     # grams
-            'silver': Decimal('0.34'),    # grams
-            'copper': Decimal('9'),       # grams
-            'aluminum': Decimal('25'),    # grams
-            'plastic': Decimal('80')      # grams
-        }
-    elif device_model.device_type == 'laptop':
-        weights = {
-            'gold': Decimal('0.2'),       # grams
-            'silver': Decimal('0.7'),     # grams
-            'copper': Decimal('65'),      # grams
-            'aluminum': Decimal('250'),   # grams
-            'plastic': Decimal('500')     # grams
-        }
-    elif device_model.device_type == 'tablet':
-        weights = {
-            'gold': Decimal('0.1'),       # grams
-            'silver': Decimal('0.5'),     # grams
-            'copper': Decimal('30'),      # grams
-            'aluminum': Decimal('150'),   # grams
-            'plastic': Decimal('200')     # grams
-        }
-    elif device_model.device_type == 'tv':
-        weights = {
-            'gold': Decimal('0.1'),       # grams
-            'silver': Decimal('0.5'),     # grams
-            'copper': Decimal('450'),     # grams
-            'aluminum': Decimal('700'),   # grams
-            'plastic': Decimal('3000')    # grams
-        }
-    else:  # gaming console
-        weights = {
-            'gold': Decimal('0.15'),      # grams
-            'silver': Decimal('0.6'),     # grams
-            'copper': Decimal('100'),     # grams
-            'aluminum': Decimal('300'),   # grams
-            'plastic': Decimal('1000')    # grams
+    return material_value_table.values_for(device_model.device_type)
+
+def _quote_response(base_price, condition, age, material_total, total_price):
+    return {
+        'total_price': float(total_price),
+        'base_price': float(base_price),
+        'age': float(age),
+        'condition': condition,
+        'material_values': {
+            'metals': material_total * 0.4,
+            'plastics': material_total * 0.3,
+            'electronics': material_total * 0.3
         }
-    
-    # Calculate value for each material
-    material_values = {}
-    for material, weight in weights.items():
-        price_per_gram = base_prices[material]
-        total_value = weight * price_per_gram
-        material_values[material] = float(total_value)  # Convert to float for JSON serialization
-    
-    return material_values
+    }
+
+def quote_device_price(device_model, condition, age):
+    """Price a catalog device model for the given condition and age"""
+    material_total = material_value_table.total_for(device_model.device_type)
+    total_price = pricing.quote_catalog_price(
+        device_model.base_price, condition, age, material_total, pricing.catalog_curve(device_model)
+    )
+    return _quote_response(device_model.base_price, condition, age, material_total, total_price)
 
 @require_http_methods(['POST'])
 def calculate_price(request):
@@ -594,54 +322,14 @@ def calculate_price(request):
         
         # Convert age to Decimal
         age = Decimal(age)
-        
-        # Get device model
-        device_model = DeviceModel.objects.get(id=model_id)
-        
-        # Get base price from device model
-        base_price = device_model.base_price
-        
-        # Condition multipliers
-        condition_multipliers = {
-            'working': Decimal('1.00'),           # 100% of base price
-            'partially_working': Decimal('0.60'), # 60% of base price
-            'not_working': Decimal('0.30'),      # 30% of base price
-        }
-        
-        # Apply condition multiplier
-        condition_multiplier = condition_multipliers.get(condition, Decimal('0.30'))
-        
-        # Calculate age depreciation (up to 80% over 5 years)
-        max_age_depreciation = Decimal('0.80')  # Maximum 80% depreciation
-        depreciation_per_year = max_age_depreciation / Decimal('5')  # Spread over 5 years
-        age_depreciation = min(max_age_depreciation, age * depreciation_per_year)
-        age_multiplier = Decimal('1.0') - age_depreciation
-        
-        # Calculate material value (minimum price floor)
-        material_value = calculate_material_value(device_model)
-        
-        # Calculate final price
-        final_price = (base_price * condition_multiplier * age_multiplier)
-        
-        # Ensure price doesn't go below material value
-        final_price = max(final_price, material_value)
-        
-        # Round to nearest rupee
-        final_price = final_price.quantize(Decimal('1.'))
-        
-        return JsonResponse({
-            'success': True,
-            'total_price': float(final_price),
-            'base_price': float(base_price),
-            'age': age,
-            'condition': condition,
-            'material_values': {
-                'metals': float(material_value * Decimal('0.4')),
-                'plastics': float(material_value * Decimal('0.3')),
-                'electronics': float(material_value * Decimal('0.3'))
-            }
-        })
-    except (json.JSONDecodeError, KeyError, ValueError) as e:
+
+        # Repeated quotes are served without touching the database
+        quote = quote_cache.get_or_compute(
+            ('catalog', int(model_id), condition, float(age)),
+            lambda: quote_device_price(DeviceModel.objects.get(id=model_id), condition, age)
+        )
+        return JsonResponse({'success': True, **quote})
+    except (json.JSONDecodeError, KeyError, ValueError, TypeError, InvalidOperation) as e:
         return JsonResponse({
             'success': False,
             'error': str(e)
@@ -657,6 +345,228 @@ def calculate_price(request):
             'error': 'An unexpected error occurred'
         }, status=500)
 
+# Longest price trend range, in days
+PRICE_TREND_MAX_DAYS = 10 * 366
+
+@require_http_methods(['GET'])
+def device_price_trend(request, model_id):
+    """
+    Price trend of a catalog model, read from the daily/monthly rollups.
+
+    ``days`` sets the range (default two years); ``period`` forces
+    ``day`` or ``month`` buckets.
+    """
+    try:
+        days = int(request.GET.get('days', 730))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'days must be an integer'}, status=400)
+    period = request.GET.get('period')
+    if not 0 < days <= PRICE_TREND_MAX_DAYS or period not in (None, 'day', 'month'):
+        return JsonResponse({'success': False, 'error': 'Invalid days or period'}, status=400)
+
+    end = timezone.localdate()
+    start = end - timedelta(days=days)
+    return JsonResponse({
+        'success': True,
+        'model_id': model_id,
+        'trend': price_trend(model_id, start, end, period),
+    })
+
+def device_material_recovery(request, model_id):
+    """Contained and recoverable grams, and recoverable value, of each material in a catalog model"""
+    materials = material_recovery_table.model_materials(model_id)
+    return JsonResponse({
+        'success': True,
+        'model_id': model_id,
+        'materials': materials,
+        'total_value': round(sum(material['value'] for material in materials.values()), 2),
+    })
+
+@staff_member_required
+def lot_valuation(request):
+    """
+    Recoverable material in a lot of collected items.
+
+    The lot is the confirmed collections of ``route`` (a PickupRoute id)
+    or of ``date`` (YYYY-MM-DD).
+    """
+    collections = CollectionSchedule.objects.filter(status__in=['confirmed', 'completed'])
+    if request.GET.get('route'):
+        collections = collections.filter(route_id=request.GET['route'])
+    elif request.GET.get('date'):
+        try:
+            collections = collections.filter(preferred_date=datetime.strptime(request.GET['date'], '%Y-%m-%d').date())
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'date must be YYYY-MM-DD'}, status=400)
+    else:
+        return JsonResponse({'success': False, 'error': 'Pass route or date'}, status=400)
+
+    items = list(collections.values_list('e_waste_item__item_type', 'e_waste_item__brand', 'e_waste_item__model'))
+    lot = material_recovery_table.value_lot(items)
+    return JsonResponse({
+        'success': True,
+        'items': lot.items,
+        'matched_catalog_models': lot.matched,
+        'recoverable_g': lot.recoverable_g,
+        'value': lot.value,
+        'total_value': round(lot.total_value, 2),
+    })
+
+# Limits for the bulk pricing endpoint
+BULK_PRICE_MAX_DEVICES = 100000
+BULK_PRICE_BATCH_SIZE = 1000
+BULK_READ_CHUNK_SIZE = 64 * 1024
+# A single device record is a few hundred bytes; anything undecodable past this is malformed
+BULK_MAX_RECORD_SIZE = 4 * 1024 * 1024
+
+def iter_json_records(stream, chunk_size=BULK_READ_CHUNK_SIZE, max_record_size=BULK_MAX_RECORD_SIZE):
+    """
+    Incrementally decode JSON objects from a file-like byte stream.
+
+    Accepts either a JSON array of objects or newline-delimited JSON, and only
+    ever holds one read chunk plus one partially received object in memory.
+    Raises ValueError once an object is still undecodable after
+    ``max_record_size`` characters, rather than buffering the rest of a
+    malformed upload.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    exhausted = False
+
+    while True:
+        # Skip array brackets, separators and whitespace between objects
+        while position < len(buffer) and buffer[position] in '[],\r\n\t ':
+            position += 1
+
+        if position < len(buffer):
+            if buffer[position] != '{':
+                raise ValueError(f"Expected a JSON object, found {buffer[position]!r}")
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if exhausted:
+                    raise
+                if len(buffer) - position > max_record_size:
+                    raise ValueError(f"Malformed JSON object: {e.msg} "
+                                     f"(nothing decodable within {max_record_size} characters)") from e
+                # The object is split across reads; fetch more input below
+            else:
+                position = end
+                yield record
+                continue
+        elif exhausted:
+            return
+
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            exhausted = True
+        buffer = buffer[position:] + utf8.decode(chunk, final=exhausted)
+        position = 0
+
+
+def _parse_model_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _price_bulk_batch(batch, device_models):
+    """Price one batch of bulk records, fetching any unseen models with one query"""
+    model_ids = [_parse_model_id(record.get('model_id')) for _, record in batch]
+    missing_ids = {model_id for model_id in model_ids if model_id is not None} - device_models.keys()
+    if missing_ids:
+        device_models.update(DeviceModel.objects.in_bulk(missing_ids))
+
+    results = []
+    priceable = []  # (result, device_model, condition, age) for valid records
+    for (index, record), model_id in zip(batch, model_ids):
+        result = {'index': index, 'model_id': record.get('model_id')}
+        results.append(result)
+        device_model = device_models.get(model_id)
+        if device_model is None:
+            result.update(success=False, error='Device model not found')
+            continue
+        try:
+            age = float(record.get('age'))
+        except (TypeError, ValueError):
+            age = math.nan
+        if not math.isfinite(age):
+            result.update(success=False, error='Invalid age')
+            continue
+        item_condition = record.get('condition')
+        if not isinstance(item_condition, str):
+            result.update(success=False, error='Invalid condition')
+            continue
+        priceable.append((result, device_model, item_condition, age))
+
+    if priceable:
+        _, device_models_column, conditions, ages = zip(*priceable)
+        base_prices = [device_model.base_price for device_model in device_models_column]
+        material_totals = [material_value_table.total_for(device_model.device_type)
+                           for device_model in device_models_column]
+        curves = [pricing.catalog_curve(device_model) for device_model in device_models_column]
+        prices = pricing.quote_catalog_prices(base_prices, conditions, ages, material_totals, curves)
+        for (result, _, item_condition, age), base_price, material_total, price in zip(
+                priceable, base_prices, material_totals, prices):
+            result.update(success=True, **_quote_response(base_price, item_condition, age, material_total, price))
+
+    for result in results:
+        yield json.dumps(result) + '\n'
+
+def _stream_bulk_prices(request):
+    device_models = {}
+    batch = []
+    records = enumerate(iter_json_records(request))
+    error = None
+    while True:
+        # Only parsing can fail here; every parsed record gets its own result line
+        try:
+            index, record = next(records)
+        except StopIteration:
+            break
+        except (json.JSONDecodeError, UnicodeDecodeError, ValueError) as e:
+            error = e
+            break
+        if index >= BULK_PRICE_MAX_DEVICES:
+            yield json.dumps({
+                'success': False,
+                'error': f'Too many devices, the limit is {BULK_PRICE_MAX_DEVICES}'
+            }) + '\n'
+            return
+        batch.append((index, record))
+        if len(batch) >= BULK_PRICE_BATCH_SIZE:
+            yield from _price_bulk_batch(batch, device_models)
+            batch = []
+    yield from _price_bulk_batch(batch, device_models)
+    if error is not None:
+        # Headers are already sent, so malformed input ends the stream with an error line
+        yield json.dumps({'success': False, 'error': f'Malformed input: {str(error)}'}) + '\n'
+
+@require_http_methods(['POST'])
+def calculate_price_bulk(request):
+    """
+    Price many devices in one request.
+
+    The body is a JSON array or NDJSON stream of objects with ``model_id``,
+    ``condition`` and ``age``. Results are streamed back as NDJSON, one line
+    per input record in input order.
+    """
+    return StreamingHttpResponse(_stream_bulk_prices(request), content_type='application/x-ndjson')
+
+@staff_member_required
+def model_stats(request):
+    """Report model load times, worker memory, served model versions, inference batching, quote cache and prediction timings"""
+    return JsonResponse({
+        **registry.stats(),
+        # Only reported once loaded, so this view never triggers a model load
+        'price_model': registry.get('price_predictor').stats() if registry.is_loaded('price_predictor') else None,
+        'inference': inference_service.metrics(),
+        'quote_cache': quote_cache.stats(),
+        'prediction_stages': prediction_stage_timer.stats(),
+    })
+
 def price_calculator(request):
     """Render the price calculator page"""
     return render(request, 'ewaste/price_calculator.html')